@@ -1,4 +1,5 @@
 import numpy as np
+import scipy.sparse as sprs
 from openpnm.algorithms import ReactiveTransport
 from openpnm.utils import logging, Docorator, GenericSettings
 docstr = Docorator()
@@ -58,6 +59,12 @@ class AdvectionDiffusion(ReactiveTransport):
     A subclass of ReactiveTransport to simulate advection-diffusion
     """
 
+    def __new__(cls, *args, **kwargs):
+        instance = super(AdvectionDiffusion, cls).__new__(cls, *args, **kwargs)
+        instance._A_pattern = None
+        instance._A_pattern_conns = None
+        return instance
+
     def __init__(self, settings={}, **kwargs):
         super().__init__(**kwargs)
         self.settings._update_settings_and_docs(AdvectionDiffusionSettings())
@@ -90,6 +97,50 @@ class AdvectionDiffusion(ReactiveTransport):
             self.settings['pressure'] = pressure
         super().setup(**kwargs)
 
+    def _assemble_A(self, g):
+        r"""
+        Assembles the non-symmetric coefficient matrix (without BCs) by
+        writing the conductances into a fixed sparsity pattern.
+
+        Notes
+        -----
+        The pattern, which holds the i→j and j→i entries of every throat
+        followed by the diagonal, is built once and reused as long as the
+        network topology does not change, so each re-assembly only
+        overwrites the matrix values. ``g`` can either be Nt, (Nt, 2) or
+        2*Nt long, where the first column (or Nt values) are the i→j
+        conductances and the second column (or last Nt values) are the j→i
+        conductances.
+        """
+        network = self.project.network
+        conns = network['throat.conns']
+        Np, Nt = network.Np, network.Nt
+        A = self._A_pattern
+        if (A is None) or (A.shape != (Np, Np)) or (A.nnz != 2*Nt + Np) \
+                or (self._A_pattern_conns is not conns):
+            diag = np.arange(Np)
+            row = np.concatenate((conns[:, 0], conns[:, 1], diag))
+            col = np.concatenate((conns[:, 1], conns[:, 0], diag))
+            data = np.zeros(2*Nt + Np, dtype=float)
+            A = sprs.coo_matrix((data, (row, col)), shape=(Np, Np))
+            self._A_pattern = A
+            self._A_pattern_conns = conns
+        g = np.asarray(g, dtype=float)
+        if g.size == Nt:
+            gij = gji = g.ravel()
+        elif g.shape == (Nt, 2):
+            gij, gji = g[:, 0], g[:, 1]
+        elif g.size == 2 * Nt:
+            gij, gji = g[:Nt], g[Nt:]
+        else:
+            raise Exception('Conductance must be Nt, (Nt, 2) or 2*Nt long')
+        # Off-diagonals are -g, diagonals hold the incoming conductances
+        np.negative(gij, out=A.data[:Nt])
+        np.negative(gji, out=A.data[Nt:2*Nt])
+        A.data[2*Nt:] = np.bincount(conns[:, 1], weights=gij, minlength=Np)
+        A.data[2*Nt:] += np.bincount(conns[:, 0], weights=gji, minlength=Np)
+        return A
+
     def set_outflow_BC(self, pores, mode='merge'):
         r"""
         Adds outflow boundary condition to the selected pores
@@ -1,6 +1,7 @@
 import numpy as np
 import openpnm as op
 import scipy.sparse.linalg
+import threading
 import warnings
 from numpy.linalg import norm
 import scipy.sparse.csgraph as spgr
@@ -15,6 +16,9 @@ from openpnm.utils import logging, Docorator, GenericSettings
 
 docstr = Docorator()
 logger = logging.getLogger(__name__)
+# PyPardiso keeps a single module-level solver (and its factorization), so
+# calls to it from several threads must not overlap
+_pardiso_lock = threading.Lock()
 
 
 @docstr.get_sectionsf('GenericTransportSettings',
@@ -461,16 +465,23 @@ class GenericTransport(GenericAlgorithm):
         if not self.settings['cache_A']:
             self._pure_A = None
         if self._pure_A is None:
-            network = self.project.network
             try:
                 phase = self.project.phases()[self.settings['phase']]
             except KeyError:
                 raise Exception('Phase has not been defined for algorithm')
             g = phase[gvals]
-            am = network.create_adjacency_matrix(weights=g, fmt='coo')
-            self._pure_A = spgr.laplacian(am).astype(float)
+            self._pure_A = self._assemble_A(g)
         self.A = self._pure_A.copy()
 
+    def _assemble_A(self, g):
+        r"""
+        Assembles the coefficient matrix (without BCs) from the given
+        conductances, in COO format.
+        """
+        network = self.project.network
+        am = network.create_adjacency_matrix(weights=g, fmt='coo')
+        return spgr.laplacian(am).astype(float)
+
     def _build_b(self):
         r"""
         Builds the RHS matrix, without applying any boundary conditions or
@@ -635,6 +646,10 @@ class GenericTransport(GenericAlgorithm):
         -----
         The returned object can be called via ``obj.solve(A, b, x0[optional])``
 
+        PyPardiso stores one solver for the whole module, so its solves are
+        serialized by a lock when called from several threads, as done by
+        the algorithms that accept ``n_workers``.
+
         """
         # SciPy
         if self.settings['solver_family'] == 'scipy':
@@ -690,7 +705,8 @@ class GenericTransport(GenericAlgorithm):
                 r"""
                 Wrapper method for PyPardiso sparse linear solver.
                 """
-                x = pypardiso.spsolve(A=A, b=b)
+                with _pardiso_lock:
+                    x = pypardiso.spsolve(A=A, b=b)
                 return x
         else:
             raise Exception(f"{self.settings['solver_family']} not available.")
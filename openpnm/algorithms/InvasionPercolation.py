@@ -1,5 +1,5 @@
-import warnings
 import heapq as hq
+from concurrent.futures import ThreadPoolExecutor
 import scipy as sp
 import numpy as np
 from collections import namedtuple
@@ -100,6 +100,7 @@ class InvasionPercolation(GenericAlgorithm):
         super().__init__(**kwargs)
         self.settings.update(def_set)
         self.settings.update(settings)
+        self.event_log = None
         if phase is not None:
             self.setup(phase=phase)
 
@@ -143,6 +144,9 @@ class InvasionPercolation(GenericAlgorithm):
         self['throat.order'][self['throat.sorted']] = np.arange(0, self.Nt)
         self['throat.invasion_sequence'] = -1
         self['pore.invasion_sequence'] = -1
+        # Throat through which each pore was invaded, kept between runs
+        self._p_inv_t = np.zeros(self.Np, dtype=np.int64)
+        self.event_log = None
 
     def set_inlets(self, pores=[], overwrite=False):
         r"""
@@ -186,7 +190,7 @@ class InvasionPercolation(GenericAlgorithm):
             t_order=self['throat.order'],
             t_inv=self['throat.invasion_sequence'],
             p_inv=self['pore.invasion_sequence'],
-            p_inv_t=np.zeros_like(self['pore.invasion_sequence']),
+            p_inv_t=self._p_inv_t,
             conns=self.project.network['throat.conns'],
             idx=incidence_matrix.indices,
             indptr=incidence_matrix.indptr,
@@ -195,9 +199,106 @@ class InvasionPercolation(GenericAlgorithm):
 
         self['throat.invasion_sequence'] = t_inv
         self['pore.invasion_sequence'] = p_inv
+        self._p_inv_t = p_inv_t
         self['throat.invasion_pressure'] = self['throat.entry_pressure']
         self['pore.invasion_pressure'] = self['throat.entry_pressure'][p_inv_t]
         self['pore.invasion_pressure'][self['pore.invasion_sequence']==0] = 0.0
+        self._update_event_log()
+
+    def _update_event_log(self):
+        r"""
+        Rebuilds ``event_log`` from the current invasion sequences.
+
+        Notes
+        -----
+        The event log is a structured array with one entry per invaded pore
+        or throat, sorted by invasion step, holding the fields ``step``,
+        ``element``, ``type`` (0 for pores and 1 for throats), ``pressure``
+        and ``volume``, the latter being the cumulative invaded volume.
+        Since both the steps and the volumes are sorted, ``results`` and
+        ``get_intrusion_data`` can be answered from it with a binary search
+        instead of re-summing the pore and throat volumes.
+        """
+        net = self.project.network
+        self.event_log = _build_event_log(
+            pseq=self['pore.invasion_sequence'],
+            tseq=self['throat.invasion_sequence'],
+            pvol=net[self.settings['pore_volume']],
+            tvol=net[self.settings['throat_volume']],
+            pPc=self['pore.invasion_pressure'],
+            tPc=self['throat.invasion_pressure'])
+
+    def run_ensemble(self, entry_pressures, inlets, n_workers=1):
+        r"""
+        Runs the invasion for several realizations of the throat entry
+        pressures on the same network.
+
+        Parameters
+        ----------
+        entry_pressures : array_like
+            An array of shape (N, Nt) with one row of throat entry pressures
+            for each of the N realizations (e.g. from different random
+            contact angle distributions).
+        inlets : array_like
+            The inlet pores, which are shared by all realizations.
+        n_workers : int
+            The number of threads used to run the realizations concurrently.
+            The default is 1, which runs them one after another.
+
+        Returns
+        -------
+        A dictionary containing the (N, Np) and (N, Nt) arrays of pore and
+        throat invasion sequences, with one row per realization.
+
+        Notes
+        -----
+        The network topology (i.e. the incidence matrix and the throats
+        connected to the inlets) is only computed once and shared by all
+        realizations, and the compiled kernel releases the GIL, so the
+        realizations run in parallel when ``n_workers`` is larger than 1.
+        This method does not change the data stored on the algorithm.
+
+        """
+        net = self.project.network
+        entry_pressures = np.array(entry_pressures, dtype=float, ndmin=2)
+        if entry_pressures.shape[1] != net.Nt:
+            raise Exception('entry_pressures must have Nt columns')
+        im = net.create_incidence_matrix(fmt='csr')
+        conns = np.ascontiguousarray(net['throat.conns'], dtype=np.int64)
+        idx = np.ascontiguousarray(im.indices, dtype=np.int64)
+        indptr = np.ascontiguousarray(im.indptr, dtype=np.int64)
+        inlets = self._parse_indices(inlets)
+        inlet_Ts = net.find_neighbor_throats(pores=inlets)
+        _get_ip_kernel()
+
+        def _run_one(entry):
+            t_sorted = np.argsort(entry, axis=0)
+            t_order = np.zeros(net.Nt, dtype=np.int64)
+            t_order[t_sorted] = np.arange(0, net.Nt)
+            p_inv = -np.ones(net.Np, dtype=np.int64)
+            p_inv[inlets] = 0
+            t_inv, p_inv, _ = InvasionPercolation._run_accelerated(
+                queue=list(t_order[inlet_Ts]),
+                t_sorted=t_sorted,
+                t_order=t_order,
+                t_inv=-np.ones(net.Nt, dtype=np.int64),
+                p_inv=p_inv,
+                p_inv_t=np.zeros(net.Np, dtype=np.int64),
+                conns=conns,
+                idx=idx,
+                indptr=indptr,
+                n_steps=np.inf
+            )
+            return p_inv, t_inv
+
+        if n_workers > 1:
+            with ThreadPoolExecutor(max_workers=n_workers) as pool:
+                out = list(pool.map(_run_one, entry_pressures))
+        else:
+            out = [_run_one(entry) for entry in entry_pressures]
+        data = {'pore.invasion_sequence': np.vstack([o[0] for o in out]),
+                'throat.invasion_sequence': np.vstack([o[1] for o in out])}
+        return data
 
     def results(self, Snwp=None):
         r"""
@@ -220,6 +321,12 @@ class InvasionPercolation(GenericAlgorithm):
 
         **'throat.occupancy'** : Same as described above but for throats.
 
+        Notes
+        -----
+        The returned configuration is the one after the last invasion step
+        that ends below ``Snwp``.  It is found by a binary search of the
+        cumulative volumes in ``event_log``.
+
         """
         if Snwp is None:
             Np = self['pore.invasion_sequence']
@@ -228,29 +335,24 @@ class InvasionPercolation(GenericAlgorithm):
                     'throat.invasion_sequence': Nt}
         else:
             net = self.project.network
-            P12 = net['throat.conns']
-            # Fetch void volume for pores and throats
             Vp = net[self.settings['pore_volume']]
             Vt = net[self.settings['throat_volume']]
-            # Fetch the order of filling
+            log = self.event_log
+            if log is None:
+                log = np.zeros(0, dtype=_event_log_dtype)
+            S = log['volume']/(Vp.sum() + Vt.sum())
+            # Find the last invasion step that ends below Snwp
+            i = np.searchsorted(S, Snwp, side='left')
+            if i < log.size:
+                N = log['step'][i] - 1
+            elif log.size > 0:
+                N = log['step'][-1]
+            else:
+                N = -1
             Np = self['pore.invasion_sequence']
             Nt = self['throat.invasion_sequence']
-            # Create Nt-long mask of which pores were filled when throat was filled
-            Pinv = (Np[P12].T == Nt).T
-            # If a pore and throat filled together, find combined volume
-            Vinv = np.vstack(((Pinv*Vp[P12]).T, Vt)).T
-            Vinv = np.sum(Vinv, axis=1)
-            # Convert to cumulative volume filled as each throat is invaded
-            x = np.argsort(Nt)  # Find order throats were invaded
-            Vinv_cum = np.cumsum(Vinv[x])
-            # Normalized cumulative volume filled into saturation
-            S = Vinv_cum/(Vp.sum() + Vt.sum())
-            # Find throat invasion step where Snwp was reached
-            try:
-                N = np.where(S < Snwp)[0][-1]
-            except Exception:
-                N = -np.inf
-            data = {'pore.occupancy': Np <= N, 'throat.occupancy': Nt <= N}
+            data = {'pore.occupancy': (Np > -1) * (Np <= N),
+                    'throat.occupancy': (Nt > -1) * (Nt <= N)}
         return data
 
     def apply_trapping(self, outlets):
@@ -278,9 +380,9 @@ class InvasionPercolation(GenericAlgorithm):
         neighbor connected to a sink is touched the trapped cluster stops
         growing as this is the point of trapping in forward invasion time.
 
-        Logger info displays the invasion sequence and pore index and a message
-        with condition number based on the modified trapping rules and the
-        assignment of the pore to a given cluster.
+        The reverse sweep is performed by ``_masson_trapping``, which tracks
+        the merging of trapped clusters with a disjoint-set (union-find)
+        structure so that its cost grows almost linearly with network size.
 
         Initially all invaded pores are given cluster label -1
         Outlets / Sinks are given -2
@@ -310,77 +412,26 @@ class InvasionPercolation(GenericAlgorithm):
         invaded_ps = self['pore.invasion_sequence'] > -1
         if ~np.all(invaded_ps):
             # Put defending phase into clusters
-            clusters = find_clusters(network=net, mask=~invaded_ps)
+            clusters = find_clusters(network=net, mask=~invaded_ps)[0]
             # Identify clusters that are connected to an outlet and set to -2
             # -1 is the invaded fluid
             # -2 is the defender fluid able to escape
             # All others now trapped clusters which grow as invasion is reversed
             out_clusters = np.unique(clusters[outlets])
-            for c in out_clusters:
-                if c >= 0:
-                    clusters[clusters == c] = -2
+            out_clusters = out_clusters[out_clusters >= 0]
+            clusters[np.isin(clusters, out_clusters)] = -2
         else:
             # Go from end
             clusters = np.ones(net.Np, dtype=int)*-1
             clusters[outlets] = -2
 
-        # Turn into a list for indexing
-        inv_seq = np.vstack((self['pore.invasion_sequence'].astype(int),
-                             np.arange(0, net.Np, dtype=int))).T
-        # Reverse sort list
-        inv_seq = inv_seq[inv_seq[:, 0].argsort()][::-1]
-        next_cluster_num = np.max(clusters)+1
-        # For all the steps after the inlets are set up to break-through
-        # Reverse the sequence and assess the neighbors cluster state
-        stopped_clusters = np.zeros(net.Np, dtype=bool)
-        all_neighbors = net.find_neighbor_pores(net.pores(), flatten=False,
-                                                include_input=True)
-        for un_seq, pore in inv_seq:
-            if pore not in outlets and un_seq > 0:  # Skip inlets and outlets
-                nc = clusters[all_neighbors[pore]]  # Neighboring clusters
-                unique_ns = np.unique(nc[nc != -1])  # Unique Neighbors
-                seq_pore = "S:"+str(un_seq)+" P:"+str(pore)
-                if np.all(nc == -1):
-                    # This is the start of a new trapped cluster
-                    clusters[pore] = next_cluster_num
-                    next_cluster_num += 1
-                    msg = (seq_pore+" C:1 new cluster number: "
-                           + str(clusters[pore]))
-                    logger.info(msg)
-                elif len(unique_ns) == 1:
-                    # Grow the only connected neighboring cluster
-                    if not stopped_clusters[unique_ns[0]]:
-                        clusters[pore] = unique_ns[0]
-                        msg = (seq_pore+" C:2 joins cluster number: "
-                               + str(clusters[pore]))
-                        logger.info(msg)
-                    else:
-                        clusters[pore] = -2
-                elif -2 in unique_ns:
-                    # We have reached a sink neighbor, stop growing cluster
-                    msg = (seq_pore+" C:3 joins sink cluster")
-                    logger.info(msg)
-                    clusters[pore] = -2
-                    # Stop growth and merging
-                    stopped_clusters[unique_ns[unique_ns > -1]] = True
-                else:
-                    # We might be able to do some merging
-                    # Check if any stopped clusters are neighbors
-                    if np.any(stopped_clusters[unique_ns]):
-                        msg = (seq_pore+" C:4 joins sink cluster")
-                        logger.info(msg)
-                        clusters[pore] = -2
-                        # Stop growing all neighboring clusters
-                        stopped_clusters[unique_ns] = True
-                    else:
-                        # Merge multiple un-stopped trapped clusters
-                        new_num = unique_ns[0]
-                        clusters[pore] = new_num
-                        for c in unique_ns:
-                            clusters[clusters == c] = new_num
-                            msg = (seq_pore + " C:5 merge clusters: "
-                                   + str(c) + " into "+str(new_num))
-                            logger.info(msg)
+        # Reverse the sequence and assess the neighbors cluster state,
+        # skipping inlets and outlets
+        pseq = self['pore.invasion_sequence']
+        skip = pseq <= 0
+        skip[outlets] = True
+        clusters = _masson_trapping(network=net, clusters=clusters,
+                                    sequence=pseq, skip=skip)
 
         # And now return clusters
         self['pore.clusters'] = clusters
@@ -392,6 +443,8 @@ class InvasionPercolation(GenericAlgorithm):
         self['throat.trapped'][trapped_ts] = True
         self['pore.invasion_sequence'][self['pore.trapped']] = -1
         self['throat.invasion_sequence'][self['throat.trapped']] = -1
+        if 'pore.invasion_pressure' in self.props():
+            self._update_event_log()
 
     def get_intrusion_data(self):
         r"""
@@ -403,31 +456,15 @@ class InvasionPercolation(GenericAlgorithm):
             logger.error('Algorithm must be run first')
             return None
         net = self.project.network
-        pvols = net[self.settings['pore_volume']]
-        tvols = net[self.settings['throat_volume']]
-        tot_vol = np.sum(pvols) + np.sum(tvols)
-        # Normalize
-        pvols /= tot_vol
-        tvols /= tot_vol
-        # Remove trapped volume
-        pvols[self['pore.invasion_sequence'] == -1] = 0.0
-        tvols[self['throat.invasion_sequence'] == -1] = 0.0
-        pseq = self['pore.invasion_sequence']
-        tseq = self['throat.invasion_sequence']
-        tPc = self['throat.invasion_pressure']
-        pPc = self['pore.invasion_pressure']
-        # Change the entry pressure for trapped pores and throats to be 0
-        pPc[self['pore.invasion_sequence'] == -1] = 0.0
-        tPc[self['throat.invasion_sequence'] == -1] = 0.0
-        vols = np.concatenate((pvols, tvols))
-        seqs = np.concatenate((pseq, tseq))
-        Pcs = np.concatenate((pPc, tPc))
-        data = np.rec.fromarrays([seqs, vols, Pcs], formats=['i', 'f', 'f'],
-                                 names=['seq', 'vol', 'Pc'])
-        data.sort(axis=0, order='seq')
-        sat = np.cumsum(data.vol)
+        tot_vol = np.sum(net[self.settings['pore_volume']]) \
+            + np.sum(net[self.settings['throat_volume']])
+        log = self.event_log
+        # Trapped or uninvaded elements are listed first with zero pressure
+        n_zero = self.Np + self.Nt - log.size
+        Pc = np.concatenate((np.zeros(n_zero), log['pressure']))
+        sat = np.concatenate((np.zeros(n_zero), log['volume']/tot_vol))
         pc_curve = namedtuple('pc_curve', ('Pcap', 'S_tot'))
-        data = pc_curve(data.Pc, sat)
+        data = pc_curve(Pc, sat)
         return data
 
     def plot_intrusion_curve(self, fig=None):
@@ -452,10 +489,27 @@ class InvasionPercolation(GenericAlgorithm):
         else:
             return None
 
+    @staticmethod
+    def warm_up():
+        r"""
+        Compiles (or loads from the on-disk cache) the numba kernel used by
+        ``run``.
+
+        Notes
+        -----
+        The kernel is compiled lazily on the first call to ``run``, which can
+        take a few seconds.  When running many small simulations in separate
+        worker processes, calling this method once when each worker starts
+        moves that cost out of the first simulation.  Since the kernel is
+        cached on disk, only the very first worker actually compiles it.
+
+        """
+        _get_ip_kernel()
+
     def _run_accelerated(queue, t_sorted, t_order, t_inv, p_inv, p_inv_t,
                          conns, idx, indptr, n_steps):
         r"""
-        Numba-jitted run method for InvasionPercolation class.
+        Runs the numba-jitted invasion kernel for InvasionPercolation class.
 
         Notes
         -----
@@ -465,48 +519,281 @@ class InvasionPercolation(GenericAlgorithm):
         (2) Numba doesn't like forein data types (i.e. GenericNetwork), and so
         ``find_neighbor_throats`` method cannot be called in a jitted method.
 
-        (3) Nested wrapper is for performance issues (reduced OpenPNM import)
-        time due to local numba import
+        (3) All arrays are cast to int64 so that the kernel can be compiled
+        once with an explicit signature and cached on disk.  ``queue`` is
+        updated in-place so that subsequent calls to ``run`` resume from
+        where the previous one stopped.
 
         """
-        from numba import njit
-        try:
-            from numba.core.errors import NumbaPendingDeprecationWarning
-        except ModuleNotFoundError:
-            from numba.errors import NumbaPendingDeprecationWarning
-        warnings.simplefilter('ignore', category=NumbaPendingDeprecationWarning)
-
-        @njit
-        def wrapper(queue, t_sorted, t_order, t_inv, p_inv, p_inv_t, conns,
-                    idx, indptr, n_steps):
-            count = 0
-            while (len(queue) > 0) and (count < n_steps):
-                # Find throat at the top of the queue
-                t = hq.heappop(queue)
-                # Extract actual throat number
-                t_next = t_sorted[t]
-                t_inv[t_next] = count
-                # If throat is duplicated
-                while len(queue) > 0 and queue[0] == t:
-                    # Note: Preventing duplicate entries below might save some time
-                    t = hq.heappop(queue)
-                # Find pores connected to newly invaded throat
-                Ps = conns[t_next]
-                # Remove already invaded pores from Ps
-                Ps = Ps[p_inv[Ps] < 0]
-                if len(Ps) > 0:
-                    p_inv[Ps] = count
-                    p_inv_t[Ps] = t_next
-                    for i in Ps:
-                        Ts = idx[indptr[i]:indptr[i+1]]
-                        Ts = Ts[t_inv[Ts] < 0]
-                    for i in set(Ts):   # set(Ts) to exclude repeated neighbor throats
-                        hq.heappush(queue, t_order[i])
-                count += 1
-            return t_inv, p_inv, p_inv_t
-
-        return wrapper(queue, t_sorted, t_order, t_inv, p_inv, p_inv_t, conns,
-                       idx, indptr, n_steps)
+        kernel = _get_ip_kernel()
+        n_steps = np.iinfo(np.int64).max if np.isinf(n_steps) else n_steps
+        t_inv = np.ascontiguousarray(t_inv, dtype=np.int64)
+        p_inv = np.ascontiguousarray(p_inv, dtype=np.int64)
+        p_inv_t = np.ascontiguousarray(p_inv_t, dtype=np.int64)
+        q = kernel(np.array(queue, dtype=np.int64),
+                   np.ascontiguousarray(t_sorted, dtype=np.int64),
+                   np.ascontiguousarray(t_order, dtype=np.int64),
+                   t_inv, p_inv, p_inv_t,
+                   np.ascontiguousarray(conns, dtype=np.int64),
+                   np.ascontiguousarray(idx, dtype=np.int64),
+                   np.ascontiguousarray(indptr, dtype=np.int64),
+                   int(n_steps))
+        queue[:] = q.tolist()
+        return t_inv, p_inv, p_inv_t
+
+
+def _ip_kernel(queue, t_sorted, t_order, t_inv, p_inv, p_inv_t, conns,
+               idx, indptr, n_steps):
+    r"""
+    Pure python version of the invasion loop, which is compiled by numba in
+    ``_get_ip_kernel``.  Returns the heap left over after ``n_steps``.
+    """
+    queue = list(queue)
+    hq.heapify(queue)
+    # Continue the sequence numbering if resuming a previous run
+    count = max(t_inv.max() + 1, 0)
+    step = 0
+    while (len(queue) > 0) and (step < n_steps):
+        # Find throat at the top of the queue
+        t = hq.heappop(queue)
+        # Extract actual throat number
+        t_next = t_sorted[t]
+        t_inv[t_next] = count
+        # If throat is duplicated
+        while len(queue) > 0 and queue[0] == t:
+            # Note: Preventing duplicate entries below might save some time
+            t = hq.heappop(queue)
+        # Find pores connected to newly invaded throat
+        Ps = conns[t_next]
+        # Remove already invaded pores from Ps
+        Ps = Ps[p_inv[Ps] < 0]
+        if len(Ps) > 0:
+            p_inv[Ps] = count
+            p_inv_t[Ps] = t_next
+            for i in Ps:
+                Ts = idx[indptr[i]:indptr[i+1]]
+                Ts = Ts[t_inv[Ts] < 0]
+                for j in set(Ts):   # set(Ts) to exclude repeated neighbor throats
+                    hq.heappush(queue, t_order[j])
+        count += 1
+        step += 1
+    return np.array(queue, dtype=np.int64)
+
+
+_compiled_ip_kernel = None
+
+
+def _get_ip_kernel():
+    r"""
+    Returns the compiled invasion kernel, compiling it on first use.
+
+    Notes
+    -----
+    Numba is imported and the kernel compiled here rather than at module
+    level to keep OpenPNM's import time down.  The kernel is compiled with an
+    explicit signature and ``cache=True``, so it is only compiled once per
+    machine and is loaded from the cache in later sessions.  It releases the
+    GIL so that ``run_ensemble`` can run realizations in threads.
+    """
+    global _compiled_ip_kernel
+    if _compiled_ip_kernel is None:
+        from numba import njit, int64
+        i1d = int64[::1]
+        sig = i1d(i1d, i1d, i1d, i1d, i1d, i1d, int64[:, ::1], i1d, i1d, int64)
+        _compiled_ip_kernel = njit(sig, cache=True, nogil=True)(_ip_kernel)
+    return _compiled_ip_kernel
+
+
+def _build_event_log(pseq, tseq, pvol, tvol, pPc=None, tPc=None):
+    r"""
+    Returns the invasion events of all invaded pores and throats as a
+    structured array sorted by invasion step.
+
+    Parameters
+    ----------
+    pseq, tseq : ndarray
+        The pore and throat invasion sequences, with -1 marking elements
+        that were not invaded (or trapped), which are left out of the log.
+    pvol, tvol : ndarray
+        The pore and throat volumes.
+    pPc, tPc : ndarray, optional
+        The pore and throat invasion pressures.  If not given the
+        ``pressure`` field is filled with NaNs.
+
+    Returns
+    -------
+    A structured array with one entry per invaded element and the fields
+    ``step`` (the invasion sequence), ``element`` (the pore or throat
+    index), ``type`` (0 for pores and 1 for throats), ``pressure`` and
+    ``volume``, which is the cumulative invaded volume up to and including
+    that entry.  Within a step the throat is listed after the pores.
+
+    """
+    Ps = np.where(pseq >= 0)[0]
+    Ts = np.where(tseq >= 0)[0]
+    log = np.zeros(Ps.size + Ts.size, dtype=_event_log_dtype)
+    steps = np.concatenate((pseq[Ps], tseq[Ts]))
+    types = np.concatenate((np.zeros(Ps.size, dtype=np.int8),
+                            np.ones(Ts.size, dtype=np.int8)))
+    order = np.lexsort((types, steps))
+    log['step'] = steps[order]
+    log['element'] = np.concatenate((Ps, Ts))[order]
+    log['type'] = types[order]
+    if (pPc is None) or (tPc is None):
+        log['pressure'] = np.nan
+    else:
+        log['pressure'] = np.concatenate((pPc[Ps], tPc[Ts]))[order]
+    vols = np.concatenate((pvol[Ps], tvol[Ts]))[order]
+    log['volume'] = np.cumsum(vols)
+    return log
+
+
+_event_log_dtype = np.dtype([('step', np.int64), ('element', np.int64),
+                             ('type', np.int8), ('pressure', np.float64),
+                             ('volume', np.float64)])
+
+
+def _masson_trapping(network, clusters, sequence, skip):
+    r"""
+    Performs the reverse sweep of Masson's trapping algorithm, which is
+    shared by ``InvasionPercolation`` and ``MixedInvasionPercolation``.
+
+    Parameters
+    ----------
+    network : OpenPNM Network object
+        The network on which the invasion was performed.
+    clusters : ndarray
+        Np-long array with -1 for the invaded pores, -2 for the pores that
+        are connected to a sink and the trapped cluster numbers (0 and up)
+        for pores that were never invaded.
+    sequence : ndarray
+        The pore invasion sequence, which is walked in reverse.
+    skip : ndarray
+        Np-long boolean mask of pores to leave untouched (e.g. inlets and
+        outlets).
+
+    Returns
+    -------
+    clusters : ndarray
+        The updated cluster numbers, where any number greater than -1 is a
+        trapped cluster.
+
+    Notes
+    -----
+    Cluster merges are recorded in a disjoint-set forest rather than by
+    relabeling the whole ``clusters`` array, and the surviving label of a
+    merge is always the smallest one, so the result is identical to the
+    original pore-by-pore implementation.
+
+    """
+    am = network.create_adjacency_matrix(fmt='csr')
+    # Same (unstable) reverse ordering as the original implementation
+    inv_seq = np.vstack((np.array(sequence, dtype=int),
+                         np.arange(0, network.Np, dtype=int))).T
+    order = inv_seq[inv_seq[:, 0].argsort()][::-1][:, 1]
+    kernel = _get_trapping_kernel()
+    clusters = np.array(clusters, dtype=np.int64)
+    return kernel(clusters,
+                  np.ascontiguousarray(order, dtype=np.int64),
+                  np.ascontiguousarray(skip, dtype=bool),
+                  np.ascontiguousarray(am.indptr, dtype=np.int64),
+                  np.ascontiguousarray(am.indices, dtype=np.int64),
+                  np.int64(max(clusters.max() + 1, 0)))
+
+
+def _trapping_kernel(clusters, order, skip, indptr, indices, next_label):
+    r"""
+    Pure python version of the reverse trapping sweep, which is compiled by
+    numba in ``_get_trapping_kernel``.
+    """
+    parent = np.arange(next_label + len(order))
+    stopped = np.zeros(next_label + len(order), dtype=np.bool_)
+    roots = np.empty(indptr.size, dtype=np.int64)
+
+    for pore in order:
+        if skip[pore]:
+            continue
+        # Collect the unique neighboring clusters, and whether a sink is one
+        n_roots = 0
+        sink = False
+        for k in range(indptr[pore], indptr[pore+1]):
+            c = clusters[indices[k]]
+            if c == -2:
+                sink = True
+            elif c >= 0:
+                # Find the root of the cluster, halving the path on the way
+                r = c
+                while parent[r] != r:
+                    parent[r] = parent[parent[r]]
+                    r = parent[r]
+                new = True
+                for m in range(n_roots):
+                    if roots[m] == r:
+                        new = False
+                        break
+                if new:
+                    roots[n_roots] = r
+                    n_roots += 1
+        if (n_roots == 0) and not sink:
+            # This is the start of a new trapped cluster
+            clusters[pore] = next_label
+            next_label += 1
+        elif n_roots == 0:
+            # Only the sink is a neighbor
+            clusters[pore] = -2
+        elif (n_roots == 1) and not sink:
+            # Grow the only connected neighboring cluster
+            if stopped[roots[0]]:
+                clusters[pore] = -2
+            else:
+                clusters[pore] = roots[0]
+        elif sink:
+            # We have reached a sink neighbor, stop growth and merging
+            clusters[pore] = -2
+            for m in range(n_roots):
+                stopped[roots[m]] = True
+        else:
+            any_stopped = False
+            for m in range(n_roots):
+                if stopped[roots[m]]:
+                    any_stopped = True
+            if any_stopped:
+                # Joins the sink, so stop growing all neighboring clusters
+                clusters[pore] = -2
+                for m in range(n_roots):
+                    stopped[roots[m]] = True
+            else:
+                # Merge multiple un-stopped trapped clusters into the lowest
+                new_num = roots[0]
+                for m in range(1, n_roots):
+                    new_num = min(new_num, roots[m])
+                for m in range(n_roots):
+                    parent[roots[m]] = new_num
+                clusters[pore] = new_num
+    # Resolve the final cluster number of every trapped pore
+    for i in range(clusters.size):
+        r = clusters[i]
+        if r >= 0:
+            while parent[r] != r:
+                r = parent[r]
+            clusters[i] = r
+    return clusters
+
+
+_compiled_trapping_kernel = None
+
+
+def _get_trapping_kernel():
+    r"""
+    Returns the compiled trapping kernel, compiling it on first use.
+    """
+    global _compiled_trapping_kernel
+    if _compiled_trapping_kernel is None:
+        from numba import njit, int64, boolean
+        i1d = int64[::1]
+        sig = i1d(i1d, i1d, boolean[::1], i1d, i1d, int64)
+        _compiled_trapping_kernel = njit(sig, cache=True)(_trapping_kernel)
+    return _compiled_trapping_kernel
 
 
 if __name__ == '__main__':
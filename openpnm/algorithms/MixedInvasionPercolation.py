@@ -11,6 +11,8 @@ import scipy as sp
 import numpy as np
 from collections import namedtuple
 from openpnm.algorithms import GenericAlgorithm
+from openpnm.algorithms.InvasionPercolation import _masson_trapping
+from openpnm.algorithms.OrdinaryPercolation import _cumulative_volume
 from openpnm.topotools import find_clusters, site_percolation
 
 logger = logging.getLogger(__name__)
@@ -330,9 +332,19 @@ class MixedInvasionPercolation(GenericAlgorithm):
         else:
             # created by set_residual
             pass
+        coop = self.settings["cooperative_pore_filling"] and hasattr(self, "tt_Pc")
+        if not coop:
+            # Cooperative filling pushes to the queues from python, so only
+            # the pure pore/throat invasion can be compiled
+            self._run_accelerated()
+            return
         while np.any(self.invasion_running) and not np.all(self.max_p_reached):
             # Loop over clusters
             for c_num in np.argwhere(self.invasion_running).flatten():
+                if len(self.queue[c_num]) == 0:
+                    # The cluster was merged into another earlier in the sweep
+                    self.invasion_running[c_num] = False
+                    continue
                 self._invade_cluster(c_num)
                 queue = self.queue[c_num]
                 if len(queue) == 0 or self.max_p_reached[c_num]:
@@ -357,6 +369,77 @@ class MixedInvasionPercolation(GenericAlgorithm):
                                 + str(self.count)
                             )
 
+    def _run_accelerated(self):
+        r"""
+        Runs the invasion of all clusters using the numba-jitted kernel.
+
+        Notes
+        -----
+        The cluster queues are converted to array-backed binary heaps, with
+        each entry encoded as ``(pressure, 2*index + is_throat)``, which
+        orders exactly like the ``[pressure, index, type]`` lists used by the
+        pure python implementation.  When clusters merge the live entries of
+        one heap are pushed into the other without popping them one by one.
+        Afterwards the heaps are converted back into the list-based queues so
+        that ``run`` can be called again.
+
+        """
+        from numba.typed import List
+
+        net = self.project.network
+        conns = net["throat.conns"]
+        im = net.create_incidence_matrix(fmt="csr")
+        tcp = self["throat.entry_pressure"]
+        if not self._bidirectional:
+            tcp = np.vstack((tcp, tcp)).T
+        pcs, codes = List(), List()
+        sizes = np.zeros(len(self.queue), dtype=np.int64)
+        for i, queue in enumerate(self.queue):
+            pcs.append(np.array([e[0] for e in queue] + [0.0], dtype=float))
+            code = [2 * int(e[1]) + (e[2] == "throat") for e in queue]
+            codes.append(np.array(code + [0], dtype=np.int64))
+            sizes[i] = len(queue)
+        # Throats which _invade_isolated_Ts must consider before the first step
+        p_inv = self["pore.invasion_sequence"] > -1
+        cands = np.where(np.all(p_inv[conns], axis=1)
+                         * (self["throat.invasion_sequence"] == -1))[0]
+        running = np.array(self.invasion_running, dtype=bool)
+        max_p_reached = np.array(self.max_p_reached, dtype=bool)
+        arrays = {}
+        for item in ["invasion_sequence", "cluster", "invasion_pressure"]:
+            for elem in ["pore", "throat"]:
+                dtype = float if item == "invasion_pressure" else np.int64
+                arrays[elem + "." + item] = \
+                    np.ascontiguousarray(self[elem + "." + item], dtype=dtype)
+        kernel = _get_mixed_ip_kernel()
+        self.count = kernel(
+            pcs, codes, sizes,
+            np.ascontiguousarray(conns, dtype=np.int64),
+            np.ascontiguousarray(im.indptr, dtype=np.int64),
+            np.ascontiguousarray(im.indices, dtype=np.int64),
+            np.ascontiguousarray(self["pore.entry_pressure"], dtype=float),
+            np.ascontiguousarray(tcp, dtype=float),
+            arrays["pore.invasion_sequence"], arrays["throat.invasion_sequence"],
+            arrays["pore.cluster"], arrays["throat.cluster"],
+            arrays["pore.invasion_pressure"], arrays["throat.invasion_pressure"],
+            self._interface_Ps, self._interface_Ts, running, max_p_reached,
+            self.high_Pc, np.where(self["pore.outlets"])[0].astype(np.int64),
+            float(self.max_pressure), np.int64(self.count),
+            bool(self.settings["invade_isolated_Ts"]),
+            np.ascontiguousarray(cands, dtype=np.int64),
+        )
+        for key, vals in arrays.items():
+            self[key] = vals
+        # Put the remaining entries back into the list-based heaps
+        types = ["pore", "throat"]
+        for i in range(len(self.queue)):
+            pc, code = pcs[i][: sizes[i]], codes[i][: sizes[i]]
+            self.queue[i] = [
+                [p, c >> 1, types[c & 1]] for p, c in zip(pc.tolist(), code.tolist())
+            ]
+        self.invasion_running = running.tolist()
+        self.max_p_reached = max_p_reached.tolist()
+
     def _invade_cluster(self, c_num):
         queue = self.queue[c_num]
         pressure, elem_id, elem_type = hq.heappop(queue)
@@ -536,13 +619,23 @@ class MixedInvasionPercolation(GenericAlgorithm):
             mask = ~np.isnan(self["throat.invasion_pressure"])
             ok_Pc = self["throat.invasion_pressure"][mask]
             inv_points = np.unique(ok_Pc)
-        sat_p = np.zeros(len(inv_points))
-        sat_t = np.zeros(len(inv_points))
-
-        for i, Pc in enumerate(inv_points):
-            res = self.results(Pc=Pc)
-            sat_p[i] = np.sum(res["pore.occupancy"])
-            sat_t[i] = np.sum(res["throat.occupancy"])
+        if self.settings["late_pore_filling"] or \
+                self.settings["late_throat_filling"]:
+            # Filling depends on Pc, so results must be found point by point
+            sat_p = np.zeros(len(inv_points))
+            sat_t = np.zeros(len(inv_points))
+            for i, Pc in enumerate(inv_points):
+                res = self.results(Pc=Pc)
+                sat_p[i] = np.sum(res["pore.occupancy"])
+                sat_t[i] = np.sum(res["throat.occupancy"])
+        else:
+            # Move the pressure of trapped pores and throats up, as in results
+            inv_p = self["pore.invasion_pressure"].astype(float)
+            inv_p[self["pore.invasion_sequence"] == -1] = np.inf
+            inv_t = self["throat.invasion_pressure"].astype(float)
+            inv_t[self["throat.invasion_sequence"] == -1] = np.inf
+            sat_p = _cumulative_volume(inv_p, net["pore.volume"], inv_points)
+            sat_t = _cumulative_volume(inv_t, net["throat.volume"], inv_points)
 
         pvol = np.sum(net["pore.volume"])
         tvol = np.sum(net["throat.volume"])
@@ -607,9 +700,9 @@ class MixedInvasionPercolation(GenericAlgorithm):
           trapped cluster stops growing as this is the point of trapping in
           forward invasion time.
 
-        Logger info displays the invasion Sequence and pore index and a message
-        with condition number based on the modified trapping rules and the
-        assignment of the pore to a given cluster.
+        The reverse sweep is shared with ``InvasionPercolation`` and uses a
+        disjoint-set (union-find) structure to merge trapped clusters, so its
+        cost grows almost linearly with network size.
 
         Initially all invaded pores are given cluster label -1
         Outlets / Sinks are given -2
@@ -641,90 +734,27 @@ class MixedInvasionPercolation(GenericAlgorithm):
             # Set occupancy
             invaded_ps = self["pore.invasion_sequence"] > -1
             # Put defending phase into clusters
-            clusters = find_clusters(network=net, pmask=~invaded_ps)
+            clusters = find_clusters(network=net, mask=~invaded_ps)[0]
             # Identify clusters that are connected to an outlet and set to -2
             # -1 is the invaded fluid
             # -2 is the defender fluid able to escape
             # All others now trapped clusters which grow as invasion is
             # reversed
             out_clusters = np.unique(clusters[outlets])
-            for c in out_clusters:
-                if c >= 0:
-                    clusters[clusters == c] = -2
+            out_clusters = out_clusters[out_clusters >= 0]
+            clusters[np.isin(clusters, out_clusters)] = -2
         else:
             # Go from end
             clusters = np.ones(net.Np, dtype=int) * -1
             clusters[outlets] = -2
 
-        # Turn into a list for indexing
-        inv_seq = np.vstack(
-            (
-                self["pore.invasion_sequence"].astype(int),
-                np.arange(0, net.Np, dtype=int),
-            )
-        ).T
-        # Reverse sort list
-        inv_seq = inv_seq[inv_seq[:, 0].argsort()][::-1]
-        next_cluster_num = np.max(clusters) + 1
-        # For all the steps after the inlets are set up to break-through
-        # Reverse the sequence and assess the neighbors cluster state
-        stopped_clusters = np.zeros(net.Np, dtype=bool)
-        all_neighbors = net.find_neighbor_pores(
-            net.pores(), flatten=False, include_input=True
+        # Reverse the sequence and assess the neighbors cluster state,
+        # skipping the outlets
+        pseq = self["pore.invasion_sequence"]
+        skip = outlets | (pseq < 0)
+        clusters = _masson_trapping(
+            network=net, clusters=clusters, sequence=pseq, skip=skip
         )
-        for un_seq, pore in inv_seq:
-            if ~outlets[pore] and un_seq > -1:  # Don't include outlets
-                nc = clusters[all_neighbors[pore]]  # Neighboring clusters
-                unique_ns = np.unique(nc[nc != -1])  # Unique Neighbors
-                seq_pore = "S:" + str(un_seq) + " P:" + str(pore)
-                if np.all(nc == -1):
-                    # This is the start of a new trapped cluster
-                    clusters[pore] = next_cluster_num
-                    next_cluster_num += 1
-                    msg = seq_pore + " C:1 new cluster number: " + str(clusters[pore])
-                    logger.info(msg)
-                elif len(unique_ns) == 1:
-                    # Grow the only connected neighboring cluster
-                    if not stopped_clusters[unique_ns[0]]:
-                        clusters[pore] = unique_ns[0]
-                        msg = (
-                            seq_pore
-                            + " C:2 joins cluster number: "
-                            + str(clusters[pore])
-                        )
-                        logger.info(msg)
-                    else:
-                        clusters[pore] = -2
-                elif -2 in unique_ns:
-                    # We have reached a sink neighbor, stop growing cluster
-                    msg = seq_pore + " C:3 joins sink cluster"
-                    logger.info(msg)
-                    clusters[pore] = -2
-                    # Stop growth and merging
-                    stopped_clusters[unique_ns[unique_ns > -1]] = True
-                else:
-                    # We might be able to do some merging
-                    # Check if any stopped clusters are neighbors
-                    if np.any(stopped_clusters[unique_ns]):
-                        msg = seq_pore + " C:4 joins sink cluster"
-                        logger.info(msg)
-                        clusters[pore] = -2
-                        # Stop growing all neighboring clusters
-                        stopped_clusters[unique_ns] = True
-                    else:
-                        # Merge multiple un-stopped trapped clusters
-                        new_num = unique_ns[0]
-                        clusters[pore] = new_num
-                        for c in unique_ns:
-                            clusters[clusters == c] = new_num
-                            msg = (
-                                seq_pore
-                                + " C:5 merge clusters: "
-                                + str(c)
-                                + " into "
-                                + str(new_num)
-                            )
-                            logger.info(msg)
 
         # And now return clusters
         clusters[outlets] = -2
@@ -735,10 +765,9 @@ class MixedInvasionPercolation(GenericAlgorithm):
             num_tPs = np.sum(self["pore.trapped"])
             logger.info("Number of trapped pores: " + str(num_tPs))
             self["pore.invasion_sequence"][self["pore.trapped"]] = -1
-            self["throat.trapped"] = np.zeros([net.Nt], dtype=bool)
-            for c in np.unique(clusters[clusters >= 0]):
-                c_ts = net.find_neighbor_throats(clusters == c, mode="xnor")
-                self["throat.trapped"][c_ts] = True
+            # Throats with both pores in the same trapped cluster
+            c1, c2 = clusters[net["throat.conns"]].T
+            self["throat.trapped"] = (c1 == c2) & (c1 >= 0)
             num_tTs = np.sum(self["throat.trapped"])
             logger.info("Number of trapped throats: " + str(num_tTs))
             self["throat.invasion_sequence"][self["throat.trapped"]] = -1
@@ -883,3 +912,170 @@ class MixedInvasionPercolation(GenericAlgorithm):
         Not implemented in this class
         """
         pass
+
+
+def _mixed_ip_kernel(pcs, codes, sizes, conns, indptr, indices, p_entry,
+                     t_entry, p_seq, t_seq, p_clu, t_clu, p_pc, t_pc, p_int,
+                     t_int, running, max_p_reached, high_Pc, outlets,
+                     max_pressure, count, invade_isolated_Ts, cands):
+    r"""
+    Pure python version of ``MixedInvasionPercolation.run``, which is compiled
+    by numba in ``_get_mixed_ip_kernel``.  Each cluster has a binary heap of
+    ``(pressure, code)`` entries stored in ``pcs[c]`` and ``codes[c]``, where
+    ``code`` is ``2*index`` for pores and ``2*index + 1`` for throats.
+    """
+
+    def push(c, pc, code):
+        n = sizes[c]
+        if n == pcs[c].size:
+            new_pc = np.empty(2 * n, dtype=np.float64)
+            new_pc[:n] = pcs[c]
+            pcs[c] = new_pc
+            new_code = np.empty(2 * n, dtype=np.int64)
+            new_code[:n] = codes[c]
+            codes[c] = new_code
+        hp, hc = pcs[c], codes[c]
+        # Sift the new entry up
+        while n > 0:
+            parent = (n - 1) >> 1
+            if (pc < hp[parent]) or (pc == hp[parent] and code < hc[parent]):
+                hp[n], hc[n] = hp[parent], hc[parent]
+                n = parent
+            else:
+                break
+        hp[n], hc[n] = pc, code
+        sizes[c] += 1
+
+    def pop(c):
+        hp, hc = pcs[c], codes[c]
+        top_pc, top_code = hp[0], hc[0]
+        sizes[c] -= 1
+        n = sizes[c]
+        pc, code = hp[n], hc[n]
+        # Sift the last entry down from the root
+        i = 0
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n:
+                if (hp[child + 1] < hp[child]) or (
+                        hp[child + 1] == hp[child] and hc[child + 1] < hc[child]):
+                    child += 1
+            if (hp[child] < pc) or (hp[child] == pc and hc[child] < code):
+                hp[i], hc[i] = hp[child], hc[child]
+                i = child
+            else:
+                break
+        if n > 0:
+            hp[i], hc[i] = pc, code
+        return top_pc, top_code
+
+    Nt = conns.shape[0]
+    stack = np.empty(cands.size + 2 * Nt + 1, dtype=np.int64)
+    n_stack = cands.size
+    stack[:n_stack] = cands
+    n_clusters = sizes.size
+    while np.any(running) and not np.all(max_p_reached):
+        # Loop over the clusters which were running at the start of the sweep
+        todo = np.where(running)[0]
+        for c in todo:
+            if sizes[c] == 0:
+                running[c] = False
+                continue
+            pc, code = pop(c)
+            elem = code >> 1
+            is_throat = (code & 1) == 1
+            if is_throat:
+                t_int[elem] = False
+            else:
+                p_int[elem] = False
+            if pc > max_pressure:
+                max_p_reached[c] = True
+            else:
+                elem_cluster = t_clu[elem] if is_throat else p_clu[elem]
+                if elem_cluster == -1:
+                    count += 1
+                    # Record highest Pc cluster has reached
+                    if high_Pc[c] < pc:
+                        high_Pc[c] = pc
+                    if is_throat:
+                        t_seq[elem] = count
+                        t_clu[elem] = c
+                        t_pc[elem] = high_Pc[c]
+                        # Add the uninvaded pores of the throat to the queue
+                        for k in range(2):
+                            P = conns[elem, k]
+                            if p_seq[P] <= 0:
+                                p_int[P] = True
+                                push(c, p_entry[P], 2 * P)
+                    else:
+                        p_seq[elem] = count
+                        p_clu[elem] = c
+                        p_pc[elem] = high_Pc[c]
+                        # Add the uninvaded throats of the pore to the queue
+                        for k in range(indptr[elem], indptr[elem + 1]):
+                            T = indices[k]
+                            stack[n_stack] = T
+                            n_stack += 1
+                            if t_seq[T] <= 0:
+                                t_int[T] = True
+                                # Entry pressure in the direction of invasion
+                                d = 0 if conns[T, 0] != elem else 1
+                                push(c, t_entry[T, d], 2 * T + 1)
+                elif (elem_cluster != c) and (running[elem_cluster]
+                                              or sizes[elem_cluster] > 0):
+                    # Merge the clusters, keeping only uninvaded elements
+                    other = elem_cluster
+                    hp, hc = pcs[other], codes[other]
+                    for i in range(sizes[other]):
+                        e = hc[i] >> 1
+                        if (hc[i] & 1) == 1:
+                            live = t_seq[e] == -1
+                        else:
+                            live = p_seq[e] == -1
+                        if live:
+                            push(c, hp[i], hc[i])
+                    sizes[other] = 0
+                    running[other] = False
+            if sizes[c] == 0 or max_p_reached[c]:
+                running[c] = False
+        if invade_isolated_Ts:
+            # Uninvaded throats between invaded pores take the pressure,
+            # sequence and cluster of their last invaded pore
+            for k in range(n_stack):
+                T = stack[k]
+                P1, P2 = conns[T, 0], conns[T, 1]
+                if (t_seq[T] == -1) and (p_seq[P1] > -1) and (p_seq[P2] > -1):
+                    P = P2 if p_seq[P2] > p_seq[P1] else P1
+                    t_pc[T] = p_pc[P]
+                    t_seq[T] = p_seq[P]
+                    t_clu[T] = p_clu[P]
+        n_stack = 0
+        # Stop clusters which have reached an outlet
+        for P in outlets:
+            tc = p_clu[P]
+            if (tc >= 0) and (tc < n_clusters):
+                running[tc] = False
+    return count
+
+
+_compiled_mixed_ip_kernel = None
+
+
+def _get_mixed_ip_kernel():
+    r"""
+    Returns the compiled MixedInvasionPercolation kernel, compiling it on
+    first use.
+    """
+    global _compiled_mixed_ip_kernel
+    if _compiled_mixed_ip_kernel is None:
+        from numba import njit, int64, float64, boolean
+        from numba.types import ListType
+        i1d, f1d, b1d = int64[::1], float64[::1], boolean[::1]
+        sig = int64(ListType(f1d), ListType(i1d), i1d, int64[:, ::1], i1d,
+                    i1d, f1d, float64[:, ::1], i1d, i1d, i1d, i1d, f1d, f1d,
+                    b1d, b1d, b1d, b1d, f1d, i1d, float64, int64, boolean,
+                    i1d)
+        _compiled_mixed_ip_kernel = njit(sig, cache=True)(_mixed_ip_kernel)
+    return _compiled_mixed_ip_kernel
@@ -11,7 +11,7 @@ import logging
 import heapq as hq
 import scipy as sp
 import numpy as np
-from scipy.sparse import coo_matrix, dok_matrix
+from scipy.sparse import coo_matrix, csr_matrix
 from openpnm.algorithms import MixedInvasionPercolation
 from transforms3d._gohlketransforms import angle_between_vectors
 
@@ -177,51 +177,27 @@ class MixedInvasionPercolationCoop(MixedInvasionPercolation):
         throats that connect to the same pore
         """
         network = self.project.network
-        # Collect all throat pairs sharing a pore as list of lists
-        neighbor_Ts = network.find_neighbor_throats(
-            pores=network.pores(), flatten=False
-        )
-        # Pores associated to throat
-        Ps = []
-        # Throats connected to each pore
-        Ts = []
-        # Pairs of throats sharing a pore
-        T1 = []
-        T2 = []
-        start = 0
-        # Build lookup pair index arrays for each coordination number up to the
-        # Maximum coordination max_c
-        max_c = np.amax(network.num_neighbors(pores=network.Ps, flatten=False))
-        pair_T1 = []
-        pair_T2 = []
-        logger.info("Building throat pair matrices")
-        for num_t in range(max_c + 1):
-            temp1 = []
-            temp2 = []
-            for t1 in range(num_t)[:-1]:
-                for t2 in range(num_t)[t1 + 1 :]:
-                    temp1.append(t1)
-                    temp2.append(t2)
-            pair_T1.append(np.asarray(temp1))
-            pair_T2.append(np.asarray(temp2))
-        for p, nTs in enumerate(neighbor_Ts):
-            num_t = len(nTs)
-            for i in range(num_t):
-                Ps.append(p)
-                Ts.append(nTs[i])
-            # Pair indices into Ts
-            tempt1 = pair_T1[num_t] + start
-            tempt2 = pair_T2[num_t] + start
-            for i in range(len(tempt1)):
-                T1.append(tempt1[i])
-                T2.append(tempt2[i])
-            start += num_t
+        # Throats connected to each pore, in ascending order, from the CSR
+        # incidence matrix
+        im = network.create_incidence_matrix(fmt="csr")
+        im.sort_indices()
+        num_t = np.diff(im.indptr)
         # Nt * 2 long
-        Ps = np.asarray(Ps)
-        Ts = np.asarray(Ts)
-        # indices into the above arrays based on throat pairs
-        T1 = np.asarray(T1)
-        T2 = np.asarray(T2)
+        Ps = np.repeat(np.arange(network.Np), num_t)
+        Ts = im.indices.astype(int)
+        # Indices into the above arrays based on throat pairs, ordered by
+        # pore, then first throat, then second throat
+        num_pairs = num_t * (num_t - 1) // 2
+        pair_start = np.concatenate(([0], np.cumsum(num_pairs)))
+        T1 = np.zeros(pair_start[-1], dtype=int)
+        T2 = np.zeros(pair_start[-1], dtype=int)
+        logger.info("Building throat pair matrices")
+        for n in np.unique(num_t[num_t > 1]):
+            pores = np.where(num_t == n)[0]
+            t1, t2 = np.triu_indices(n, k=1)
+            locs = pair_start[pores][:, np.newaxis] + np.arange(t1.size)
+            T1[locs] = im.indptr[pores][:, np.newaxis] + t1
+            T2[locs] = im.indptr[pores][:, np.newaxis] + t2
 
         return Ps, Ts, T1, T2
 
@@ -238,57 +214,33 @@ class MixedInvasionPercolationCoop(MixedInvasionPercolation):
         coords = t_cen + c3 * t_norm
         return coords
 
-    def _transform_point_normal(self, point, normal):
+    def _plane_intersect_v(self, a, b):
         r"""
-        Transforms point normal plane definition to parametric form
-        Ax + By +Cz + D = 0
-        """
-        return [
-            a
-            for a in zip(
-                normal[:, 0], normal[:, 1], normal[:, 2], -self._my_dot(point, normal)
-            )
-        ]
-
-    def _plane_intersect(self, a, b):
-        """
-        a, b   4-tuples/lists
-               Ax + By +Cz + D = 0
-               A, B, C, D in order
-        output: 2 points on line of intersection, np.arrays, shape (3,)
+        Finds the lines of intersection of pairs of planes, each given as a
+        row of [A, B, C, D] such that Ax + By + Cz + D = 0.  Returns two
+        arrays of points on the lines of intersection, which are nan where
+        the planes are parallel.
         https://bit.ly/2LkBEyc
         """
-        a_vec, b_vec = np.array(a[:3]), np.array(b[:3])
+        a_vec, b_vec = a[:, :3], b[:, :3]
         aXb_vec = np.cross(a_vec, b_vec)
-        A = np.array([a_vec, b_vec, aXb_vec])
-        d = np.array([-a[3], -b[3], 0.0]).reshape(3, 1)
-        if np.linalg.det(A) == 0:
-            return None, None
-        else:
-            p_inter = np.linalg.solve(A, d).T
-            return p_inter[0], (p_inter + aXb_vec)[0]
-
-    def _t(self, p, q, r):
+        A = np.stack((a_vec, b_vec, aXb_vec), axis=1)
+        d = np.stack((-a[:, 3], -b[:, 3], np.zeros(len(a))), axis=1)
+        p = np.full((len(a), 3), np.nan)
+        ok = np.linalg.det(A) != 0
+        if np.any(ok):
+            p[ok] = np.linalg.solve(A[ok], d[ok][:, :, np.newaxis])[:, :, 0]
+        return p, p + aXb_vec
+
+    def _distance_v(self, p, q, r):
         r"""
-        Equation of line passing through points p and q parameterized by t
+        Shortest distances between the lines passing through p and q and the
+        points r, for arrays of points
         https://bit.ly/2EpQ6DD
         """
         x = p - q
-        return np.dot(r - q, x) / np.dot(x, x)
-
-    def _distance(self, p, q, r):
-        r"""
-        Shortest distance between line passing through p and q and point r
-        https://bit.ly/2EpQ6DD
-        """
-        return np.linalg.norm(self._t(p, q, r) * (p - q) + q - r)
-
-    def _pair_permutations(self, n):
-        perms = []
-        for i in range(n):
-            for j in range(n - (i + 1)):
-                perms.append([i, j + i + 1])
-        return perms
+        t = self._my_dot(r - q, x) / self._my_dot(x, x)
+        return np.linalg.norm(t[:, np.newaxis] * x + q - r, axis=1)
 
     def _perpendicular_vector(self, v, v_ref=None):
         if v_ref is None:
@@ -360,33 +312,35 @@ class MixedInvasionPercolationCoop(MixedInvasionPercolation):
         except KeyError:
             t_rad = net["throat.diameter"] / 2
         # Equations of throat planes at the center of each throat
-        planes = self._transform_point_normal(t_centroids, t_norms)
+        planes = np.hstack((t_norms, -self._my_dot(t_centroids, t_norms)[:, None]))
         Nt = net.Nt
-        adj_mat = dok_matrix((Nt, Nt), dtype=int)
-        # Run through and build the throat-throat pair adjacency matrix
-        # If planes of throats intersect then meniscii in throats may also
-        # Intersect at a given pressure.
-        for pore in net.Ps:
-            ts = net.find_neighbor_throats(pores=pore)
-            perms = self._pair_permutations(len(ts))
-            for perm in perms:
-                ta, tb = ts[perm]
-                p, q = self._plane_intersect(planes[ta], planes[tb])
-                if p is not None:
-                    d1 = self._distance(p, q, t_centroids[ta])
-                    d2 = self._distance(p, q, t_centroids[tb])
-                    if (t_rad[ta] >= d1) and (t_rad[tb] >= d2):
-                        adj_mat[ta, tb] = pore + 1
+        # Build the throat-throat pairs for all pores at once. If planes of
+        # throats intersect then meniscii in throats may also intersect at a
+        # given pressure.
+        Ps, Ts, T1, T2 = self._get_throat_pairs()
+        ta, tb, pores = Ts[T1], Ts[T2], Ps[T1]
+        p, q = self._plane_intersect_v(planes[ta], planes[tb])
+        hit = ~np.isnan(p[:, 0])
+        d1 = self._distance_v(p[hit], q[hit], t_centroids[ta[hit]])
+        d2 = self._distance_v(p[hit], q[hit], t_centroids[tb[hit]])
+        hit[hit] = (t_rad[ta[hit]] >= d1) * (t_rad[tb[hit]] >= d2)
+        ta, tb, pores = ta[hit], tb[hit], pores[hit]
+        # If a throat pair shares more than one pore keep the last one
+        key = ta * Nt + tb
+        _, last = np.unique(key[::-1], return_index=True)
+        last = np.sort(key.size - 1 - last)
+        pairs = np.vstack((ta[last], tb[last])).T
+        pores = pores[last]
         # Meniscus Filling Angle
         tfill_angle = cpf + ".alpha"
         # Capillary pressure adjacency maxtrix
-        pairs = np.asarray([list(key) for key in adj_mat.keys()])
-        pores = np.asarray([adj_mat[key] for key in adj_mat.keys()]) - 1
-        self.tt_Pc = adj_mat.copy().astype(float).tocsr()
         # Initialize the pressure matrix with nans
         # This is used to check for the first intersection pressure and
         # Prevent overwriting
-        self.tt_Pc[pairs[:, 0], pairs[:, 1]] = np.nan
+        self.tt_Pc = csr_matrix(
+            (np.full(len(pairs), np.nan), (pairs[:, 0], pairs[:, 1])),
+            shape=(Nt, Nt),
+        )
         angles = self._throat_pair_angle(pairs[:, 0], pairs[:, 1], pores, net)
         T1 = pairs[:, 0]
         T2 = pairs[:, 1]
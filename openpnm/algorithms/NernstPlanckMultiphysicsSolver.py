@@ -1,6 +1,9 @@
 import numpy as np
+import scipy.sparse as sprs
+from concurrent.futures import ThreadPoolExecutor
+from numpy.linalg import norm
 from openpnm.algorithms import GenericAlgorithm
-from openpnm.utils import logging, Docorator, GenericSettings
+from openpnm.utils import logging, Docorator, GenericSettings, AndersonMixer
 docstr = Docorator()
 logger = logging.getLogger(__name__)
 
@@ -26,6 +29,28 @@ class NernstPlanckMultiphysicsSolverSettings(GenericSettings):
         The tolerance to use for stopping Gummel iterations
     g_max_iter : int (default = 10)
         The maximum number if times to perform the Gummel iteration
+    coupling : str (default = 'gummel')
+        The strategy used to couple the ion and potential equations. Options
+        are:
+
+        'gummel' - (Default) Solves each equation in turn (operator
+        splitting) until the fields stop changing.
+        'monolithic' - Assembles all ion and potential equations into a
+        single block-sparse system and solves it with Newton iterations.
+        The off-diagonal blocks (e.g. the coupling of the ions to the
+        potential via migration) are found by finite differences. In this
+        mode ``g_tol`` and ``g_max_iter`` apply to the Newton iterations.
+    n_workers : int (default = 1)
+        The number of threads used to solve the ions within each Gummel
+        iteration. For a given potential the ion equations are independent,
+        so with more than 1 worker they are solved concurrently and the phase
+        is updated with all the results at once. The default of 1 solves the
+        ions one after another. Solves with 'pypardiso' still run one at a
+        time, since it keeps a single global solver.
+    anderson_depth : int (default = 0)
+        The number of previous Gummel iterates used by Anderson mixing to
+        accelerate the Gummel iterations. The default of 0 disables Anderson
+        mixing.
 
     """
     phase = None
@@ -33,6 +58,9 @@ class NernstPlanckMultiphysicsSolverSettings(GenericSettings):
     ions = []
     g_tol = 1e-8
     g_max_iter = 10
+    coupling = 'gummel'
+    n_workers = 1
+    anderson_depth = 0
 
 
 class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
@@ -56,7 +84,8 @@ class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
 
     @docstr.dedent
     def setup(self, phase=None, potential_field='', ions=[], g_tol=None,
-              g_max_iter=None, **kwargs):
+              g_max_iter=None, coupling=None, n_workers=None,
+              anderson_depth=None, **kwargs):
         r"""
 
         Parameters
@@ -73,6 +102,12 @@ class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
             self.settings['g_tol'] = g_tol
         if g_max_iter:
             self.settings['g_max_iter'] = g_max_iter
+        if coupling:
+            self.settings['coupling'] = coupling
+        if n_workers:
+            self.settings['n_workers'] = n_workers
+        if anderson_depth is not None:
+            self.settings['anderson_depth'] = anderson_depth
 
     def run(self, t=None):
         r"""
@@ -100,18 +135,23 @@ class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
                         shape=[alg.Np, ], dtype=float)
 
         # Source term for Poisson or charge conservation (electroneutrality) eq
-        phys = p_alg.project.find_physics(phase=phase)
         p_alg._charge_conservation_eq_source_term(e_alg=e_alg)
 
-        # Initialize residuals & old/new fields for Gummel iterats
+        if self.settings['coupling'] == 'monolithic':
+            self._run_monolithic(phase=phase, p_alg=p_alg, e_alg=e_alg)
+            return
+        elif self.settings['coupling'] != 'gummel':
+            raise Exception('Unrecognized coupling: '
+                            + self.settings['coupling'])
+
+        # Initialize residuals for Gummel iterations
         g_tol = self.settings['g_tol']
         g_res = {}
-        g_old = {}
-        g_new = {}
         for alg in algs:
             g_res[alg.name] = 1e+06
-            g_old[alg.name] = None
-            g_new[alg.name] = None
+
+        depth = self.settings['anderson_depth']
+        mixer = AndersonMixer(depth=depth) if depth else None
 
         # Iterate (Gummel) until solutions converge
         for itr in range(int(self.settings['g_max_iter'])):
@@ -120,30 +160,290 @@ class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
             print('Gummel iter: '+str(itr+1)+', residuals: '+g_r)
             g_convergence = max(i for i in g_res.values()) < g_tol
             if not g_convergence:
-                # Ions
-                for e in e_alg:
-                    g_old[e.name] = (e[e.settings['quantity']].copy())
+                x = self._get_fields(algs)
+                g_res = self._gummel_sweep(phase=phase, p_alg=p_alg,
+                                           e_alg=e_alg)
+                if mixer is not None:
+                    x = mixer(x, self._get_fields(algs))
+                    self._set_fields(x=x, algs=algs, phase=phase)
+
+            if g_convergence:
+                print('Solution converged')
+                break
+
+    def _gummel_sweep(self, phase, p_alg, e_alg):
+        r"""
+        Performs one Gummel iteration, i.e. solves each ion followed by the
+        potential, and returns the residual of each algorithm as a dict.
+        """
+        phys = self.project.find_physics(phase=phase)
+        # Ions
+        g_res = self._solve_ions(phase=phase, e_alg=e_alg)
+
+        # Poisson eq
+        for obj in phys:
+            obj.regenerate_models()
+        g_old = p_alg[p_alg.settings['quantity']].copy()
+        p_alg._run_reactive(x0=g_old)
+        g_new = p_alg[p_alg.settings['quantity']].copy()
+        # Residual
+        g_res[p_alg.name] = np.sum(np.absolute(g_old**2 - g_new**2))
+        # Update phase and physics
+        phase.update(p_alg.results())
+        for obj in phys:
+            obj.regenerate_models()
+        return {alg.name: g_res[alg.name] for alg in [p_alg] + e_alg}
+
+    def _solve_ions(self, phase, e_alg, transient=False):
+        r"""
+        Solves each ion for the current potential and returns the residual of
+        each algorithm as a dict.
+
+        Parameters
+        ----------
+        phase : OpenPNM Phase object
+            The phase to update with the ion concentrations
+        e_alg : list of OpenPNM algorithms
+            The algorithms of the ionic species
+        transient : bool
+            If ``True`` the ions are advanced by one time step using
+            ``_t_run_reactive``, otherwise ``_run_reactive`` is used.
+
+        Notes
+        -----
+        If ``n_workers`` is larger than 1 the ions are solved together by
+        ``_solve_ions_concurrently`` and the phase is updated once all of
+        them are solved.  Otherwise, the phase is updated after each ion as
+        it is solved.
+        """
+        g_old = {e.name: e[e.settings['quantity']].copy() for e in e_alg}
+        n_workers = int(self.settings['n_workers'])
+        if n_workers > 1:
+            self._solve_ions_concurrently(e_alg=e_alg, g_old=g_old,
+                                          transient=transient,
+                                          n_workers=n_workers)
+            results = {}
+            for e in e_alg:
+                results.update(e.results())
+            phase.update(results)
+        else:
+            for e in e_alg:
+                if transient:
+                    e._t_run_reactive(x0=g_old[e.name])
+                else:
                     e._run_reactive(x0=g_old[e.name])
-                    g_new[e.name] = (e[e.settings['quantity']].copy())
-                    # Residual
-                    g_res[e.name] = np.sum(np.absolute(
-                        g_old[e.name]**2-g_new[e.name]**2))
-                    phase.update(e.results())
-
-                # Poisson eq
-                for obj in phys:
-                    obj.regenerate_models()
-                g_old[p_alg.name] = p_alg[p_alg.settings['quantity']].copy()
-                p_alg._run_reactive(x0=g_old[p_alg.name])
-                g_new[p_alg.name] = p_alg[p_alg.settings['quantity']].copy()
-                # Residual
-                g_res[p_alg.name] = np.sum(np.absolute(
-                    g_old[p_alg.name]**2 - g_new[p_alg.name]**2))
-                # Update phase and physics
-                phase.update(p_alg.results())
-                for obj in phys:
-                    obj.regenerate_models()
+                phase.update(e.results())
+        g_res = {}
+        for e in e_alg:
+            g_new = e[e.settings['quantity']]
+            g_res[e.name] = np.sum(np.absolute(g_old[e.name]**2 - g_new**2))
+        return g_res
+
+    def _solve_ions_concurrently(self, e_alg, g_old, transient, n_workers):
+        r"""
+        Performs the nonlinear iterations of all ions in lockstep, running
+        only the linear solves in a thread pool.
+
+        Parameters
+        ----------
+        e_alg : list of OpenPNM algorithms
+            The algorithms of the ionic species
+        g_old : dict
+            The initial guess of each ion, keyed by algorithm name
+        transient : bool
+            If ``True`` the iterations of ``_t_run_reactive`` are performed,
+            otherwise those of ``_run_reactive``.
+        n_workers : int
+            The number of threads used for the linear solves
+
+        Notes
+        -----
+        Updating ``A`` and ``b`` regenerates the iterative models on the
+        shared phase and physics, so it is done for one ion at a time
+        between the concurrent solves.  Each thread only reads the ``A`` and
+        ``b`` of its own ion, so the result does not depend on the order in
+        which the threads run.
+        """
+        x = {e.name: g_old[e.name].copy() for e in e_alg}
+        mixers = {e.name: e._get_anderson_mixer() for e in e_alg}
+        for e in e_alg:
+            e[e.settings['quantity']] = x[e.name]
+        pending = list(e_alg)
+        itr = 0
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            while pending:
+                # Update A and b of each ion in turn and check convergence
+                active = []
+                for e in pending:
+                    if transient:
+                        e._update_iterative_props()
+                        e._A = e._A_t.copy()
+                        e._b = e._b_t.copy()
+                        e._apply_sources()
+                        e._correct_apply_sources()
+                    else:
+                        e._update_A_and_b()
+                    if (itr >= 1 or not transient) and e._is_converged():
+                        continue
+                    if itr >= int(e.settings['nlin_max_iter']):
+                        raise Exception(f"Not converged after {itr} iterations.")
+                    active.append(e)
+                # Solve the linear systems concurrently
+                x_new = pool.map(lambda e: e._solve(x0=x[e.name]), active)
+                for e, xe in zip(active, list(x_new)):
+                    mixer = mixers[e.name]
+                    if mixer is None:
+                        w = e.settings['relaxation_quantity']
+                        x[e.name] = xe * w + x[e.name] * (1 - w)
+                    else:
+                        x[e.name] = mixer(x[e.name], xe)
+                    e[e.settings['quantity']] = x[e.name]
+                pending = active
+                itr += 1
+
+    def _run_monolithic(self, phase, p_alg, e_alg):
+        r"""
+        Solves the ion and potential equations simultaneously using Newton
+        iterations on the fully coupled block system.
+
+        Notes
+        -----
+        The unknowns are stacked as ``[potential, ion_1, ..., ion_n]``. The
+        diagonal blocks of the Jacobian are the ``A`` matrices of the
+        individual algorithms (with BCs and linearized source terms applied),
+        while the off-diagonal blocks are found by finite differences. Since
+        the residual in a pore only depends on the fields in that pore and
+        its neighbors, pores that are more than 2 throats apart are perturbed
+        together, so only a handful of residual evaluations are needed per
+        field.
 
+        A single Gummel iteration is performed first to obtain an initial
+        guess that is consistent between the fields (e.g. the ionic
+        conductance vanishes if the concentrations are all zero).
+        """
+        algs = [p_alg] + e_alg
+        Np = self.project.network.Np
+        g_tol = self.settings['g_tol']
+        g_res = {}
+        for alg in algs:
+            g_res[alg.name] = 1e+06
+        # Sparsity pattern of each block and the pore groups to perturb
+        am = self.project.network.create_adjacency_matrix(fmt='coo')
+        pattern = (am + sprs.identity(Np, format='coo')).tocoo()
+        colors = _distance2_coloring(pattern)
+        print('Gummel iter: 1 (initial guess)')
+        self._gummel_sweep(phase=phase, p_alg=p_alg, e_alg=e_alg)
+        x = self._get_fields(algs)
+        for itr in range(int(self.settings['g_max_iter'])):
+            g_r = [float(format(i, '.3g')) for i in g_res.values()]
+            g_r = str(g_r)[1:-1]
+            print('Newton iter: '+str(itr+1)+', residuals: '+g_r)
+            g_convergence = max(i for i in g_res.values()) < g_tol
             if g_convergence:
                 print('Solution converged')
                 break
+            F = self._coupled_residual(x=x, algs=algs, phase=phase)
+            J = sprs.block_diag([alg.A for alg in algs], format='coo')
+            J = J + self._coupling_jacobian(x=x, F=F, algs=algs, phase=phase,
+                                            pattern=pattern, colors=colors)
+            J = J.tocsr()
+            tol = p_alg.settings['solver_tol']
+            solver = p_alg._get_solver()
+            dx = solver(J, -F, atol=norm(F)*tol, rtol=tol,
+                        max_it=p_alg.settings['solver_max_iter'],
+                        x0=np.zeros_like(F))
+            x_new = x + dx
+            for i, alg in enumerate(algs):
+                x_old_i = x[i*Np:(i+1)*Np]
+                x_new_i = x_new[i*Np:(i+1)*Np]
+                g_res[alg.name] = np.sum(np.absolute(x_old_i**2 - x_new_i**2))
+            x = x_new
+        # Write the final fields back and update phase and physics
+        self._coupled_residual(x=x, algs=algs, phase=phase)
+
+    def _get_fields(self, algs):
+        r"""
+        Returns the fields solved by the given algorithms stacked in order.
+        """
+        x = np.hstack([alg[alg.settings['quantity']] for alg in algs])
+        return x.astype(float)
+
+    def _set_fields(self, x, algs, phase):
+        r"""
+        Writes the stacked fields ``x`` onto the given algorithms and phase,
+        then regenerates the physics.
+        """
+        Np = self.project.network.Np
+        phys = self.project.find_physics(phase=phase)
+        for i, alg in enumerate(algs):
+            alg[alg.settings['quantity']] = x[i*Np:(i+1)*Np].copy()
+            phase.update(alg.results())
+        for obj in phys:
+            obj.regenerate_models()
+
+    def _coupled_residual(self, x, algs, phase):
+        r"""
+        Writes the stacked fields ``x`` onto the algorithms and phase, then
+        rebuilds ``A`` and ``b`` of each algorithm and returns the stacked
+        residual ``A * x - b``.
+        """
+        Np = self.project.network.Np
+        self._set_fields(x=x, algs=algs, phase=phase)
+        F = []
+        for i, alg in enumerate(algs):
+            alg._build_A()
+            alg._build_b()
+            alg._apply_BCs()
+            alg._apply_sources()
+            F.append(alg.A * x[i*Np:(i+1)*Np] - alg.b)
+        return np.hstack(F)
+
+    def _coupling_jacobian(self, x, F, algs, phase, pattern, colors):
+        r"""
+        Estimates the off-diagonal blocks of the Jacobian by perturbing all
+        pores of the same color in one field at a time.
+        """
+        Np = self.project.network.Np
+        n = len(algs)
+        rows, cols, vals = [], [], []
+        for j in range(n):
+            xj = x[j*Np:(j+1)*Np]
+            h = np.sqrt(np.finfo(float).eps) * max(np.absolute(xj).max(), 1.0)
+            for c in np.unique(colors):
+                # Rows affected by pores of color c, and the pore responsible
+                mask = colors[pattern.col] == c
+                r, p = pattern.row[mask], pattern.col[mask]
+                x_pert = x.copy()
+                x_pert[j*Np + np.where(colors == c)[0]] += h
+                dF = (self._coupled_residual(x_pert, algs, phase) - F) / h
+                for i in range(n):
+                    if i == j:
+                        continue
+                    rows.append(i*Np + r)
+                    cols.append(j*Np + p)
+                    vals.append(dF[i*Np + r])
+        if rows:
+            rows, cols = np.hstack(rows), np.hstack(cols)
+            vals = np.hstack(vals)
+        J = sprs.coo_matrix((vals, (rows, cols)), shape=(n*Np, n*Np))
+        J.eliminate_zeros()
+        return J
+
+
+def _distance2_coloring(pattern):
+    r"""
+    Greedy distance-2 coloring of the graph with the given sparsity pattern,
+    such that no two pores sharing a neighbor receive the same color.
+    """
+    pattern = sprs.coo_matrix((np.ones_like(pattern.data, dtype=bool),
+                               (pattern.row, pattern.col)),
+                              shape=pattern.shape).tocsr()
+    am2 = (pattern @ pattern).tocsr()
+    colors = -np.ones(am2.shape[0], dtype=int)
+    for p in range(am2.shape[0]):
+        used = set(colors[am2.indices[am2.indptr[p]:am2.indptr[p+1]]])
+        c = 0
+        while c in used:
+            c += 1
+        colors[p] = c
+    return colors
@@ -2,8 +2,7 @@ import scipy as sp
 import numpy as np
 from collections import namedtuple
 from openpnm.algorithms import GenericAlgorithm
-from openpnm.topotools import site_percolation, bond_percolation
-from openpnm.topotools import remove_isolated_clusters, ispercolating
+from openpnm.topotools import ispercolating
 from openpnm.utils import logging
 logger = logging.getLogger(__name__)
 
@@ -393,30 +392,27 @@ class OrdinaryPercolation(GenericAlgorithm):
                 raise Exception('Inlet pores must be specified first')
             else:
                 Pin = self['pore.inlets']
+        else:
+            Pin = None
 
-        # Generate curve from points
-        conns = self.project.network['throat.conns']
-        for inv_val in points:
-            if self.settings['mode'] == 'bond':
-                t_invaded = self['throat.entry_pressure'] <= inv_val
-                labels = bond_percolation(conns, t_invaded)
-            elif self.settings['mode'] == 'site':
-                p_invaded = self['pore.entry_pressure'] <= inv_val
-                labels = site_percolation(conns, p_invaded)
-
-            # Optionally remove clusters not connected to the inlets
-            if self.settings['access_limited']:
-                labels = remove_isolated_clusters(labels=labels,
-                                                  inlets=Pin)
-
-            # Store current applied pressure in newly invaded pores
-            pinds = (self['pore.invasion_pressure'] == np.inf) * \
-                    (labels.sites >= 0)
-            self['pore.invasion_pressure'][pinds] = inv_val
-            # Store current applied pressure in newly invaded throats
-            tinds = (self['throat.invasion_pressure'] == np.inf) * \
-                    (labels.bonds >= 0)
-            self['throat.invasion_pressure'][tinds] = inv_val
+        # Find the exact threshold at which each pore and throat is invaded
+        # in a single sweep, then round it up to the applied points
+        net = self.project.network
+        if self.settings['mode'] == 'bond':
+            entry = self['throat.entry_pressure']
+        else:
+            entry = self['pore.entry_pressure']
+        p_thresh, t_thresh = _find_invasion_thresholds(
+            conns=net['throat.conns'], Np=net.Np, entry=entry,
+            mode=self.settings['mode'], inlets=Pin)
+        points = np.array(points, dtype=float, ndmin=1)
+        # Store applied pressure in newly invaded pores and throats
+        pinds = self['pore.invasion_pressure'] == np.inf
+        self['pore.invasion_pressure'][pinds] = \
+            _first_point_above(p_thresh[pinds], points)
+        tinds = self['throat.invasion_pressure'] == np.inf
+        self['throat.invasion_pressure'][tinds] = \
+            _first_point_above(t_thresh[tinds], points)
 
         # Convert invasion pressures in sequence values
         Pinv = self['pore.invasion_pressure']
@@ -449,17 +445,22 @@ class OrdinaryPercolation(GenericAlgorithm):
             logger.warning('Inlets have non-zero volume, percolation curve '
                            + 'will not start at 0')
         # Find cumulative filled volume at each applied capillary pressure
-        Vnwp_t = []
-        Vnwp_p = []
-        Vnwp_all = []
-        for p in points:
-            # Calculate filled pore volumes
-            p_inv, t_inv = self.results(p).values()
-            Vp = np.sum(Pvol*p_inv)
-            Vt = np.sum(Tvol*t_inv)
-            Vnwp_p.append(Vp)
-            Vnwp_t.append(Vt)
-            Vnwp_all.append(Vp + Vt)
+        if self.settings['pore_partial_filling'] or \
+                self.settings['throat_partial_filling']:
+            # Filling depends on Pc, so results must be found point by point
+            Vnwp_all = []
+            for p in points:
+                # Calculate filled pore volumes
+                p_inv, t_inv = self.results(p).values()
+                Vp = np.sum(Pvol*p_inv)
+                Vt = np.sum(Tvol*t_inv)
+                Vnwp_all.append(Vp + Vt)
+        else:
+            Vp = _cumulative_volume(self['pore.invasion_pressure'], Pvol,
+                                    points)
+            Vt = _cumulative_volume(self['throat.invasion_pressure'], Tvol,
+                                    points)
+            Vnwp_all = list(Vp + Vt)
         # Convert volumes to saturations by normalizing with total pore volume
         Snwp_all = [V/Total_vol for V in Vnwp_all]
         pc_curve = namedtuple('pc_curve', ('Pcap', 'Snwp'))
@@ -527,3 +528,213 @@ class OrdinaryPercolation(GenericAlgorithm):
             inv_phase['pore.invasion_pressure'] = Ppressure
             inv_phase['throat.invasion_pressure'] = Tpressure
         return inv_phase
+
+
+def _cumulative_volume(pressures, volumes, points):
+    r"""
+    Returns the total volume of the elements with an invasion pressure at or
+    below each of the given points, using a single sort of the pressures.
+    """
+    pressures = np.array(pressures, dtype=float, ndmin=1)
+    volumes = np.broadcast_to(volumes, pressures.shape)
+    keep = ~np.isnan(pressures)
+    order = np.argsort(pressures[keep], kind='stable')
+    cum_vol = np.concatenate(([0.0], np.cumsum(volumes[keep][order])))
+    inds = np.searchsorted(pressures[keep][order], points, side='right')
+    return cum_vol[inds]
+
+
+def _first_point_above(thresh, points):
+    r"""
+    Returns the first of the applied ``points`` (in the order given) that is
+    greater than or equal to each threshold, or ``inf`` if there is none.
+    """
+    running_max = np.maximum.accumulate(points)
+    inds = np.searchsorted(running_max, thresh, side='left')
+    vals = np.full(np.shape(thresh), np.inf)
+    hits = inds < points.size
+    vals[hits] = points[inds[hits]]
+    return vals
+
+
+def _find_invasion_thresholds(conns, Np, entry, mode, inlets=None):
+    r"""
+    Finds the lowest applied pressure at which each pore and throat is
+    invaded by an ordinary percolation process.
+
+    Parameters
+    ----------
+    conns : ndarray
+        The throat connections of the network.
+    Np : int
+        The number of pores in the network.
+    entry : ndarray
+        The throat entry pressures if ``mode`` is 'bond', or the pore entry
+        pressures if it is 'site'.
+    mode : string
+        Either 'bond' or 'site'.
+    inlets : array_like, optional
+        Boolean mask of inlet pores.  If given, only clusters connected to
+        the inlets are considered invaded (i.e. access limited).
+
+    Returns
+    -------
+    Two arrays containing the invasion thresholds of pores and throats,
+    which are ``inf`` for those that are never invaded.
+
+    Notes
+    -----
+    Rather than labeling clusters from scratch at every applied pressure,
+    the bonds (or sites) are added in order of increasing entry pressure and
+    the resulting clusters are tracked with a disjoint-set (union-find)
+    structure.  When a cluster first becomes connected to an inlet all of
+    its members are assigned the current entry pressure, so the cost of the
+    sweep is nearly linear in the size of the network and independent of the
+    number of applied pressure points.
+
+    """
+    conns = np.ascontiguousarray(conns, dtype=np.int64)
+    entry = np.ascontiguousarray(entry, dtype=float)
+    Nt = conns.shape[0]
+    if mode == 'bond':
+        if inlets is None:
+            t_thresh = entry.copy()
+            p_thresh = np.full(Np, np.inf)
+            np.minimum.at(p_thresh, conns[:, 0], entry)
+            np.minimum.at(p_thresh, conns[:, 1], entry)
+            return p_thresh, t_thresh
+        order = np.argsort(entry, kind='stable')
+        indptr = np.zeros(1, dtype=np.int64)
+        indices = np.zeros(1, dtype=np.int64)
+    elif mode == 'site':
+        if inlets is None:
+            p_thresh = entry.copy()
+            return p_thresh, p_thresh[conns].max(axis=1)
+        order = np.argsort(entry, kind='stable')
+        # Adjacency of the sites, to find occupied neighbors
+        ij = np.concatenate((conns, conns[:, ::-1]))
+        ij = ij[np.argsort(ij[:, 0], kind='stable')]
+        indices = np.ascontiguousarray(ij[:, 1])
+        indptr = np.zeros(Np + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ij[:, 0], minlength=Np), out=indptr[1:])
+    else:
+        raise Exception('Percolation type has not been set')
+    inlets = np.zeros(Np, dtype=bool) | np.array(inlets, dtype=bool)
+    kernel = _get_percolation_kernel()
+    thresh = kernel(conns, entry, np.ascontiguousarray(order, dtype=np.int64),
+                    inlets, indptr, indices, mode == 'site')
+    p_thresh = thresh[:Np]
+    if mode == 'site':
+        return p_thresh, p_thresh[conns].max(axis=1)
+    return p_thresh, thresh[Np:Np+Nt]
+
+
+def _percolation_kernel(conns, entry, order, inlets, indptr, indices, site):
+    r"""
+    Pure python version of the access limited percolation sweep, which is
+    compiled by numba in ``_get_percolation_kernel``.  Elements 0 to Np-1
+    are the pores and elements Np and up are the throats.
+    """
+    Np = inlets.size
+    Nt = conns.shape[0]
+    thresh = np.full(Np + Nt, np.inf)
+    parent = np.arange(Np)
+    size = np.ones(Np, dtype=np.int64)
+    has_inlet = inlets.copy()
+    active = np.zeros(Np, dtype=np.bool_)
+    # Linked lists of the not yet invaded members of each cluster
+    head = np.arange(Np)
+    tail = np.arange(Np)
+    nxt = np.full(Np + Nt, -1)
+
+    for item in order:
+        e = entry[item]
+        if site:
+            # Occupy the site, then merge it with its occupied neighbors
+            r = item
+            active[item] = True
+            if has_inlet[item]:
+                thresh[item] = e
+            for k in range(indptr[item], indptr[item+1]):
+                n = indices[k]
+                if not active[n]:
+                    continue
+                # Find the roots of both clusters, halving the path
+                while parent[n] != n:
+                    parent[n] = parent[parent[n]]
+                    n = parent[n]
+                while parent[r] != r:
+                    parent[r] = parent[parent[r]]
+                    r = parent[r]
+                if n == r:
+                    continue
+                a, b = r, n
+                if has_inlet[a] != has_inlet[b]:
+                    # Invade all members of the newly connected cluster
+                    m = head[b] if has_inlet[a] else head[a]
+                    while m != -1:
+                        if thresh[m] == np.inf:
+                            thresh[m] = e
+                        m = nxt[m]
+                if size[a] < size[b]:
+                    a, b = b, a
+                parent[b] = a
+                size[a] += size[b]
+                has_inlet[a] = has_inlet[a] or has_inlet[b]
+                nxt[tail[a]] = head[b]
+                tail[a] = tail[b]
+                r = a
+        else:
+            u = conns[item, 0]
+            v = conns[item, 1]
+            while parent[u] != u:
+                parent[u] = parent[parent[u]]
+                u = parent[u]
+            while parent[v] != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            a, b = u, v
+            if a != b:
+                # Sites are only invaded once they belong to a cluster of
+                # occupied bonds, so inlets alone are not yet active
+                for c in (a, b):
+                    if (has_inlet[a] or has_inlet[b]) and not active[c]:
+                        m = head[c]
+                        while m != -1:
+                            if thresh[m] == np.inf:
+                                thresh[m] = e
+                            m = nxt[m]
+                if size[a] < size[b]:
+                    a, b = b, a
+                parent[b] = a
+                size[a] += size[b]
+                has_inlet[a] = has_inlet[a] or has_inlet[b]
+                active[a] = has_inlet[a]
+                nxt[tail[a]] = head[b]
+                tail[a] = tail[b]
+            # Invade the bond now if its cluster is connected, otherwise
+            # add it to the members of the cluster
+            if active[a]:
+                thresh[Np + item] = e
+            else:
+                nxt[Np + item] = head[a]
+                head[a] = Np + item
+    return thresh
+
+
+_compiled_percolation_kernel = None
+
+
+def _get_percolation_kernel():
+    r"""
+    Returns the compiled percolation kernel, compiling it on first use.
+    """
+    global _compiled_percolation_kernel
+    if _compiled_percolation_kernel is None:
+        from numba import njit, int64, float64, boolean
+        i1d = int64[::1]
+        sig = float64[::1](int64[:, ::1], float64[::1], i1d, boolean[::1],
+                           i1d, i1d, boolean)
+        _compiled_percolation_kernel = njit(sig, cache=True)(
+            _percolation_kernel)
+    return _compiled_percolation_kernel
@@ -3,7 +3,7 @@ from openpnm.algorithms import GenericTransport
 # Uncomment this line when we stop supporting Python 3.6
 # from dataclasses import dataclass, field
 # from typing import List
-from openpnm.utils import logging, Docorator, GenericSettings
+from openpnm.utils import logging, Docorator, GenericSettings, AndersonMixer
 docstr = Docorator()
 logger = logging.getLogger(__name__)
 
@@ -60,6 +60,12 @@ class ReactiveTransportSettings(GenericSettings):
         Maximum number of iterations allowed for the nonlinear solver to
         converge. This parameter is different that ``GenericTransport``'s
         ``solver_max_iter``.
+    anderson_depth : int (default = 0)
+        The number of previous iterates used by Anderson mixing to accelerate
+        the nonlinear (Picard) iterations. The default of 0 disables Anderson
+        mixing, in which case the iterates are only under-relaxed using
+        ``relaxation_quantity``. When enabled, ``relaxation_quantity`` is used
+        as the mixing factor.
 
     ----
 
@@ -72,6 +78,7 @@ class ReactiveTransportSettings(GenericSettings):
     # relaxation = RelaxationSettings()
     relaxation_source = 1.0
     relaxation_quantity = 1.0
+    anderson_depth = 0
     # Swap the following 2 lines when we stop supporting Python 3.6
     # sources: List = field(default_factory=lambda: [])
     sources = []
@@ -109,7 +116,7 @@ class ReactiveTransport(GenericTransport):
     @docstr.dedent
     def setup(self, phase=None, quantity='', conductance='',
               nlin_max_iter=None, relaxation_source=None,
-              relaxation_quantity=None, **kwargs):
+              relaxation_quantity=None, anderson_depth=None, **kwargs):
         r"""
         This method takes several arguments that are essential to running the
         algorithm and adds them to the settings
@@ -140,6 +147,8 @@ class ReactiveTransport(GenericTransport):
             self.settings['relaxation_source'] = relaxation_source
         if relaxation_quantity:
             self.settings['relaxation_quantity'] = relaxation_quantity
+        if anderson_depth is not None:
+            self.settings['anderson_depth'] = anderson_depth
         super().setup(**kwargs)
 
     def run(self, x0=None):
@@ -346,9 +355,13 @@ class ReactiveTransport(GenericTransport):
             logger.info(f'Solution converged: {self._get_residual():.4e}')
             return x
 
+        mixer = self._get_anderson_mixer()
         for itr in range(max_it):
             # Solve, use relaxation, and update solution on algorithm obj
-            self[quantity] = x = self._solve(x0=x) * w + x * (1 - w)
+            if mixer is None:
+                self[quantity] = x = self._solve(x0=x) * w + x * (1 - w)
+            else:
+                self[quantity] = x = mixer(x, self._solve(x0=x))
             self._update_A_and_b()
             # Check solution convergence
             if self._is_converged():
@@ -359,6 +372,16 @@ class ReactiveTransport(GenericTransport):
         if not self._is_converged():
             raise Exception(f"Not converged after {max_it} iterations.")
 
+    def _get_anderson_mixer(self):
+        r"""
+        Returns an ``AndersonMixer`` for the nonlinear iterations based on
+        ``anderson_depth``, or ``None`` if Anderson mixing is disabled.
+        """
+        depth = self.settings['anderson_depth']
+        if not depth:
+            return None
+        return AndersonMixer(depth=depth, beta=self.settings['relaxation_quantity'])
+
     def _update_A_and_b(self):
         r"""
         Updates A and b based on the most recent solution stored on algorithm object.
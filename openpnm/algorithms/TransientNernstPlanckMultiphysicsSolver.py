@@ -222,18 +222,8 @@ class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
                         g_convergence = max(i for i in g_res.values()) < g_tol
                         if not g_convergence:
                             # Ions
-                            for e in e_alg:
-                                g_old[e.name] = (
-                                    e[e.settings['quantity']].copy())
-
-                                e._t_run_reactive(x0=g_old[e.name])
-                                g_new[e.name] = (
-                                    e[e.settings['quantity']].copy()
-                                )
-                                # Residual
-                                g_res[e.name] = np.sum(np.absolute(
-                                    g_old[e.name]**2 - g_new[e.name]**2))
-                                phase.update(e.results())
+                            g_res.update(self._solve_ions(
+                                phase=phase, e_alg=e_alg, transient=True))
 
                             # Charge conservation eq
                             for obj in phys:
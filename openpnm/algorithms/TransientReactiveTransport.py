@@ -411,6 +411,7 @@ class TransientReactiveTransport(ReactiveTransport):
         # Write initial guess to algorithm for _update_iterative_props to work
         self[quantity] = x
 
+        mixer = self._get_anderson_mixer()
         for itr in range(max_it):
             # Update iterative properties on phase and physics
             self._update_iterative_props()
@@ -426,7 +427,10 @@ class TransientReactiveTransport(ReactiveTransport):
                 return x
             logger.info(f'Tolerance not met: {res:.4e}')
             # Solve, use relaxation, and update solution on algorithm obj
-            self[quantity] = x = self._solve(x0=x) * w + x * (1 - w)
+            if mixer is None:
+                self[quantity] = x = self._solve(x0=x) * w + x * (1 - w)
+            else:
+                self[quantity] = x = mixer(x, self._solve(x0=x))
 
         # Check solution convergence after max_it iterations
         if not self._is_converged():
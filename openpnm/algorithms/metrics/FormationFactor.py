@@ -1,4 +1,5 @@
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from openpnm.utils import logging, Project, Workspace, PrintableDict
 from openpnm.phases import GenericPhase
 from openpnm.physics import GenericPhysics
@@ -72,7 +73,8 @@ class FormationFactor(GenericMetric):
                                         'z': None},
                               'lengths': {'x': None,
                                           'y': None,
-                                          'z': None}})
+                                          'z': None},
+                              'n_workers': 1})
 
         self.results = PrintableDict()
         self.results._value = "Formation Factor"
@@ -88,37 +90,75 @@ class FormationFactor(GenericMetric):
 #                project.purge_object(i)
         super().__init__(network=network, project=project, **kwargs)
 
-    def run(self):
+    def run(self, n_workers=None):
         r"""
         Execute the diffusion simulations in the principle directions.
 
+        Parameters
+        ----------
+        n_workers : int, optional
+            The number of threads used to run the directional simulations
+            concurrently.  If not given the value in ``settings['n_workers']``
+            is used, which is 1 by default.  With the 'pypardiso' solver only
+            the setup of the linear systems overlaps, since its solves are run
+            one at a time (it keeps a single global solver).
+
+        Notes
+        -----
+        The diffusive conductances are computed once and shared by the
+        simulations of all directions, which only read them, so the threads
+        work on the same network and phase arrays without copying them.  The
+        temporary phase, physics and algorithm objects are removed from the
+        project once the results are found.
+
         """
+        if n_workers is not None:
+            self.settings['n_workers'] = n_workers
         phase = GenericPhase(network=self.network)
-        phase['pore.diffusivity'] = 1.0
-        phase['throat.diffusivity'] = 1.0
-        mod = models.physics.diffusive_conductance.ordinary_diffusion
-        for geom in self.project.geometries().values():
-            phys = GenericPhysics(network=self.network,
-                                  phase=phase, geometry=geom)
-            phys.add_model(propname='throat.diffusive_conductance', model=mod)
-        for bcs in self.settings['inlets'].keys():
-            Diff = FickianDiffusion(network=self.project.network, phase=phase)
-            Pin = self.network.pores(self.settings['inlets'][bcs])
-            Diff.set_value_BC(pores=Pin, values=1.0)
-            Pout = self.network.pores(self.settings['outlets'][bcs])
-            Diff.set_value_BC(pores=Pout, values=0.0)
-            Diff.run()
-            A = self.settings['areas'][bcs]
-            if A is None:
-                A = Diff._get_domain_area()
-                self.settings['areas'][bcs] = A
-            L = self.settings['lengths'][bcs]
-            if L is None:
-                L = Diff._get_domain_length()
-                self.settings['lengths'][bcs] = L
-            R = Diff.rate(pores=Pin)
-            Deff = R*L/A  # Conc gradient and diffusivity were both unity
-            self.results[bcs] = 1/Deff[0]
+        temp = [phase]
+        try:
+            phase['pore.diffusivity'] = 1.0
+            phase['throat.diffusivity'] = 1.0
+            mod = models.physics.diffusive_conductance.ordinary_diffusion
+            for geom in self.project.geometries().values():
+                phys = GenericPhysics(network=self.network,
+                                      phase=phase, geometry=geom)
+                temp.append(phys)
+                phys.add_model(propname='throat.diffusive_conductance',
+                               model=mod)
+            # Objects are created serially since the project is not thread-safe
+            algs = {}
+            for bcs in self.settings['inlets'].keys():
+                Diff = FickianDiffusion(network=self.project.network,
+                                        phase=phase)
+                temp.append(Diff)
+                Pin = self.network.pores(self.settings['inlets'][bcs])
+                Diff.set_value_BC(pores=Pin, values=1.0)
+                Pout = self.network.pores(self.settings['outlets'][bcs])
+                Diff.set_value_BC(pores=Pout, values=0.0)
+                algs[bcs] = Diff
+            if self.settings['n_workers'] > 1:
+                with ThreadPoolExecutor(self.settings['n_workers']) as pool:
+                    list(pool.map(lambda alg: alg.run(), algs.values()))
+            else:
+                for Diff in algs.values():
+                    Diff.run()
+            for bcs, Diff in algs.items():
+                Pin = self.network.pores(self.settings['inlets'][bcs])
+                A = self.settings['areas'][bcs]
+                if A is None:
+                    A = Diff._get_domain_area()
+                    self.settings['areas'][bcs] = A
+                L = self.settings['lengths'][bcs]
+                if L is None:
+                    L = Diff._get_domain_length()
+                    self.settings['lengths'][bcs] = L
+                R = Diff.rate(pores=Pin)
+                Deff = R*L/A  # Conc gradient and diffusivity were both unity
+                self.results[bcs] = 1/Deff[0]
+        finally:
+            for obj in reversed(temp):
+                self.project.purge_object(obj)
 
     def set_inlets(self, direction, label):
         r"""
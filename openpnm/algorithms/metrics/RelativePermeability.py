@@ -1,8 +1,11 @@
 import numpy as np
+import scipy.sparse as sprs
+from concurrent.futures import ThreadPoolExecutor
 from openpnm import models
 from openpnm.utils import logging
 from openpnm.phases import GenericPhase
 from openpnm.algorithms import GenericAlgorithm, StokesFlow
+from openpnm.algorithms.InvasionPercolation import _build_event_log
 import matplotlib.pyplot as plt
 logger = logging.getLogger(__name__)
 
@@ -56,6 +59,8 @@ class RelativePermeability(GenericAlgorithm):
                           'perm_abs_wp': dict(),
                           'perm_abs_nwp': dict(),
                           'results': {'sat': [], 'kr_wp': [], 'kr_nwp': []}}
+        self._event_log = None
+        self._occupancy_state = None
 
     def setup(self, invading_phase=None, defending_phase=None,
               invasion_sequence=None, flow_inlets=None, flow_outlets=None,
@@ -107,6 +112,7 @@ class RelativePermeability(GenericAlgorithm):
             self['pore.invasion_sequence'] = seq_p
             seq_t = nwp['throat.invasion_sequence']
             self['throat.invasion_sequence'] = seq_t
+            self._event_log = None
             dimension = 0
             x, y, z = False, False, False
             if 'pore.left' in network.keys():
@@ -264,6 +270,39 @@ class RelativePermeability(GenericAlgorithm):
         self.project.purge_object(obj=St_mp_nwp)
         return [Kewp, Kenwp]
 
+    def _get_saturation(self, i):
+        r"""
+        Returns the invading phase saturation when all pores and throats with
+        an invasion sequence below ``i`` are invaded.
+
+        Notes
+        -----
+        The cumulative invaded volume is stored in an event log sorted by
+        invasion sequence, which is built on the first call so that each
+        saturation point only needs a binary search.
+
+        """
+        network = self.project.network
+        Vp = network['pore.volume']
+        Vt = network['throat.volume']
+        if self._event_log is None:
+            pseq = self['pore.invasion_sequence']
+            tseq = self['throat.invasion_sequence']
+            self._event_log = _build_event_log(pseq=pseq, tseq=tseq,
+                                               pvol=Vp, tvol=Vt)
+            # Elements without a sequence fall under every limit ``i``
+            self._preinvaded_volume = np.sum(Vp[pseq < 0]) \
+                + np.sum(Vt[tseq < 0])
+        # Find the volume invaded before step i from the event log
+        log = self._event_log
+        n = np.searchsorted(log['step'], i, side='left')
+        sat1 = self._preinvaded_volume
+        if n > 0:
+            sat1 = sat1 + log['volume'][n-1]
+        bulk = Vp.sum() + Vt.sum()
+        sat = sat1/bulk
+        return sat
+
     def _sat_occ_update(self, i):
         r"""
         Calculates the saturation of each phase using the invasion sequence
@@ -277,25 +316,170 @@ class RelativePermeability(GenericAlgorithm):
             found by adding the volume of pores and thorats that meet this
             sequence limit divided by the bulk volume.
 
+        Notes
+        -----
+        The occupancy arrays are only rebuilt on the first call, or if they
+        were replaced in the meantime.  Otherwise only the pores and throats
+        invaded between the previous limit and ``i`` are changed, which are
+        looked up in the event log.
+
         """
-        network = self.project.network
-        pore_mask = self['pore.invasion_sequence'] < i
-        throat_mask = self['throat.invasion_sequence'] < i
-        sat_p = np.sum(network['pore.volume'][pore_mask])
-        sat_t = np.sum(network['throat.volume'][throat_mask])
-        sat1 = sat_p + sat_t
-        bulk = network['pore.volume'].sum() + network['throat.volume'].sum()
-        sat = sat1/bulk
-        nwp = self.project[self.settings['nwp']]
-        nwp['pore.occupancy'] = pore_mask
-        nwp['throat.occupancy'] = throat_mask
+        sat = self._get_saturation(i)
+        phases = [self.project[self.settings['nwp']]]
         if self.settings['wp'] is not None:
-            wp = self.project[self.settings['wp']]
-            wp['throat.occupancy'] = 1-throat_mask
-            wp['pore.occupancy'] = 1-pore_mask
+            phases.append(self.project[self.settings['wp']])
+        state = self._occupancy_state
+        if (state is None) or not all(
+                (phase.get('pore.occupancy') is occ[0])
+                and (phase.get('throat.occupancy') is occ[1])
+                for phase, occ in zip(phases, state[1])):
+            pore_mask = self['pore.invasion_sequence'] < i
+            throat_mask = self['throat.invasion_sequence'] < i
+            phases[0]['pore.occupancy'] = pore_mask
+            phases[0]['throat.occupancy'] = throat_mask
+            if len(phases) > 1:
+                phases[1]['throat.occupancy'] = 1-throat_mask
+                phases[1]['pore.occupancy'] = 1-pore_mask
+        else:
+            log = self._event_log
+            lo, hi = np.searchsorted(log['step'], sorted((state[0], i)))
+            events = log[lo:hi]
+            invaded = i > state[0]
+            for k, element in enumerate(['pore', 'throat']):
+                locs = events['element'][events['type'] == k]
+                phases[0][element + '.occupancy'][locs] = invaded
+                if len(phases) > 1:
+                    phases[1][element + '.occupancy'][locs] = not invaded
+        self._occupancy_state = (i, [(phase['pore.occupancy'],
+                                      phase['throat.occupancy'])
+                                     for phase in phases])
         return sat
 
-    def run(self, Snwp_num=None):
+    def _fast_eff_perm_sweep(self, flow_pores, points, n_workers=1):
+        r"""
+        Calculates the effective permeabilities of each phase at all the
+        given invasion sequence limits, without re-adding the multiphase
+        models or creating new StokesFlow algorithms at each point.
+
+        Parameters
+        ----------
+        flow_pores: list
+            The inlet and outlet pores, as in ``_eff_perm_calc``.
+        points: array_like
+            The invasion sequence limits of the saturation points.
+        n_workers: int
+            The number of threads used to solve the saturation points
+            concurrently.  The default is 1.  The solves of the 'pypardiso'
+            solver are still run one at a time, since it keeps a single
+            global solver.
+
+        Returns
+        -------
+        Two lists holding the effective permeabilities of the defending
+        phase (or ``None`` if no defending phase is set) and of the invading
+        phase at each point.
+
+        Notes
+        -----
+        The multiphase models are added once by ``_regenerate_models``.  At
+        each point the occupancies are updated by ``_sat_occ_update`` and the
+        conduit conductances regenerated, so only the matrix values change
+        between points.  The Dirichlet pores are eliminated from the system,
+        whose sparsity pattern is assembled once, and which is solved with
+        the solver of a single StokesFlow object.  When running serially, the
+        solution at each point is the initial guess for the next one, which
+        helps iterative solvers.  When running in threads, the conductances
+        are still found serially, as they depend on the phase occupancies,
+        and only the solves run concurrently.
+
+        """
+        network = self.project.network
+        conns = network['throat.conns']
+        Np = network.Np
+        prop = self.settings['conduit_hydraulic_conductance']
+        phases = [self.project[self.settings['nwp']]]
+        if self.settings['wp'] is not None:
+            phases.append(self.project[self.settings['wp']])
+        self._regenerate_models()
+        # Map the non-Dirichlet pores onto the rows of the reduced system
+        x_bc = np.zeros(Np)
+        x_bc[flow_pores[0]] = 1.0
+        is_bc = np.zeros(Np, dtype=bool)
+        is_bc[flow_pores[0]] = True
+        is_bc[flow_pores[1]] = True
+        inner = np.where(~is_bc)[0]
+        n = inner.size
+        row = -np.ones(Np, dtype=int)
+        row[inner] = np.arange(n)
+        r1, r2 = row[conns[:, 0]], row[conns[:, 1]]
+        both = (r1 >= 0) * (r2 >= 0)
+        A_row = np.concatenate((r1[both], r2[both], np.arange(n)))
+        A_col = np.concatenate((r2[both], r1[both], np.arange(n)))
+        # Assemble the sparsity pattern once and find the slot of each entry
+        # in its data array, so duplicate throats add up as in StokesFlow
+        pattern = sprs.coo_matrix((np.ones(A_row.size), (A_row, A_col)),
+                                  shape=(n, n)).tocsr()
+        pattern.sort_indices()
+        rows = np.repeat(np.arange(n), np.diff(pattern.indptr))
+        slots = np.searchsorted(rows*n + pattern.indices, A_row*n + A_col)
+        # Throats from an inner pore to a Dirichlet pore feed the RHS
+        b1 = (r1 >= 0) * (r2 < 0)
+        b2 = (r2 >= 0) * (r1 < 0)
+        alg = StokesFlow(network=network, phase=phases[0])
+        solver = alg._get_solver()
+        tol = alg.settings['solver_tol']
+        max_it = alg.settings['solver_max_iter']
+        self.project.purge_object(obj=alg)
+
+        def _conductances(i):
+            self._sat_occ_update(i)
+            for phase in phases:
+                phase.regenerate_models(propnames=prop)
+            return [phase[prop] for phase in phases]
+
+        def _solve_point(g, x0):
+            diag = np.bincount(r1[r1 >= 0], weights=g[r1 >= 0], minlength=n) \
+                + np.bincount(r2[r2 >= 0], weights=g[r2 >= 0], minlength=n)
+            data = np.bincount(slots, minlength=pattern.nnz,
+                               weights=np.concatenate((-g[both], -g[both],
+                                                       diag)))
+            A = sprs.csr_matrix((data, pattern.indices, pattern.indptr),
+                                shape=(n, n))
+            b = np.bincount(r1[b1], weights=g[b1]*x_bc[conns[b1, 1]],
+                            minlength=n) \
+                + np.bincount(r2[b2], weights=g[b2]*x_bc[conns[b2, 0]],
+                              minlength=n)
+            x = x_bc.copy()
+            atol = np.linalg.norm(b) * tol
+            res0 = np.linalg.norm(A * x0 - b)
+            if res0 > atol:
+                x[inner] = solver(A, b, atol=atol, rtol=atol/res0,
+                                  max_it=max_it, x0=x0)
+            else:
+                x[inner] = x0
+            # Net rate leaving the outlet pores, as in ``rate``
+            Qt = g * (x[conns[:, 0]] - x[conns[:, 1]])
+            Qp = np.bincount(conns[:, 1], weights=Qt, minlength=Np) \
+                - np.bincount(conns[:, 0], weights=Qt, minlength=Np)
+            return np.abs(np.sum(Qp[flow_pores[1]])), x[inner]
+
+        K = np.zeros((len(phases), len(points)))
+        if n_workers > 1:
+            with ThreadPoolExecutor(max_workers=n_workers) as pool:
+                jobs = [[pool.submit(_solve_point, g, np.zeros(n))
+                         for g in _conductances(i)] for i in points]
+                K = np.array([[job.result()[0] for job in point]
+                              for point in jobs]).T
+        else:
+            x0 = [np.zeros(n) for phase in phases]
+            for j, i in enumerate(points):
+                for k, g in enumerate(_conductances(i)):
+                    K[k, j], x0[k] = _solve_point(g, x0[k])
+        Kewp = list(K[1]) if len(phases) > 1 else None
+        Kenwp = list(K[0])
+        return Kewp, Kenwp
+
+    def run(self, Snwp_num=None, fast=False, n_workers=1):
         r"""
         Calculates the saturation of each phase using the invasion sequence.
 
@@ -306,6 +490,19 @@ class RelativePermeability(GenericAlgorithm):
             values. If not given, default value is 100. Saturation points will
             be Snwp_num (or 100 by default) equidistant points in range [0,1].
 
+        fast: bool, optional
+            If ``True`` the effective permeabilities are found by
+            ``_fast_eff_perm_sweep``, which reuses the multiphase models, the
+            sparsity pattern of the coefficient matrix and one solver across
+            all saturation points instead of re-adding the models and running
+            two new StokesFlow algorithms at each point.  The default is
+            ``False``.
+
+        n_workers: int, optional
+            The number of threads used to solve the saturation points
+            concurrently when ``fast`` is ``True``.  The default is 1.  With
+            the 'pypardiso' solver the solves are still run one at a time.
+
         Notes
         -----
         1. For three directions of flow the absolute permeability values will
@@ -320,6 +517,8 @@ class RelativePermeability(GenericAlgorithm):
         """
         if Snwp_num is None:
             Snwp_num = self.settings['Snwp_num']
+        self._event_log = None
+        self._occupancy_state = None
         net = self.project.network
         K_dir = set(self.settings['flow_inlets'].keys())
         for dim in K_dir:
@@ -351,13 +550,24 @@ class RelativePermeability(GenericAlgorithm):
             Snwparr = []
             flow_pores = [net.pores(self.settings['flow_inlets'][dirs]),
                           net.pores(self.settings['flow_outlets'][dirs])]
-            for j in range(start, stop, step):
-                sat = self._sat_occ_update(j)
-                Snwparr.append(sat)
-                [Kewp, Kenwp] = self._eff_perm_calc(flow_pores)
+            if fast:
+                points = np.arange(start, stop, step)
+                Snwparr = [self._get_saturation(j) for j in points]
+                Kewp, Kenwp = self._fast_eff_perm_sweep(flow_pores, points,
+                                                        n_workers=n_workers)
                 if self.settings['wp'] is not None:
-                    relperm_wp.append(Kewp/self.Kr_values['perm_abs_wp'][dirs])
-                relperm_nwp.append(Kenwp/self.Kr_values['perm_abs_nwp'][dirs])
+                    K_abs = self.Kr_values['perm_abs_wp'][dirs]
+                    relperm_wp = [K/K_abs for K in Kewp]
+                K_abs = self.Kr_values['perm_abs_nwp'][dirs]
+                relperm_nwp = [K/K_abs for K in Kenwp]
+            else:
+                for j in range(start, stop, step):
+                    sat = self._sat_occ_update(j)
+                    Snwparr.append(sat)
+                    [Kewp, Kenwp] = self._eff_perm_calc(flow_pores)
+                    if self.settings['wp'] is not None:
+                        relperm_wp.append(Kewp/self.Kr_values['perm_abs_wp'][dirs])
+                    relperm_nwp.append(Kenwp/self.Kr_values['perm_abs_nwp'][dirs])
             if self.settings['wp'] is not None:
                 self.Kr_values['relperm_wp'].update({dirs: relperm_wp})
             self.Kr_values['relperm_nwp'].update({dirs: relperm_nwp})
@@ -2,6 +2,7 @@ r"""
 Pore-scale models for calculating the advective-diffusive conductance of
 conduits.
 """
+import weakref as _weakref
 import numpy as _np
 
 __all__ = ["ad_dif"]
@@ -60,57 +61,152 @@ def ad_dif(target,
     diffusion-like processes and fluid flow need different shape factors.
 
     """
-    network = target.project.network
-    throats = network.map_throats(throats=target.Ts, origin=target)
+    kernel = AdvectionDiffusionKernel.from_target(target)
     phase = target.project.find_phase(target)
-    cn = network['throat.conns'][throats]
-    # Getting conduit lengths
-    L1 = network[conduit_lengths + '.pore1'][throats]
-    Lt = network[conduit_lengths + '.throat'][throats]
-    L2 = network[conduit_lengths + '.pore2'][throats]
-    # Preallocating g
-    g1, g2, gt = _np.zeros((3, len(Lt)))
-    # Setting g to inf when Li = 0 (ex. boundary pores)
-    # INFO: This is needed since area could also be zero, which confuses NumPy
-    m1, m2, mt = [Li != 0 for Li in [L1, L2, Lt]]
-    g1[~m1] = g2[~m2] = gt[~mt] = _np.inf
+    throats = kernel.throats
     # Find g for half of pore 1, throat, and half of pore 2
     P = phase[pore_pressure]
     gh = phase[throat_hydraulic_conductance][throats]
-    gd = phase[throat_diffusive_conductance][throats]
-    if gd.size == throats.size:
-        gd = _np.tile(gd, 2)
-    # Special treatment when gd is not Nt by 1 (ex. mass partitioning)
-    elif gd.size == 2 * throats.size:
-        gd = gd.reshape(throats.size * 2, order='F')
-    else:
-        raise Exception(f"Shape of {throat_diffusive_conductance} must either"
-                        r" be (Nt,1) or (Nt,2)")
-
-    Qij = -gh * _np.diff(P[cn], axis=1).squeeze()
-    Qij = _np.append(Qij, -Qij)
-
-    Peij = Qij / gd
-    Peij[(Peij < 1e-10) & (Peij >= 0)] = 1e-10
-    Peij[(Peij > -1e-10) & (Peij <= 0)] = -1e-10
+    gd = kernel.interleave(phase[throat_diffusive_conductance][throats],
+                           propname=throat_diffusive_conductance)
+
+    Qij = kernel.flow_rate(P=P, g=gh)
+    Peij = kernel.peclet(Q=Qij, gd=gd)
 
     # Export Peclet values (half only since Peij = -Peji)
     phase['throat.peclet.ad'] = _np.nan
-    phase['throat.peclet.ad'][throats] = _np.absolute(Peij[0:len(Lt)])
-
-    # Correct the flow rate
-    Qij = Peij * gd
-
-    if s_scheme == 'upwind':
-        w = gd + _np.maximum(0, -Qij)
-    elif s_scheme == 'hybrid':
-        w = _np.maximum(0, _np.maximum(-Qij, gd - Qij / 2))
-    elif s_scheme == 'powerlaw':
-        w = gd * _np.maximum(0, (1 - 0.1 * _np.absolute(Peij))**5) + \
-            _np.maximum(0, -Qij)
-    elif s_scheme == 'exponential':
-        w = -Qij / (1 - _np.exp(Peij))
-    else:
-        raise Exception('Unrecognized discretization scheme: ' + s_scheme)
-    w = w.reshape(throats.size, 2, order='F')
-    return w
+    phase['throat.peclet.ad'][throats] = _np.absolute(Peij[0:kernel.Nt])
+
+    w = kernel.conductance(Pe=Peij, gd=gd, s_scheme=s_scheme)
+    return kernel.to_pairs(w)
+
+
+class AdvectionDiffusionKernel:
+    r"""
+    Caches the static conduit data needed by the advective-diffusive
+    conductance models, so that only the flow-dependent terms (i.e. the
+    Peclet numbers) are computed on each call.
+
+    Parameters
+    ----------
+    target : GenericPhysics
+        The object whose throats the conductances are computed for.
+
+    Notes
+    -----
+    The throat locations and conduit connections of ``target`` are looked up
+    once and reused until the topology of the network or the throats of
+    ``target`` change. Use ``from_target`` to fetch the kernel kept for a
+    given object rather than creating a new one.
+
+    Throat values are handled as ``2*Nt`` long arrays, where the first ``Nt``
+    values correspond to the i→j direction and the last ``Nt`` values to the
+    j→i direction.
+
+    """
+    # Kernels are kept per object (by uuid) and dropped with the object
+    _cache = {}
+
+    def __init__(self, target):
+        network = target.project.network
+        self.throats = network.map_throats(throats=target.Ts, origin=target)
+        self.conns = network['throat.conns'][self.throats]
+        self.Nt = self.throats.size
+
+    @classmethod
+    def from_target(cls, target):
+        r"""
+        Returns the kernel kept for ``target``, creating (or refreshing) it
+        if necessary.
+        """
+        uuid = target.settings['_uuid']
+        kernel = cls._cache.get(uuid, None)
+        if (kernel is None) or (not kernel.is_valid(target)):
+            if kernel is None:
+                _weakref.finalize(target, cls._cache.pop, uuid, None)
+            kernel = cls(target)
+            cls._cache[uuid] = kernel
+        return kernel
+
+    def is_valid(self, target):
+        r"""
+        Checks whether the cached data still matches the given object.
+
+        Notes
+        -----
+        The kernel is valid as long as the cached throat indices still point
+        to the throats of ``target`` in the network and these throats still
+        connect the same pores. This catches changes to the locations of
+        ``target`` as well as trimming or editing ``throat.conns`` in place,
+        without redoing the (costlier) mapping of the throats.
+
+        """
+        network = target.project.network
+        ids = target['throat._id']
+        if ids.size != self.Nt:
+            return False
+        if self.Nt and (self.throats.max() >= network.Nt):
+            return False
+        return _np.array_equal(network['throat._id'][self.throats], ids) \
+            and _np.array_equal(network['throat.conns'][self.throats],
+                                self.conns)
+
+    def interleave(self, g, propname=''):
+        r"""
+        Converts throat values that are either Nt or (Nt, 2) long into a
+        2*Nt long array of directional values.
+        """
+        if g.size == self.Nt:
+            return _np.tile(g, 2)
+        # Special treatment when g is not Nt by 1 (ex. mass partitioning)
+        elif g.size == 2 * self.Nt:
+            return g.reshape(self.Nt * 2, order='F')
+        raise Exception(f"Shape of {propname} must either be (Nt,1) or (Nt,2)")
+
+    def to_pairs(self, w):
+        r"""
+        Converts a 2*Nt long array of directional values into (Nt, 2).
+        """
+        return w.reshape(self.Nt, 2, order='F')
+
+    def flow_rate(self, P, g):
+        r"""
+        Returns the directional rates driven by the pore values ``P`` through
+        conduits of conductance ``g``, which can be either Nt or 2*Nt long.
+        """
+        dP = P[self.conns[:, 1]] - P[self.conns[:, 0]]
+        if g.size == self.Nt:
+            g = _np.tile(g, 2)
+        return -g * _np.concatenate((dP, -dP))
+
+    @staticmethod
+    def peclet(Q, gd):
+        r"""
+        Returns the Peclet numbers for the given directional rates and
+        diffusive conductances, bounded away from 0.
+        """
+        Pe = Q / gd
+        small = _np.absolute(Pe) < 1e-10
+        Pe[small] = _np.where(Pe[small] >= 0, 1e-10, -1e-10)
+        return Pe
+
+    @staticmethod
+    def conductance(Pe, gd, s_scheme):
+        r"""
+        Returns the directional advective-diffusive conductances for the given
+        Peclet numbers using the specified discretization scheme.
+        """
+        # Correct the flow rate
+        Q = Pe * gd
+        if s_scheme == 'upwind':
+            w = gd + _np.maximum(0, -Q)
+        elif s_scheme == 'hybrid':
+            w = _np.maximum(0, _np.maximum(-Q, gd - Q / 2))
+        elif s_scheme == 'powerlaw':
+            w = gd * _np.maximum(0, (1 - 0.1 * _np.absolute(Pe))**5) + \
+                _np.maximum(0, -Q)
+        elif s_scheme == 'exponential':
+            w = -Q / (1 - _np.exp(Pe))
+        else:
+            raise Exception('Unrecognized discretization scheme: ' + s_scheme)
+        return w
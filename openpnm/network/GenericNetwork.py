@@ -116,6 +116,7 @@ class GenericNetwork(Base, ModelsMixin):
         # Initialize adjacency and incidence matrix dictionaries
         instance._im = {}
         instance._am = {}
+        instance._kd = None
         return instance
 
     def __init__(self, conns=None, coords=None, project=None, settings={},
@@ -144,6 +145,11 @@ class GenericNetwork(Base, ModelsMixin):
                     logger.warning('Converting throat.conns to be upper '
                                    + 'triangular')
                     value = np.sort(value, axis=1)
+            # Cached adjacency and incidence matrices are now out of date
+            self._am.clear()
+            self._im.clear()
+        if key == 'pore.coords':
+            self._kd = None
         super().__setitem__(key, value)
 
     def __getitem__(self, key):
@@ -248,6 +254,26 @@ class GenericNetwork(Base, ModelsMixin):
             self._im[fmt] = im
         return im
 
+    def get_kdtree(self):
+        r"""
+        Returns a KD-tree of the pore coordinates for fast spatial queries
+
+        Notes
+        -----
+        The tree is built on first use and stored for future use.  It holds
+        its own copy of the coordinates, which is compared to 'pore.coords'
+        on each call so that the tree is rebuilt if the coordinates were
+        changed, including in place.  This comparison is much cheaper than
+        building the tree.
+        """
+        coords = self['pore.coords']
+        kd = self._kd
+        if (kd is None) or (kd.data.shape != np.shape(coords)) \
+                or not np.array_equal(kd.data, coords):
+            kd = sptl.cKDTree(coords, copy_data=True)
+            self._kd = kd
+        return kd
+
     im = property(fget=get_incidence_matrix)
 
     am = property(fget=get_adjacency_matrix)
@@ -625,10 +651,10 @@ class GenericNetwork(Base, ModelsMixin):
         pores = self._parse_indices(pores)
         if np.size(pores) == 0:
             return np.array([], ndmin=1, dtype=int)
-        if 'lil' not in self._am.keys():
-            self.get_adjacency_matrix(fmt='lil')
+        if 'csr' not in self._am.keys():
+            self.get_adjacency_matrix(fmt='csr')
         neighbors = topotools.find_neighbor_sites(sites=pores, logic=mode,
-                                                  am=self._am['lil'],
+                                                  am=self._am['csr'],
                                                   flatten=flatten,
                                                   include_input=include_input)
         return neighbors
@@ -700,16 +726,11 @@ class GenericNetwork(Base, ModelsMixin):
         pores = self._parse_indices(pores)
         if np.size(pores) == 0:
             return np.array([], ndmin=1, dtype=int)
-        if flatten is False:
-            if 'lil' not in self._im.keys():
-                self.get_incidence_matrix(fmt='lil')
-            neighbors = topotools.find_neighbor_bonds(sites=pores, logic=mode,
-                                                      im=self._im['lil'],
-                                                      flatten=flatten)
-        else:
-            am = self.create_adjacency_matrix(fmt='coo', triu=True)
-            neighbors = topotools.find_neighbor_bonds(sites=pores, logic=mode,
-                                                      am=am, flatten=True)
+        if 'csr' not in self._im.keys():
+            self.get_incidence_matrix(fmt='csr')
+        neighbors = topotools.find_neighbor_bonds(sites=pores, logic=mode,
+                                                  im=self._im['csr'],
+                                                  flatten=flatten)
         return neighbors
 
     def _find_neighbors(self, pores, element, **kwargs):
@@ -855,11 +876,10 @@ class GenericNetwork(Base, ModelsMixin):
             return np.array([], dtype=np.int64)
         if r <= 0:
             raise Exception('Provided distances should be greater than 0')
-        # Create kdTree objects
-        kd = sptl.cKDTree(self['pore.coords'])
-        kd_pores = sptl.cKDTree(self['pore.coords'][pores])
-        # Perform search
-        Ps_within_r = kd_pores.query_ball_tree(kd, r=r)
+        # Perform search on the stored kdTree
+        kd = self.get_kdtree()
+        Ps_within_r = list(kd.query_ball_point(self['pore.coords'][pores], r=r,
+                                               return_sorted=True))
         # Remove self from each list
         for i, P in enumerate(Ps_within_r):
             Ps_within_r[i].remove(pores[i])
@@ -882,6 +902,163 @@ class GenericNetwork(Base, ModelsMixin):
                 Pn = temp
         return Pn
 
+    def find_pores_within(self, points, r, n_workers=1, ragged=False):
+        r"""
+        Find all pores within a given distance of each of the given points
+
+        Parameters
+        ----------
+        points : array_like
+            An N-by-3 array of coordinates around which to search
+
+        r : scalar or array_like
+            The search radius, either one value for all points or one value
+            for each point
+
+        n_workers : int
+            The number of threads used to run the queries.  Use -1 for all
+            available cores.  The default is 1.
+
+        ragged : bool
+            If ``True`` the result is returned as a tuple of ``(offsets,
+            values)`` arrays, with the pores near the i-th point found in
+            ``values[offsets[i]:offsets[i+1]]``.  The default is ``False``.
+
+        Returns
+        -------
+        A list containing an array of the pores within ``r`` of each point,
+        sorted by index, or an ``(offsets, values)`` tuple if ``ragged`` is
+        ``True``.
+
+        Examples
+        --------
+        >>> import openpnm as op
+        >>> pn = op.network.Cubic(shape=[3, 3, 3])
+        >>> Ps = pn.find_pores_within(points=[[0, 0, 0], [1, 1, 1]], r=1)
+        >>> print(Ps[0])
+        [0]
+        >>> print(Ps[1])
+        [ 0  1  3  4  9 10 12 13]
+
+        """
+        points = np.array(points, ndmin=2, dtype=float)
+        kd = self.get_kdtree()
+        hits = kd.query_ball_point(points, r=r, workers=n_workers,
+                                   return_sorted=True)
+        return self._format_hits(hits, ragged)
+
+    def find_nearest_pores(self, points, k=1, r=np.inf, n_workers=1):
+        r"""
+        Find the ``k`` pores nearest to each of the given points
+
+        Parameters
+        ----------
+        points : array_like
+            An N-by-3 array of coordinates for which to find the nearest pores
+
+        k : int
+            The number of nearest pores to find for each point.  The default
+            is 1.
+
+        r : scalar
+            Only pores closer than this distance are returned.  Missing
+            neighbors are indicated with a distance of ``inf`` and an index
+            of ``Np``.  The default is ``inf``.
+
+        n_workers : int
+            The number of threads used to run the queries.  Use -1 for all
+            available cores.  The default is 1.
+
+        Returns
+        -------
+        A tuple of N-by-k arrays containing the distances to and the indices
+        of the nearest pores, in order of increasing distance.
+
+        Examples
+        --------
+        >>> import openpnm as op
+        >>> pn = op.network.Cubic(shape=[3, 3, 3])
+        >>> d, Ps = pn.find_nearest_pores(points=[[0.1, 0.2, 0.4]])
+        >>> print(Ps)
+        [[0]]
+
+        """
+        points = np.array(points, ndmin=2, dtype=float)
+        kd = self.get_kdtree()
+        d, Ps = kd.query(points, k=[i + 1 for i in range(k)],
+                         distance_upper_bound=r, workers=n_workers)
+        return d, Ps
+
+    def find_pores_in_box(self, lo, hi, n_workers=1, ragged=False):
+        r"""
+        Find all pores inside each of the given axis-aligned boxes
+
+        Parameters
+        ----------
+        lo, hi : array_like
+            The N-by-3 arrays of the lower and upper corners of each box,
+            or single corners to search one box.  Pores on the faces of a
+            box are considered inside.
+
+        n_workers : int
+            The number of threads used to run the queries.  Use -1 for all
+            available cores.  The default is 1.
+
+        ragged : bool
+            If ``True`` the result is returned as a tuple of ``(offsets,
+            values)`` arrays, as done by ``find_pores_within``.  The default
+            is ``False``.
+
+        Returns
+        -------
+        A list containing an array of the pores inside each box, sorted by
+        index, or an ``(offsets, values)`` tuple if ``ragged`` is ``True``.
+
+        Examples
+        --------
+        >>> import openpnm as op
+        >>> pn = op.network.Cubic(shape=[3, 3, 3])
+        >>> Ps = pn.find_pores_in_box(lo=[0, 0, 0], hi=[2, 1, 1])
+        >>> print(Ps[0])
+        [0 9]
+
+        """
+        lo = np.array(lo, ndmin=2, dtype=float)
+        hi = np.array(hi, ndmin=2, dtype=float)
+        # Find the pores within the sphere enclosing each box in the max norm,
+        # padded against round off, then keep the ones inside the box
+        kd = self.get_kdtree()
+        r = np.amax(hi - lo, axis=1)/2
+        hits = kd.query_ball_point((lo + hi)/2, r=r*(1 + 1e-9) + 1e-300,
+                                   p=np.inf, workers=n_workers,
+                                   return_sorted=True)
+        offsets, values = self._format_hits(hits, ragged=True)
+        owner = np.repeat(np.arange(offsets.size - 1), np.diff(offsets))
+        crds = self['pore.coords'][values]
+        keep = np.all((crds >= lo[owner]) * (crds <= hi[owner]), axis=1)
+        counts = np.zeros(values.size + 1, dtype=np.int64)
+        np.cumsum(keep, out=counts[1:])
+        offsets, values = counts[offsets], values[keep]
+        if ragged:
+            return offsets, values
+        return np.split(values, offsets[1:-1])
+
+    @staticmethod
+    def _format_hits(hits, ragged):
+        r"""
+        Converts the lists of indices returned by the KD-tree queries into
+        a list of arrays or a ragged ``(offsets, values)`` tuple
+        """
+        lengths = np.fromiter((len(item) for item in hits), dtype=np.int64,
+                              count=len(hits))
+        offsets = np.zeros(len(hits) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        values = np.fromiter((i for item in hits for i in item),
+                             dtype=np.int64, count=offsets[-1])
+        if ragged:
+            return offsets, values
+        return np.split(values, offsets[1:-1])
+
     @property
     def conns(self):
         return self['throat.conns']
@@ -19,15 +19,18 @@ from .topotools import find_surface_pores
 from .topotools import find_pore_to_pore_distance
 from .topotools import generate_base_points
 from .topotools import iscoplanar
+from .topotools import iter_pore_to_pore_distance
 from .topotools import isoutside
 from .topotools import label_faces
 from .topotools import merge_networks
 from .topotools import merge_pores
+from .topotools import NetworkBuilder
 from .topotools import reduce_coordination
 from .topotools import reflect_base_points
 from .topotools import rotate_coords
 from .topotools import shear_coords
 from .topotools import stitch
+from .topotools import stitch_many
 from .topotools import stitch_pores
 from .topotools import subdivide
 from .topotools import template_cylinder_annulus
@@ -41,6 +44,7 @@ from .perctools import site_percolation
 from .perctools import bond_percolation
 from .perctools import find_clusters
 from .perctools import find_path
+from .perctools import analyze_clusters
 
 from .graphtools import find_neighbor_sites
 from .graphtools import find_neighbor_bonds
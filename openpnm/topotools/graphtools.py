@@ -7,8 +7,84 @@ logger = logging.getLogger(__name__)
 ws = Workspace()
 
 
+def _csr_gather(csr, sites):
+    r"""
+    Gathers the column indices of the given rows of a CSR matrix.
+
+    Returns
+    -------
+    offsets, values : ndarray
+        The concatenated column indices of all requested rows in ``values``,
+        with those of the i-th row found in ``values[offsets[i]:offsets[i+1]]``
+    """
+    starts = csr.indptr[sites]
+    lengths = csr.indptr[sites + 1] - starts
+    offsets = np.zeros(sites.size + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    inds = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], lengths)
+    values = csr.indices[inds].astype(np.int64)
+    return offsets, values
+
+
+def _filter_ragged(offsets, values, mask):
+    r"""
+    Removes the values that are ``False`` in ``mask`` from a ragged
+    (offsets, values) pair, and returns the new pair
+    """
+    keep = mask[values]
+    counts = np.zeros(values.size + 1, dtype=np.int64)
+    np.cumsum(keep, out=counts[1:])
+    return counts[offsets], values[keep]
+
+
+def _ragged_to_list(offsets, values):
+    r"""
+    Splits a ragged (offsets, values) pair into a list of arrays
+    """
+    return np.split(values, offsets[1:-1])
+
+
+def _to_sorted_csr(mat):
+    r"""
+    Returns the given sparse matrix in CSR format with sorted indices
+    """
+    if mat.format != 'csr':
+        mat = mat.tocsr()
+    if not mat.has_sorted_indices:
+        mat = mat.sorted_indices()
+    return mat
+
+
+def _parse_sites(sites):
+    sites = np.array(sites, ndmin=1)
+    if sites.dtype == bool:
+        sites = np.where(sites)[0]
+    return sites.astype(np.int64)
+
+
+def _apply_neighbor_logic(values, n_rows, n_max, logic, xnor_names):
+    r"""
+    Filters the neighbors of all the given rows by the given logic, and
+    returns the sorted unique neighbors that pass.  The rows must be unique,
+    otherwise the neighbors of a repeated row are counted once per repeat.
+    """
+    if logic in ['or', 'union', 'any']:
+        neighbors = np.unique(values)
+    elif logic in ['xor', 'exclusive_or']:
+        neighbors = np.where(np.bincount(values, minlength=n_max) == 1)[0]
+    elif logic in xnor_names:
+        neighbors = np.where(np.bincount(values, minlength=n_max) > 1)[0]
+    elif logic in ['and', 'all', 'intersection']:
+        # Rows hold no duplicates, so a neighbor of all rows appears n_rows times
+        counts = np.bincount(values, minlength=n_max)
+        neighbors = np.where(counts == n_rows)[0]
+    else:
+        raise Exception('Specified logic is not implemented')
+    return neighbors.astype(np.int64)
+
+
 def find_neighbor_sites(sites, am, flatten=True, include_input=False,
-                        logic='or'):
+                        logic='or', ragged=False):
     r"""
     Given a symmetric adjacency matrix, finds all sites that are connected
     to the input sites.
@@ -18,14 +94,13 @@ def find_neighbor_sites(sites, am, flatten=True, include_input=False,
     am : scipy.sparse matrix
         The adjacency matrix of the network.  Must be symmetrical such that if
         sites *i* and *j* are connected, the matrix contains non-zero values
-        at locations (i, j) and (j, i).
+        at locations (i, j) and (j, i).  Passing the matrix in CSR format
+        avoids a conversion on each call.
 
     flatten : boolean
         If ``True`` (default) the returned result is a compressed array of all
         neighbors, or a list of lists with each sub-list containing the
-        neighbors for each input site.  Note that an *unflattened* list might
-        be slow to generate since it is a Python ``list`` rather than a Numpy
-        array.
+        neighbors for each input site.
 
     include_input : boolean
         If ``False`` (default) the input sites will be removed from the result.
@@ -50,11 +125,19 @@ def find_neighbor_sites(sites, am, flatten=True, include_input=False,
         known as 'intersection' in set theory and (somtimes) as 'all' in
         boolean logic.  Both keywords are accepted and treated as 'and'.
 
+    ragged : boolean
+        Only used when ``flatten`` is ``False``.  If ``True`` the neighbors
+        are returned as a tuple of ``(offsets, values)`` arrays, with the
+        neighbors of the i-th input site found in
+        ``values[offsets[i]:offsets[i+1]]``, which avoids building a Python
+        list.  The default is ``False``.
+
     Returns
     -------
     An array containing the neighboring sites filtered by the given logic.  If
     ``flatten`` is ``False`` then the result is a list of lists containing the
-    neighbors of each input site.
+    neighbors of each input site, or an ``(offsets, values)`` tuple if
+    ``ragged`` is ``True``.
 
     See Also
     --------
@@ -68,30 +151,20 @@ def find_neighbor_sites(sites, am, flatten=True, include_input=False,
     is not possible to return a list of neighbors for each input site if global
     sites are considered.
 
+    The neighbors are gathered directly from the ``indptr`` and ``indices``
+    arrays of the CSR matrix, so the cost only depends on the number of
+    neighbors of the input sites.
+
     """
-    if am.format != 'lil':
-        am = am.tolil(copy=False)
-    sites = np.array(sites, ndmin=1)
+    sites = _parse_sites(sites)
     if len(sites) == 0:
         return []
-    am_coo = am.tocoo()
+    am = _to_sorted_csr(am)
     n_sites = am.shape[0]
-    rows = am.rows[sites].tolist()
-    if len(rows) == 0:
-        return []
-    neighbors = am_coo.col[np.in1d(am_coo.row, sites)]
-    if logic in ['or', 'union', 'any']:
-        neighbors = np.unique(neighbors)
-    elif logic in ['xor', 'exclusive_or']:
-        neighbors = np.unique(np.where(np.bincount(neighbors) == 1)[0])
-    elif logic in ['xnor', 'nxor']:
-        neighbors = np.unique(np.where(np.bincount(neighbors) > 1)[0])
-    elif logic in ['and', 'all', 'intersection']:
-        neighbors = set(neighbors)
-        [neighbors.intersection_update(i) for i in rows]
-        neighbors = np.array(list(neighbors), dtype=np.int64, ndmin=1)
-    else:
-        raise Exception('Specified logic is not implemented')
+    unique_sites = np.unique(sites)
+    values = _csr_gather(am, unique_sites)[1]
+    neighbors = _apply_neighbor_logic(values, unique_sites.size, n_sites,
+                                      logic, xnor_names=['xnor', 'nxor'])
     # Deal with removing inputs or not
     mask = np.zeros(shape=n_sites, dtype=bool)
     mask[neighbors] = True
@@ -101,17 +174,17 @@ def find_neighbor_sites(sites, am, flatten=True, include_input=False,
     if flatten:
         neighbors = np.where(mask)[0]
     else:
-        if neighbors.size > 0:
-            for i in range(len(rows)):
-                vals = np.array(rows[i], dtype=np.int64)
-                rows[i] = vals[mask[vals]]
-            neighbors = rows
+        offsets, values = _csr_gather(am, sites)
+        offsets, values = _filter_ragged(offsets, values, mask)
+        if ragged:
+            neighbors = (offsets, values)
         else:
-            neighbors = [np.array([], dtype=int) for i in range(len(sites))]
+            neighbors = _ragged_to_list(offsets, values)
     return neighbors
 
 
-def find_neighbor_bonds(sites, im=None, am=None, flatten=True, logic='or'):
+def find_neighbor_bonds(sites, im=None, am=None, flatten=True, logic='or',
+                        ragged=False):
     r"""
     Given an incidence matrix, finds all sites that are connected to the
     input sites.
@@ -123,20 +196,20 @@ def find_neighbor_bonds(sites, im=None, am=None, flatten=True, logic='or'):
     im : scipy.sparse matrix
         The incidence matrix of the network.  Must be shaped as (N-sites,
         N-bonds), with non-zeros indicating which sites are connected. Either
-        ``am`` or ``im`` must be given.  Passing in ``im`` is slower, but more
-        powerful as it allows for an unflattened list of neighbors.
+        ``am`` or ``im`` must be given.  Passing in ``im`` allows for an
+        unflattened list of neighbors, and only touches the neighbors of the
+        input sites.  Passing the matrix in CSR format avoids a conversion on
+        each call.
 
     am : scipy.sparse matrix (optional)
         The adjacency matrix of the network. Either ``am`` or ``im`` must be
-        given.  Passing in ``am`` is faster, but does not allow for an
+        given.  Passing in ``am`` scans all bonds, and does not allow for an
         unflattened list.
 
     flatten : boolean (default is ``True``)
         Indicates whether the returned result is a compressed array of all
         neighbors, or a list of lists with each sub-list containing the
-        neighbors for each input site.  Note that an *unflattened* list might
-        be slow to generate since it is a Python ``list`` rather than a Numpy
-        array.
+        neighbors for each input site.
 
     logic : string
         Specifies logic to filter the resulting list.  Options are:
@@ -158,11 +231,18 @@ def find_neighbor_bonds(sites, im=None, am=None, flatten=True, logic='or'):
         known as 'intersection' in set theory and (somtimes) as 'all' in
         boolean logic.  Both keywords are accepted and treated as 'and'.
 
+    ragged : boolean
+        Only used when ``flatten`` is ``False``.  If ``True`` the neighbors
+        are returned as a tuple of ``(offsets, values)`` arrays, with the
+        neighbors of the i-th input site found in
+        ``values[offsets[i]:offsets[i+1]]``.  The default is ``False``.
+
     Returns
     -------
     An array containing the neighboring bonds filtered by the given logic.  If
     ``flatten`` is ``False`` then the result is a list of lists containing the
-    neighbors of each given input site.
+    neighbors of each given input site, or an ``(offsets, values)`` tuple if
+    ``ragged`` is ``True``.
 
     See Also
     --------
@@ -178,35 +258,24 @@ def find_neighbor_bonds(sites, im=None, am=None, flatten=True, logic='or'):
 
     """
     if im is not None:
-        if im.format != 'lil':
-            im = im.tolil(copy=False)
-        rows = [im.rows[i] for i in np.array(sites, ndmin=1, dtype=np.int64)]
-        if len(rows) == 0:
+        sites = _parse_sites(sites)
+        if len(sites) == 0:
             return []
-        neighbors = np.hstack(rows).astype(np.int64)
-        n_bonds = int(im.nnz / 2)
-        if logic in ['or', 'union', 'any']:
-            neighbors = np.unique(neighbors)
-        elif logic in ['xor', 'exclusive_or']:
-            neighbors = np.unique(np.where(np.bincount(neighbors) == 1)[0])
-        elif logic in ['xnor', 'shared']:
-            neighbors = np.unique(np.where(np.bincount(neighbors) > 1)[0])
-        elif logic in ['and', 'all', 'intersection']:
-            neighbors = set(neighbors)
-            [neighbors.intersection_update(i) for i in rows]
-            neighbors = np.array(list(neighbors), dtype=int, ndmin=1)
-        else:
-            raise Exception('Specified logic is not implemented')
-        if (flatten is False):
-            if (neighbors.size > 0):
-                mask = np.zeros(shape=n_bonds, dtype=bool)
-                mask[neighbors] = True
-                for i in range(len(rows)):
-                    vals = np.array(rows[i], dtype=np.int64)
-                    rows[i] = vals[mask[vals]]
-                neighbors = rows
+        im = _to_sorted_csr(im)
+        n_bonds = im.shape[1]
+        unique_sites = np.unique(sites)
+        values = _csr_gather(im, unique_sites)[1]
+        neighbors = _apply_neighbor_logic(values, unique_sites.size, n_bonds,
+                                          logic, xnor_names=['xnor', 'shared'])
+        if flatten is False:
+            mask = np.zeros(shape=n_bonds, dtype=bool)
+            mask[neighbors] = True
+            offsets, values = _csr_gather(im, sites)
+            offsets, values = _filter_ragged(offsets, values, mask)
+            if ragged:
+                neighbors = (offsets, values)
             else:
-                neighbors = [np.array([], dtype=np.int64) for i in range(len(sites))]
+                neighbors = _ragged_to_list(offsets, values)
         return neighbors
     elif am is not None:
         if am.format != 'coo':
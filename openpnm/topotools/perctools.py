@@ -1,3 +1,4 @@
+import heapq as hq
 import numpy as np
 import scipy.sparse as sprs
 from scipy.sparse import csgraph
@@ -110,7 +111,6 @@ def site_percolation(ij, occupied_sites):
 
     """
     from collections import namedtuple
-    import scipy.stats as spst
 
     Np = np.size(occupied_sites)
     occupied_bonds = np.all(occupied_sites[ij], axis=1)
@@ -119,9 +119,7 @@ def site_percolation(ij, occupied_sites):
     adj_mat.eliminate_zeros()
     clusters = csgraph.connected_components(csgraph=adj_mat, directed=False)[1]
     clusters[~occupied_sites] = -1
-    s_labels = spst.rankdata(clusters + 1, method="dense") - 1
-    if np.any(~occupied_sites):
-        s_labels -= 1
+    s_labels = _dense_mapping(clusters)[clusters]
     b_labels = np.amin(s_labels[ij], axis=1)
     tup = namedtuple('cluster_labels', ('sites', 'bonds'))
     return tup(s_labels, b_labels)
@@ -282,7 +280,155 @@ def _bond_percolation(network, tmask):
     return (p_clusters, t_clusters)
 
 
-def find_path(network, pore_pairs, weights=None):
+def analyze_clusters(network, mask, pore_volume=None, throat_volume=None,
+                     tol=0.0):
+    r"""
+    Identifies the clusters of pores and throats in the network along with
+    their size, volume, bounding box and spanning status
+
+    Parameters
+    ----------
+    network : OpenPNM Network Object
+        The network
+
+    mask : array_like, boolean
+        A list of active bonds or sites (throats or pores).  If the mask is
+        Np long, then the method will perform a site percolation, and if
+        the mask is Nt long bond percolation will be performed, as done by
+        ``find_clusters``.
+
+    pore_volume, throat_volume : array_like, optional
+        The volumes of the pores and throats, which are summed over each
+        cluster.  If neither is given the cluster volumes are not computed.
+
+    tol : float
+        The fraction of the domain size by which the bounding box of a
+        cluster may fall short of the domain edges and still be considered
+        spanning.  The default is 0.
+
+    Returns
+    -------
+    A named tuple containing:
+
+    **pores**, **throats** : The Np and Nt long cluster labels, numbered
+    from 0 to Nc - 1, with -1 indicating locations outside any cluster
+
+    **num_pores**, **num_throats** : The number of pores and throats in each
+    cluster
+
+    **volume** : The total pore and throat volume of each cluster, or
+    ``None`` if no volumes were given
+
+    **bbox** : An Nc x 2 x 3 array containing the minimum and maximum pore
+    coordinates of each cluster
+
+    **spanning** : An Nc x 3 boolean array indicating if each cluster spans
+    the network from one side to the other in the x, y and z directions
+
+    Notes
+    -----
+    The labels are the same as those returned by ``find_clusters`` but
+    renumbered consecutively.  All statistics are computed by single
+    ``bincount`` style reductions over the labels, so no sorting is needed.
+
+    Examples
+    --------
+    >>> import openpnm as op
+    >>> pn = op.network.Cubic(shape=[5, 5, 1])
+    >>> mask = pn['pore.coords'][:, 0] < 2
+    >>> stats = op.topotools.analyze_clusters(network=pn, mask=mask)
+    >>> stats.num_pores
+    array([10])
+    >>> stats.spanning
+    array([[False,  True, False]])
+
+    """
+    from collections import namedtuple
+    p_labels, t_labels = find_clusters(network=network, mask=mask)
+    mapping = _dense_mapping(p_labels)
+    p_labels, t_labels = mapping[p_labels], mapping[t_labels]
+    Nc = int(np.amax(mapping)) + 1
+
+    Pin, Tin = p_labels >= 0, t_labels >= 0
+    num_pores = np.bincount(p_labels[Pin], minlength=Nc)
+    num_throats = np.bincount(t_labels[Tin], minlength=Nc)
+    volume = None
+    if (pore_volume is not None) or (throat_volume is not None):
+        volume = np.zeros(Nc, dtype=float)
+        if pore_volume is not None:
+            w = np.array(pore_volume, ndmin=1, dtype=float)
+            volume += np.bincount(p_labels[Pin], weights=w[Pin], minlength=Nc)
+        if throat_volume is not None:
+            w = np.array(throat_volume, ndmin=1, dtype=float)
+            volume += np.bincount(t_labels[Tin], weights=w[Tin], minlength=Nc)
+
+    coords = np.ascontiguousarray(network['pore.coords'], dtype=float)
+    bbox = _get_cluster_bbox_kernel()(p_labels.astype(np.int64), coords, Nc)
+    lo, hi = np.amin(coords, axis=0), np.amax(coords, axis=0)
+    span = hi - lo
+    spanning = (bbox[:, 0, :] <= lo + tol*span) \
+        * (bbox[:, 1, :] >= hi - tol*span) * (span > 0)
+
+    tup = namedtuple('cluster_stats', ('pores', 'throats', 'num_pores',
+                                       'num_throats', 'volume', 'bbox',
+                                       'spanning'))
+    return tup(p_labels, t_labels, num_pores, num_throats, volume, bbox,
+               spanning)
+
+
+def _dense_mapping(labels):
+    r"""
+    Returns an array which renumbers the non-negative ``labels``
+    consecutively from 0 when indexed by them, keeping their order.  This
+    is equivalent to a dense ranking but needs no sorting.  The last entry
+    is -1 so that unlabelled locations stay at -1.
+    """
+    present = np.zeros(max(np.amax(labels, initial=-1) + 2, 1), dtype=bool)
+    present[labels[labels >= 0]] = True
+    mapping = np.cumsum(present) - 1
+    mapping[-1] = -1
+    return mapping
+
+
+def _cluster_bbox_kernel(labels, coords, n_clusters):
+    r"""
+    Finds the minimum and maximum coordinates of the sites in each cluster
+    in a single pass
+    """
+    n_dims = coords.shape[1]
+    bbox = np.empty((n_clusters, 2, n_dims))
+    bbox[:, 0, :] = np.inf
+    bbox[:, 1, :] = -np.inf
+    for i in range(labels.size):
+        c = labels[i]
+        if c < 0:
+            continue
+        for j in range(n_dims):
+            v = coords[i, j]
+            if v < bbox[c, 0, j]:
+                bbox[c, 0, j] = v
+            if v > bbox[c, 1, j]:
+                bbox[c, 1, j] = v
+    return bbox
+
+
+_compiled_cluster_bbox_kernel = None
+
+
+def _get_cluster_bbox_kernel():
+    r"""
+    Returns the compiled bounding box kernel, compiling it on first use.
+    """
+    global _compiled_cluster_bbox_kernel
+    if _compiled_cluster_bbox_kernel is None:
+        from numba import njit, int64, float64
+        sig = float64[:, :, ::1](int64[::1], float64[:, ::1], int64)
+        _compiled_cluster_bbox_kernel = njit(sig, cache=True)(
+            _cluster_bbox_kernel)
+    return _compiled_cluster_bbox_kernel
+
+
+def find_path(network, pore_pairs, weights=None, ragged=False):
     r"""
     Find the shortest path between pairs of pores.
 
@@ -301,18 +447,26 @@ def find_path(network, pore_pairs, weights=None):
         the phase configuration.  If no weights are given then the
         standard topological connections of the Network are used.
 
+    ragged : boolean, optional
+        If ``True`` the paths are returned as ``(offsets, values)`` tuples of
+        arrays, with the path of the i-th pair found in
+        ``values[offsets[i]:offsets[i+1]]``, instead of lists of arrays.  This
+        is much more compact when many pairs are requested.  The default is
+        ``False``.
+
     Returns
     -------
     A dictionary containing both the pores and throats that define the
-    shortest path connecting each pair of input pores.
+    shortest path connecting each pair of input pores, in order from the
+    first to the second pore of each pair.  The paths of pairs that are not
+    connected are empty.
 
     Notes
     -----
-    The shortest path is found using Dijkstra's algorithm included in the
-    scipy.sparse.csgraph module
-
-    TODO: The returned throat path contains the correct values, but not
-    necessarily in the true order
+    The pairs are grouped by their first pore, and a single search using
+    Dijkstra's algorithm is run from each of these pores, which stops as soon
+    as all the pores paired with it have been reached.  The searches and the
+    walks back along the predecessors are compiled with numba.
 
     Examples
     --------
@@ -324,26 +478,148 @@ def find_path(network, pore_pairs, weights=None):
     >>> a['throats']
     [array([ 0, 19]), array([ 0, 37])]
     """
-    Ps = np.array(pore_pairs, ndmin=2)
+    Ps = np.array(pore_pairs, ndmin=2, dtype=np.int64)
     if weights is None:
-        weights = np.ones_like(network.Ts)
-    graph = network.create_adjacency_matrix(weights=weights, fmt='csr',
-                                            drop_zeros=False)
-    paths = csgraph.dijkstra(csgraph=graph, indices=Ps[:, 0],
-                             return_predecessors=True)[1]
-    pores = []
-    throats = []
-    for row in range(0, np.shape(Ps)[0]):
-        j = Ps[row][1]
-        ans = []
-        while paths[row][j] > -9999:
-            ans.append(j)
-            j = paths[row][j]
-        ans.append(Ps[row][0])
-        ans.reverse()
-        pores.append(np.array(ans, dtype=int))
-        Ts = network.find_neighbor_throats(pores=ans, mode='xnor')
-        throats.append(np.array(Ts, dtype=int))
+        weights = np.ones(network.Nt, dtype=float)
+    weights = np.array(weights, dtype=float, ndmin=1)
+    if np.any(weights < 0):
+        raise Exception('Throat weights must not be negative')
+    # Build a CSR adjacency structure holding the throat of each entry
+    conns = network['throat.conns']
+    rows = np.concatenate((conns[:, 0], conns[:, 1]))
+    order = np.argsort(rows, kind='stable')
+    indices = np.concatenate((conns[:, 1], conns[:, 0]))[order]
+    bonds = np.tile(np.arange(network.Nt, dtype=np.int64), 2)[order]
+    indptr = np.zeros(network.Np + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=network.Np), out=indptr[1:])
+    # Group the pairs by source pore
+    pair_order = np.argsort(Ps[:, 0], kind='stable')
+    sources, group_ptr = np.unique(Ps[pair_order, 0], return_index=True)
+    group_ptr = np.append(group_ptr, Ps.shape[0]).astype(np.int64)
+    kernel = _get_find_path_kernel()
+    p_off, p_vals, t_off, t_vals = kernel(
+        indptr, np.ascontiguousarray(indices, dtype=np.int64), bonds,
+        np.ascontiguousarray(weights[bonds]),
+        np.ascontiguousarray(sources, dtype=np.int64), group_ptr,
+        np.ascontiguousarray(Ps[pair_order, 1]))
+    # Put the paths back in the order of the given pairs
+    rank = np.empty_like(pair_order)
+    rank[pair_order] = np.arange(pair_order.size)
+    pores = _reorder_ragged(p_off, p_vals, rank)
+    throats = _reorder_ragged(t_off, t_vals, rank)
+    if not ragged:
+        pores = np.split(pores[1], pores[0][1:-1])
+        throats = np.split(throats[1], throats[0][1:-1])
     pdict = PrintableDict
     dict_ = pdict(**{'pores': pores, 'throats': throats})
     return dict_
+
+
+def _reorder_ragged(offsets, values, rank):
+    r"""
+    Reorders a ragged (offsets, values) pair so that the entry found at
+    position ``rank[i]`` moves to position ``i``
+    """
+    starts = offsets[rank]
+    lengths = offsets[rank + 1] - starts
+    new_offsets = np.zeros(rank.size + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    inds = np.arange(new_offsets[-1]) \
+        + np.repeat(starts - new_offsets[:-1], lengths)
+    return new_offsets, values[inds]
+
+
+def _find_path_kernel(indptr, indices, bonds, weights, sources, group_ptr,
+                      targets):
+    r"""
+    Pure python version of the batched shortest path search, which is
+    compiled by numba in ``_get_find_path_kernel``.  Returns the ragged
+    pore and throat paths for the targets in the given order.
+    """
+    Np = indptr.size - 1
+    n_pairs = targets.size
+    dist = np.zeros(Np)
+    pred = -np.ones(Np, dtype=np.int64)
+    pred_bond = -np.ones(Np, dtype=np.int64)
+    # Stamps record the search in which each entry was last written, so the
+    # arrays never need to be reset between searches
+    reached = -np.ones(Np, dtype=np.int64)
+    settled = -np.ones(Np, dtype=np.int64)
+    wanted = -np.ones(Np, dtype=np.int64)
+    walk = np.zeros(Np, dtype=np.int64)
+    p_offsets = np.zeros(n_pairs + 1, dtype=np.int64)
+    t_offsets = np.zeros(n_pairs + 1, dtype=np.int64)
+    p_vals = np.zeros(max(4*n_pairs, 16), dtype=np.int64)
+    t_vals = np.zeros(max(4*n_pairs, 16), dtype=np.int64)
+    n_p = 0
+    n_t = 0
+    for g in range(sources.size):
+        s = sources[g]
+        n_left = 0
+        for k in range(group_ptr[g], group_ptr[g+1]):
+            if wanted[targets[k]] != g:
+                wanted[targets[k]] = g
+                n_left += 1
+        dist[s] = 0.0
+        pred[s] = -1
+        reached[s] = g
+        heap = [(0.0, s)]
+        # Stop as soon as all targets of this source are settled
+        while (len(heap) > 0) and (n_left > 0):
+            d, u = hq.heappop(heap)
+            if settled[u] == g:
+                continue
+            settled[u] = g
+            if wanted[u] == g:
+                n_left -= 1
+            for e in range(indptr[u], indptr[u+1]):
+                v = indices[e]
+                nd = d + weights[e]
+                if (reached[v] != g) or (nd < dist[v]):
+                    reached[v] = g
+                    dist[v] = nd
+                    pred[v] = u
+                    pred_bond[v] = bonds[e]
+                    hq.heappush(heap, (nd, v))
+        # Walk back along the predecessors of each target
+        for k in range(group_ptr[g], group_ptr[g+1]):
+            v = targets[k]
+            if settled[v] == g:
+                n = 0
+                while v != -1:
+                    walk[n] = v
+                    n += 1
+                    v = pred[v]
+                if n_p + n > p_vals.size:
+                    temp = np.zeros(max(2*p_vals.size, n_p + n), dtype=np.int64)
+                    temp[:n_p] = p_vals[:n_p]
+                    p_vals = temp
+                    temp = np.zeros(p_vals.size, dtype=np.int64)
+                    temp[:n_t] = t_vals[:n_t]
+                    t_vals = temp
+                for i in range(n):
+                    p_vals[n_p + i] = walk[n - 1 - i]
+                for i in range(n - 1):
+                    t_vals[n_t + i] = pred_bond[walk[n - 2 - i]]
+                n_p += n
+                n_t += n - 1
+            p_offsets[k+1] = n_p
+            t_offsets[k+1] = n_t
+    return p_offsets, p_vals[:n_p].copy(), t_offsets, t_vals[:n_t].copy()
+
+
+_compiled_find_path_kernel = None
+
+
+def _get_find_path_kernel():
+    r"""
+    Returns the compiled shortest path kernel, compiling it on first use.
+    """
+    global _compiled_find_path_kernel
+    if _compiled_find_path_kernel is None:
+        from numba import njit, int64, float64, types
+        i1d = int64[::1]
+        sig = types.Tuple((i1d, i1d, i1d, i1d))(i1d, i1d, i1d, float64[::1],
+                                                i1d, i1d, i1d)
+        _compiled_find_path_kernel = njit(sig, cache=True)(_find_path_kernel)
+    return _compiled_find_path_kernel
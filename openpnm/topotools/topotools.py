@@ -177,7 +177,7 @@ def shear_coords(network, ay=0, az=0, bx=0, bz=0, cx=0, cy=0, S=None):
     network['pore.coords'] = (S@network['pore.coords'].T).T
 
 
-def trim(network, pores=[], throats=[]):
+def trim(network, pores=[], throats=[], chunk_size=None):
     '''
     Remove pores or throats from the network
 
@@ -188,6 +188,21 @@ def trim(network, pores=[], throats=[]):
     pores (or throats) : array_like
         The indices of the of the pores or throats to be removed from the
         network.
+    chunk_size : int, optional
+        If given, each array is compacted in place, copying at most this
+        many entries at a time, instead of being copied into a new array.
+        This bounds the extra memory needed when trimming very large
+        networks, but note that arrays shared with other variables outside
+        the project are then modified as well.  Views, and arrays sharing
+        memory with any other array in the project, are still copied.  The
+        default is ``None``.
+
+    Notes
+    -----
+    The pores and throats to keep on every object of the project are found
+    once, before any data is changed, and each array is then trimmed by a
+    single vectorized gather.  Cached CSR adjacency and incidence matrices
+    on the network are trimmed along with the data rather than discarded.
 
     Examples
     --------
@@ -212,15 +227,9 @@ def trim(network, pores=[], throats=[]):
         Pkeep[pores] = False
         if not np.any(Pkeep):
             raise Exception('Cannot delete ALL pores')
-        # # Performing customized find_neighbor_throats which is much faster, but
-        # # not general for other types of queries
-        # temp = np.in1d(network['throat.conns'].flatten(), pores)
-        # temp = np.reshape(temp, (network.Nt, 2))
-        # Ts = np.any(temp, axis=1)
-        # Ts = network.Ts[Ts]
-        Ts = network.find_neighbor_throats(pores=~Pkeep, mode='union')
-        if len(Ts) > 0:
-            Tkeep[Ts] = False
+        # Remove all throats connected to a removed pore
+        conns = network['throat.conns']
+        Tkeep &= Pkeep[conns[:, 0]] & Pkeep[conns[:, 1]]
     if np.size(throats) > 0:
         Tkeep[throats] = False
         # The following IF catches the special case of deleting ALL throats
@@ -236,36 +245,352 @@ def trim(network, pores=[], throats=[]):
     # Temporarily store throat conns and pore map for processing later
     Np_old = network.Np
     Nt_old = network.Nt
-    Pkeep_inds = np.where(Pkeep)[0]
-    Tkeep_inds = np.where(Tkeep)[0]
     Pmap = np.ones((network.Np,), dtype=int)*-1
-    tpore1 = network['throat.conns'][:, 0]
-    tpore2 = network['throat.conns'][:, 1]
+    Pmap[Pkeep] = np.arange(0, np.sum(Pkeep))
+    Tmap = np.ones((network.Nt,), dtype=int)*-1
+    Tmap[Tkeep] = np.arange(0, np.sum(Tkeep))
+    conns = network['throat.conns'][Tkeep]
 
-    # Delete specified pores and throats from all objects
+    # Find the locations to keep on each object before changing any of them
+    Ps_all, Ts_all = np.where(Pkeep)[0], np.where(Tkeep)[0]
+    keep = []
     for obj in network.project[::-1]:
         if (obj.Np == Np_old) and (obj.Nt == Nt_old):
-            Ps = Pkeep_inds
-            Ts = Tkeep_inds
+            keep.append((obj, Ps_all, Ts_all))
         else:
-            Ps = obj.map_pores(pores=Pkeep, origin=network)
-            Ts = obj.map_throats(throats=Tkeep, origin=network)
+            keep.append((obj, _find_local_keep(obj, network, Pkeep, 'pore'),
+                         _find_local_keep(obj, network, Tkeep, 'throat')))
+
+    # Arrays that overlap any other array must not be compacted in place
+    arrays = []
+    if chunk_size is not None:
+        arrays = [v for obj in network.project for v in dict.values(obj)
+                  if isinstance(v, np.ndarray)]
+
+    # Delete specified pores and throats from all objects
+    done = {}
+    for obj, Ps, Ts in keep:
         for key in list(obj.keys()):
+            element = key.split('.')[0]
+            if element not in ['pore', 'throat']:
+                continue
             temp = obj.pop(key)
-            if key.split('.')[0] == 'throat':
-                obj.update({key: temp[Ts]})
-            if key.split('.')[0] == 'pore':
-                obj.update({key: temp[Ps]})
+            # Arrays shared by several keys must only be trimmed once
+            tag = (id(temp), element)
+            if tag not in done:
+                mask = Ts if element == 'throat' else Ps
+                size = chunk_size if _owns_memory(temp, arrays) else None
+                done[tag] = (temp, _trim_array(temp, mask, size))
+            obj.update({key: done[tag][1]})
 
     # Remap throat connections
-    Pmap[Pkeep] = np.arange(0, np.sum(Pkeep))
-    Tnew1 = Pmap[tpore1[Tkeep]]
-    Tnew2 = Pmap[tpore2[Tkeep]]
-    network.update({'throat.conns': np.vstack((Tnew1, Tnew2)).T})
+    network.update({'throat.conns': Pmap[conns]})
 
-    # Clear adjacency and incidence matrices which will be out of date now
+    # Trim the cached matrices, which would otherwise be out of date now
+    am = network._am.get('csr', None)
+    im = network._im.get('csr', None)
     network._am.clear()
     network._im.clear()
+    if (am is not None) and (am.nnz == 2*Nt_old):
+        network._am['csr'] = _trim_csr(am, Pkeep, Pkeep, Tmap)
+    if im is not None:
+        network._im['csr'] = _trim_csr(im, Pkeep, Tkeep, Tmap)
+
+
+def _find_local_keep(obj, network, keep, element):
+    r"""
+    Returns the indices of the locations to keep on a subdomain (or any
+    object not spanning the full network), given the network-wide mask
+    """
+    try:
+        boss = obj.project.find_full_domain(obj)
+        locs = boss[element + '.' + obj.name]
+        return np.where(keep[locs])[0]
+    except Exception:
+        if element == 'pore':
+            return obj.map_pores(pores=keep, origin=network)
+        return obj.map_throats(throats=keep, origin=network)
+
+
+def _owns_memory(arr, arrays):
+    r"""
+    Checks whether ``arr`` owns its data and no other array in ``arrays``
+    (which may include ``arr`` itself once) shares any of it
+    """
+    if (not isinstance(arr, np.ndarray)) or (arr.base is not None):
+        return False
+    n = sum(1 for item in arrays if item is arr)
+    overlaps = sum(1 for item in arrays
+                   if (item is not arr) and np.shares_memory(arr, item))
+    return (n <= 1) and (overlaps == 0)
+
+
+def _trim_array(arr, keep, chunk_size=None):
+    r"""
+    Returns the entries of ``arr`` given by the sorted indices ``keep``,
+    optionally compacting ``arr`` in place in chunks
+    """
+    if not isinstance(arr, np.ndarray):
+        return arr[keep]
+    if (chunk_size is None) or (not arr.flags.writeable):
+        # take is notably faster than fancy indexing on multi-column arrays
+        return np.take(arr, keep, axis=0)
+    # Since the kept indices are sorted, each chunk is only written over
+    # locations that have already been copied
+    for start in range(0, keep.size, chunk_size):
+        inds = keep[start:start + chunk_size]
+        arr[start:start + inds.size] = arr[inds]
+    return arr[:keep.size]
+
+
+def _trim_csr(mat, row_keep, col_keep, data_map):
+    r"""
+    Removes rows and columns from a CSR matrix holding throat indices as
+    values, renumbers the values with ``data_map`` and drops the entries of
+    removed throats
+    """
+    mat = mat[row_keep][:, col_keep]
+    data = data_map[mat.data]
+    hits = data >= 0
+    if np.all(hits):
+        mat.data = data
+        return mat
+    counts = np.zeros(hits.size + 1, dtype=mat.indptr.dtype)
+    np.cumsum(hits, out=counts[1:])
+    indptr = counts[mat.indptr]
+    from scipy.sparse import csr_matrix
+    return csr_matrix((data[hits], mat.indices[hits], indptr),
+                      shape=mat.shape)
+
+
+class NetworkBuilder:
+    r"""
+    Collects new pores and throats, along with their data and labels, from
+    many pieces and writes them onto a network in a single pass
+
+    Parameters
+    ----------
+    network : OpenPNM Network Object
+        The network to which the new pores and throats are to be added
+
+    Notes
+    -----
+    Calling ``extend`` or ``merge_networks`` repeatedly copies every array
+    on the network each time, so assembling a network from many pieces
+    scales quadratically with its final size.  This class instead stores
+    the pieces until ``build`` is called, then allocates each array once
+    at its final size and copies every piece into place.
+
+    Pores and throats are numbered in the order they are added, following
+    those already on the network, so throat connections can refer to
+    pores of pieces that have not been written yet.  When a piece lacks a
+    property found on other pieces, the missing values are filled with
+    ``False`` for labels and ``nan`` otherwise, as done by ``extend``.
+
+    Examples
+    --------
+    >>> import openpnm as op
+    >>> pn = op.network.Cubic(shape=[5, 5, 5])
+    >>> pn2 = op.network.Cubic(shape=[5, 5, 5])
+    >>> builder = op.topotools.NetworkBuilder(network=pn)
+    >>> Ps = builder.add_network(donor=pn2)
+    >>> Ts = builder.add_throats(conns=[[0, Ps[0]]], labels='new')
+    >>> builder.build()
+    >>> [pn.Np, pn.Nt]
+    [250, 601]
+
+    """
+
+    def __init__(self, network):
+        self.network = network
+        self._pieces = {'pore': [], 'throat': []}
+        self._N = {'pore': network.Np, 'throat': network.Nt}
+
+    @property
+    def Np(self):
+        r"""
+        The number of pores the network will have once built
+        """
+        return self._N['pore']
+
+    @property
+    def Nt(self):
+        r"""
+        The number of throats the network will have once built
+        """
+        return self._N['throat']
+
+    def _add_piece(self, element, N, data, labels):
+        if isinstance(labels, str):
+            labels = [labels]
+        data = dict(data)
+        for label in labels:
+            data[element + '.' + label.split('.')[-1]] = True
+        start = self._N[element]
+        self._pieces[element].append((N, data))
+        self._N[element] += N
+        return np.arange(start, start + N)
+
+    def add_pores(self, coords, labels=[]):
+        r"""
+        Adds pores at the given coordinates
+
+        Parameters
+        ----------
+        coords : array_like
+            The N-by-3 coordinates of the pores to add
+        labels : string, or list of strings, optional
+            The labels to apply to the new pores
+
+        Returns
+        -------
+        pores : ndarray
+            The indices the new pores will have on the built network
+        """
+        coords = np.array(coords, ndmin=2)
+        return self._add_piece(element='pore', N=coords.shape[0],
+                               data={'pore.coords': coords}, labels=labels)
+
+    def add_throats(self, conns, labels=[]):
+        r"""
+        Adds throats between the given pores
+
+        Parameters
+        ----------
+        conns : array_like
+            The N-by-2 throat connections to add, which can point to any
+            pore on the network or added to the builder so far
+        labels : string, or list of strings, optional
+            The labels to apply to the new throats
+
+        Returns
+        -------
+        throats : ndarray
+            The indices the new throats will have on the built network
+        """
+        conns = np.array(conns, ndmin=2, dtype=int)
+        if np.size(conns) == 0:
+            conns = np.zeros((0, 2), dtype=int)
+        if np.any(conns >= self.Np) or np.any(conns < 0):
+            raise Exception('Some throat conns point to non-existent pores')
+        return self._add_piece(element='throat', N=conns.shape[0],
+                               data={'throat.conns': conns}, labels=labels)
+
+    def add_network(self, donor):
+        r"""
+        Adds all the pores and throats of another network, along with its
+        properties and labels
+
+        Parameters
+        ----------
+        donor : OpenPNM Network Object
+            The network to add.  Any geometries on its project are moved
+            to the project of the receiving network straight away.
+
+        Returns
+        -------
+        pores : ndarray
+            The indices the donor pores will have on the built network
+        """
+        project = self.network.project
+        for geo in list(donor.project.geometries().values()):
+            if geo.name in project.names:
+                geo.name = project._generate_name(geo)
+            project.append(geo)
+        data = {'pore': {}, 'throat': {}}
+        for key in donor.keys():
+            if key.split('.')[1] not in ['conns', 'coords', '_id', 'all']:
+                data[key.split('.')[0]][key] = donor[key]
+        offset = self.Np
+        data['pore']['pore.coords'] = donor['pore.coords']
+        data['throat']['throat.conns'] = donor['throat.conns'] + offset
+        Ps = self._add_piece(element='pore', N=donor.Np, data=data['pore'],
+                             labels=[])
+        self._add_piece(element='throat', N=donor.Nt, data=data['throat'],
+                        labels=[])
+        return Ps
+
+    def build(self):
+        r"""
+        Writes all the pieces added so far onto the network
+
+        Notes
+        -----
+        The properties on the phases are extended to the new size and their
+        models regenerated to fill the new locations.  The builder is
+        emptied afterwards so can be reused.
+        """
+        network = self.network
+        if not (self._pieces['pore'] or self._pieces['throat']):
+            return
+        new = {}
+        for element in ['pore', 'throat']:
+            pieces = [(network._count(element), {})] + self._pieces[element]
+            N = self._N[element]
+            if len(pieces) == 1:
+                continue
+            own = pieces[0][1]
+            for key in network.keys():
+                if (key.split('.')[0] == element) \
+                        and (key.split('.')[1] not in ['_id', 'all']):
+                    own[key] = network[key]
+            keys = list(own.keys())
+            for _, data in pieces[1:]:
+                keys.extend([k for k in data.keys() if k not in own])
+                own.update({k: None for k in data.keys() if k not in own})
+            for key in keys:
+                new[key] = _join_pieces(pieces, key, N)
+        conns = new.pop('throat.conns', None)
+        network.update({'pore.all': np.ones((self.Np, ), dtype=bool),
+                        'throat.all': np.ones((self.Nt, ), dtype=bool)})
+        network.update(new)
+        if conns is not None:
+            network['throat.conns'] = conns
+        self._pieces = {'pore': [], 'throat': []}
+
+        # Increase size of any prop or label arrays already on the phases
+        for phase in network.project.phases().values():
+            phase.update({'pore.all': np.ones((self.Np, ), dtype=bool),
+                          'throat.all': np.ones((self.Nt, ), dtype=bool)})
+            for item in list(phase.keys()):
+                N = self._N[item.split('.')[0]]
+                arr = phase[item]
+                if arr.shape[0] < N:
+                    pieces = [(arr.shape[0], {item: arr}),
+                              (N - arr.shape[0], {})]
+                    phase.update({item: _join_pieces(pieces, item, N)})
+            if hasattr(phase, 'models'):
+                phase.regenerate_models()
+
+        # Clear adjacency and incidence matrices which will be out of date now
+        network._am.clear()
+        network._im.clear()
+
+
+def _join_pieces(pieces, key, N):
+    r"""
+    Concatenates the values of ``key`` across all pieces into one array of
+    length ``N``, filling pieces that lack the key with False or nan
+    """
+    vals = [(n, data.get(key, None)) for n, data in pieces]
+    arrs = [np.asarray(v) for n, v in vals if v is not None]
+    shape = next((a.shape[1:] for a in arrs if a.ndim > 0), ())
+    dtype = np.result_type(*arrs)
+    missing = any([(v is None) and (n > 0) for n, v in vals])
+    if missing and (dtype != bool):
+        try:
+            dtype = np.promote_types(dtype, float)
+        except TypeError:
+            dtype = object
+    out = np.empty((N, *shape), dtype=dtype)
+    start = 0
+    for n, v in vals:
+        if v is None:
+            out[start:start + n] = False if dtype == bool else np.nan
+        else:
+            out[start:start + n] = v
+        start += n
+    return out
 
 
 def extend(network, coords=[], conns=[], labels=[], **kwargs):
@@ -292,108 +617,131 @@ def extend(network, coords=[], conns=[], labels=[], **kwargs):
         conns = kwargs['throat_conns']
     if 'pore_coords' in kwargs.keys():
         coords = kwargs['pore_coords']
-    coords = np.array(coords)
-    conns = np.array(conns)
-    Np_old = network.num_pores()
-    Nt_old = network.num_throats()
-    Np = Np_old + coords.shape[0]
-    Nt = Nt_old + conns.shape[0]
-    if np.any(conns > Np):
-        raise Exception('Some throat conns point to non-existent pores')
-    network.update({'pore.all': np.ones([Np, ], dtype=bool),
-                    'throat.all': np.ones([Nt, ], dtype=bool)})
-    # Add coords and conns
+    builder = NetworkBuilder(network=network)
     if np.size(coords) > 0:
-        coords = np.vstack((network['pore.coords'], coords))
-        network['pore.coords'] = coords
+        builder.add_pores(coords=coords, labels=labels)
     if np.size(conns) > 0:
-        conns = np.vstack((network['throat.conns'], conns))
-        network['throat.conns'] = conns
-
-    # Increase size of any prop or label arrays already on network and phases
-    objs = list(network.project.phases().values())
-    objs.append(network)
-    for obj in objs:
-        obj.update({'pore.all': np.ones([Np, ], dtype=bool),
-                    'throat.all': np.ones([Nt, ], dtype=bool)})
-        for item in list(obj.keys()):
-            N = obj._count(element=item.split('.')[0])
-            if obj[item].shape[0] < N:
-                arr = obj.pop(item)
-                s = arr.shape
-                if arr.dtype == bool:
-                    obj[item] = np.zeros(shape=(N, *s[1:]), dtype=bool)
-                else:
-                    obj[item] = np.ones(shape=(N, *s[1:]), dtype=float)*np.nan
-                obj[item][:arr.shape[0]] = arr
-
-    # Regenerate models on all objects to fill new elements
-    for obj in network.project.phases().values():
-        if hasattr(obj, 'models'):
-            obj.regenerate_models()
-
-    # Apply labels, if supplied
-    if labels != []:
-        # Convert labels to list if necessary
-        if isinstance(labels, str):
-            labels = [labels]
-        for label in labels:
-            # Remove pore or throat from label, if present
-            label = label.split('.')[-1]
-            if np.size(coords) > 0:
-                Ps = np.r_[Np_old:Np]
-                if 'pore.'+label not in network.labels():
-                    network['pore.'+label] = False
-                network['pore.'+label][Ps] = True
-            if np.size(conns) > 0:
-                Ts = np.r_[Nt_old:Nt]
-                if 'throat.'+label not in network.labels():
-                    network['throat.'+label] = False
-                network['throat.'+label][Ts] = True
-
-    # Clear adjacency and incidence matrices which will be out of date now
-    network._am.clear()
-    network._im.clear()
+        builder.add_throats(conns=conns, labels=labels)
+    builder.build()
 
 
-def reduce_coordination(network, z):
+def reduce_coordination(network, z, seed=None):
     r"""
-    Deletes throats on network to match specified average coordination number
+    Deletes throats on network to match specified coordination numbers
 
     Parameters
     ----------
     network : OpenPNM Network object
         The network whose throats are to be trimmed
-    z : scalar
-        The desire average coordination number.  It is not possible to specify
-        the distribution of the coordination, only the mean value.
+    z : scalar or array_like
+        The desired coordination number.  If a scalar is given, throats are
+        deleted at random until the average coordination number is ``z``.
+        If an Np-long array is given it contains the target coordination
+        number of each pore, so any distribution of coordination numbers can
+        be requested, for instance by sampling one from ``scipy.stats``.
+    seed : int, optional
+        The seed for the random number generator, so the same throats are
+        deleted each time.  The default is None.
 
     Notes
     -----
     This method first finds the minimum spanning tree of the network using
     random weights on each throat, then assures that these throats are *not*
-    deleted, in order to maintain network connectivity.
+    deleted, in order to maintain network connectivity.  Of several throats
+    connecting the same two pores only one can be on the tree.
+
+    When a target is given for each pore, the other throats are visited in
+    random order and each is deleted if both of its pores still have more
+    neighbors than their targets.  Pores which need more neighbors than
+    their targets to stay connected, or which start below their targets,
+    will therefore not reach them.
+
+    Examples
+    --------
+    >>> import openpnm as op
+    >>> import numpy as np
+    >>> pn = op.network.Cubic(shape=[10, 10, 10])
+    >>> np.random.seed(0)
+    >>> z = np.random.choice([3, 4], size=pn.Np)
+    >>> op.topotools.reduce_coordination(pn, z=z, seed=0)
+    >>> n = pn.num_neighbors(pn.Ps)
+    >>> print(np.mean(n == z))
+    0.763
+    >>> n[z == 3].mean() < n[z == 4].mean()
+    True
 
     """
-    # Find minimum spanning tree using random weights
-    am = network.create_adjacency_matrix(weights=np.random.rand(network.Nt),
-                                         triu=False)
-    mst = csgraph.minimum_spanning_tree(am, overwrite=True)
-    mst = mst.tocoo()
+    if seed is not None:
+        np.random.seed(seed)
+    Np, Nt = network.Np, network.Nt
+    conns = network['throat.conns']
+    # Find minimum spanning tree using random weights, which are replaced by
+    # their ranks so the edges in the tree can be mapped back to throats
+    order = np.argsort(np.random.rand(Nt))
+    # Parallel throats would be summed into one entry of the sparse matrix,
+    # so only the lowest ranked throat between each pair of pores is used
+    pairs = np.sort(conns[order], axis=1)
+    first = np.unique(pairs[:, 0]*Np + pairs[:, 1], return_index=True)[1]
+    am = sp.sparse.coo_matrix((first + 1.0, (pairs[first, 0],
+                                             pairs[first, 1])),
+                              shape=(Np, Np))
+    mst = csgraph.minimum_spanning_tree(am.tocsr(), overwrite=True)
+    Ts = order[np.rint(mst.data).astype(np.int64) - 1]
 
     # Label throats on spanning tree to avoid deleting them
-    Ts = network.find_connecting_throat(mst.row, mst.col)
-    Ts = np.hstack(Ts)
     network['throat.mst'] = False
     network['throat.mst'][Ts] = True
 
     # Trim throats not on the spanning tree to acheive desired coordination
     Ts = np.random.permutation(network.throats('mst', mode='nor'))
-    Ts = Ts[:int(network.Nt - network.Np*(z/2))]
+    if np.ndim(z) == 0:
+        Ts = Ts[:int(Nt - Np*(z/2))]
+    else:
+        z = np.array(z, dtype=float).flatten()
+        if z.size != Np:
+            raise Exception('z must be a scalar or an Np long array')
+        degree = np.bincount(conns.flatten(), minlength=Np)
+        conns = np.ascontiguousarray(conns, dtype=np.int64)
+        Ts = Ts[_get_coordination_kernel()(conns, Ts.astype(np.int64),
+                                           degree.astype(np.int64), z)]
     trim(network=network, throats=Ts)
 
 
-def label_faces(network, tol=0.0, label='surface'):
+def _coordination_kernel(conns, throats, degree, target):
+    r"""
+    Visits the given throats in order and marks each for deletion if both
+    of its pores have more neighbors than their targets
+    """
+    remove = np.zeros(throats.size, dtype=np.bool_)
+    for i in range(throats.size):
+        a = conns[throats[i], 0]
+        b = conns[throats[i], 1]
+        if (degree[a] > target[a]) and (degree[b] > target[b]):
+            degree[a] -= 1
+            degree[b] -= 1
+            remove[i] = True
+    return remove
+
+
+_compiled_coordination_kernel = None
+
+
+def _get_coordination_kernel():
+    r"""
+    Returns the compiled coordination kernel, compiling it on first use.
+    """
+    global _compiled_coordination_kernel
+    if _compiled_coordination_kernel is None:
+        from numba import njit, int64, float64, boolean
+        sig = boolean[::1](int64[:, ::1], int64[::1], int64[::1],
+                           float64[::1])
+        _compiled_coordination_kernel = njit(sig, cache=True)(
+            _coordination_kernel)
+    return _compiled_coordination_kernel
+
+
+def label_faces(network, tol=0.0, label='surface', method='delaunay',
+                bin_size=None):
     r"""
     Finds pores on the surface of the network and labels them according to
     whether they are on the *top*, *bottom*, etc.  This function assumes the
@@ -415,8 +763,39 @@ def label_faces(network, tol=0.0, label='surface'):
         The default is 'surface'.  Surface pores can be found using
         ``find_surface_pores``.
 
+    method : string
+        The method used to find the pores on the faces.  Options are:
+
+        'delaunay' - (Default) The surface pores are found using the
+        'delaunay' method of ``find_surface_pores`` if not already labelled,
+        and those within ``tol`` of each face are labelled.
+
+        'bins' - All six faces are found in one pass using the 'bins' method
+        of ``find_surface_pores``, which also labels the surface pores if
+        not already labelled.  ``tol`` is not used.  Since the faces are
+        found from the outermost pores in columns along each axis, it also
+        works for networks which are not cubic in shape.
+
+    bin_size : scalar, optional
+        The width of the columns used by the 'bins' method.  See
+        ``find_surface_pores`` for details.
+
     """
     label = label.split('.', 1)[-1]
+    if method == 'bins':
+        lo, hi = _find_faces_by_bins(network, bin_size=bin_size)
+        dims = dimensionality(network)
+        if 'pore.'+label not in network.labels():
+            Psurf = np.any(lo, axis=1) + np.any(hi, axis=1)
+            network['pore.'+label] = Psurf + (sum(dims) == 1)
+        Psurf = network['pore.'+label]
+        faces = [('left', 'right'), ('back', 'front'), ('bottom', 'top')]
+        for ax in np.where(dims)[0]:
+            network['pore.'+faces[ax][0]] = lo[:, ax] * Psurf
+            network['pore.'+faces[ax][1]] = hi[:, ax] * Psurf
+        return
+    elif method != 'delaunay':
+        raise Exception('<{}> method not supported'.format(method))
     if 'pore.'+label not in network.labels():
         find_surface_pores(network, label=label)
     Psurf = network['pore.'+label]
@@ -439,12 +818,15 @@ def label_faces(network, tol=0.0, label='surface'):
         network['pore.bottom'] = (crds[:, 2] <= (zmin + tol*zspan)) * Psurf
 
 
-def find_surface_pores(network, markers=None, label='surface'):
+def find_surface_pores(network, markers=None, label='surface',
+                       method='delaunay', bin_size=None):
     r"""
     Find the pores on the surface of the domain by performing a Delaunay
     triangulation between the network pores and some external ``markers``. All
     pores connected to these external marker points are considered surface
-    pores.
+    pores.  Alternatively the outermost pores can be found by binning them
+    into columns, which is much faster and uses less memory for large
+    networks.
 
     Parameters
     ----------
@@ -466,6 +848,21 @@ def find_surface_pores(network, markers=None, label='surface'):
     label : string
         The label to apply to the pores.  The default is 'surface'.
 
+    method : string
+        The method to use for finding the surface pores.  Options are:
+
+        'delaunay' - (Default) Triangulates the pores together with the
+        ``markers`` as described above.
+
+        'bins' - Splits the domain into columns along each axis, and marks
+        the pores at either end of each column, as described in the Notes.
+        The ``markers`` are not used.
+
+    bin_size : scalar, optional
+        The width of the columns used by the 'bins' method.  The default is
+        twice the median distance between each pore and its nearest
+        neighbor.
+
     Notes
     -----
     This function does not check whether the given markers actually lie outside
@@ -474,6 +871,16 @@ def find_surface_pores(network, markers=None, label='surface'):
     If this method fails to mark some surface pores, consider sending more
     markers on each face.
 
+    The 'bins' method splits the domain into columns of about ``bin_size``
+    wide along each axis, with the width adjusted to fit a whole number of
+    columns across the domain.  The pores within ``bin_size/4`` of the
+    lowest and highest pore of each column are surface pores, so a layer
+    of pores which can be seen from outside the domain in each direction
+    is found.  This only needs a few arrays of length Np, and the
+    distances between neighbors are found using the spatial index of the
+    network.  On a lattice each column holds whole rows of pores, so exactly
+    the pores on the faces are found.
+
     Examples
     --------
     >>> import openpnm as op
@@ -487,9 +894,25 @@ def find_surface_pores(network, markers=None, label='surface'):
     >>> net.num_pores(['top','bottom', 'left', 'right', 'front','back'])
     98
 
+    The 'bins' method gives the same result on a lattice:
+
+    >>> op.topotools.find_surface_pores(network=net, label='binned',
+    ...                                 method='bins')
+    >>> net.num_pores('binned')
+    98
+
     """
     import scipy.spatial as sptl
     dims = dimensionality(network)
+    if method == 'bins':
+        if sum(dims) == 1:
+            network['pore.'+label] = True
+            return
+        lo, hi = _find_faces_by_bins(network, bin_size=bin_size)
+        network['pore.'+label] = np.any(lo, axis=1) + np.any(hi, axis=1)
+        return
+    elif method != 'delaunay':
+        raise Exception('<{}> method not supported'.format(method))
     coords = network['pore.coords'][:, dims]
     if markers is None:
         # normalize coords to a 1 unit cube centered on origin
@@ -529,13 +952,94 @@ def find_surface_pores(network, markers=None, label='surface'):
     pts = np.vstack((coords, markers))
     tri = sptl.Delaunay(pts, incremental=False)
     (indices, indptr) = tri.vertex_neighbor_vertices
-    for k in range(network.Np, tri.npoints):
-        neighbors = indptr[indices[k]:indices[k+1]]
-        inds = np.where(neighbors < network.Np)
-        neighbors = neighbors[inds]
-        if 'pore.'+label not in network.keys():
-            network['pore.'+label] = False
-        network['pore.'+label][neighbors] = True
+    if tri.npoints == network.Np:
+        return
+    # Find the neighbors of all markers at once
+    neighbors = indptr[_ragged_ranges(indices[network.Np:tri.npoints],
+                                      indices[network.Np + 1:])]
+    neighbors = neighbors[neighbors < network.Np]
+    if 'pore.'+label not in network.keys():
+        network['pore.'+label] = False
+    network['pore.'+label][neighbors] = True
+
+
+def _find_faces_by_bins(network, bin_size=None):
+    r"""
+    Finds the pores on the low and high faces along each axis in one pass,
+    by binning them into columns and keeping the outermost ones in each
+    column.  Returns two Np-by-3 boolean arrays for the low and high faces.
+    """
+    coords = np.ascontiguousarray(network['pore.coords'], dtype=float)
+    dims = np.where(dimensionality(network))[0]
+    if bin_size is None:
+        d = network.get_kdtree().query(coords, k=2)[0][:, 1]
+        d = d[np.isfinite(d) * (d > 0)]
+        bin_size = 2*np.median(d) if d.size else 1.0
+    # Fit a whole number of bins across the domain so no column on the edge
+    # only catches a few pores
+    cmin, cmax = np.amin(coords, axis=0), np.amax(coords, axis=0)
+    shape = np.maximum(np.round((cmax - cmin)/bin_size), 1).astype(np.int64)
+    width = np.where(cmax > cmin, (cmax - cmin)/shape, 1.0)
+    ind = np.floor((coords - cmin)/width).astype(np.int64)
+    ind = np.minimum(ind, shape - 1)
+    # Find the column holding each pore when looking along each axis
+    cols = np.full((network.Np, 3), -1, dtype=np.int64)
+    for ax in dims:
+        others = [i for i in dims if i != ax]
+        if len(others) == 0:
+            cols[:, ax] = 0
+        elif np.prod(shape[others]) <= network.Np:
+            cols[:, ax] = np.ravel_multi_index(tuple(ind[:, others].T),
+                                               shape[others])
+        else:
+            cols[:, ax] = np.unique(ind[:, others], axis=0,
+                                    return_inverse=True)[1].flatten()
+    n_cols = max(np.amax(cols) + 1, 1)
+    ends = _get_surface_bins_kernel()(coords, cols, n_cols)
+    lo = np.zeros((network.Np, 3), dtype=bool)
+    hi = np.zeros((network.Np, 3), dtype=bool)
+    for ax in dims:
+        lo[:, ax] = coords[:, ax] <= ends[0, ax, cols[:, ax]] + bin_size/4
+        hi[:, ax] = coords[:, ax] >= ends[1, ax, cols[:, ax]] - bin_size/4
+    return lo, hi
+
+
+def _surface_bins_kernel(coords, cols, n_cols):
+    r"""
+    Finds the lowest and highest coordinate along each axis of the pores
+    in each column in a single pass
+    """
+    n_dims = coords.shape[1]
+    ends = np.empty((2, n_dims, n_cols))
+    ends[0, :, :] = np.inf
+    ends[1, :, :] = -np.inf
+    for i in range(coords.shape[0]):
+        for j in range(n_dims):
+            c = cols[i, j]
+            if c < 0:
+                continue
+            v = coords[i, j]
+            if v < ends[0, j, c]:
+                ends[0, j, c] = v
+            if v > ends[1, j, c]:
+                ends[1, j, c] = v
+    return ends
+
+
+_compiled_surface_bins_kernel = None
+
+
+def _get_surface_bins_kernel():
+    r"""
+    Returns the compiled surface binning kernel, compiling it on first use.
+    """
+    global _compiled_surface_bins_kernel
+    if _compiled_surface_bins_kernel is None:
+        from numba import njit, int64, float64
+        sig = float64[:, :, ::1](float64[:, ::1], int64[:, ::1], int64)
+        _compiled_surface_bins_kernel = njit(sig, cache=True)(
+            _surface_bins_kernel)
+    return _compiled_surface_bins_kernel
 
 
 def dimensionality(network):
@@ -648,70 +1152,10 @@ def merge_networks(network, donor=[]):
         donors = donor
     else:
         donors = [donor]
-
-    # First fix up geometries
-    # main_proj = network.project
-    # main_geoms = main_proj.geometries()
+    builder = NetworkBuilder(network=network)
     for donor in donors:
-        proj = donor.project
-        geoms = proj.geometries().values()
-        for geo in geoms:
-            if geo.name in network.project.names:
-                geo.name = network.project._generate_name(geo)
-            network.project.append(geo)
-
-    for donor in donors:
-        network['pore.coords'] = np.vstack((network['pore.coords'],
-                                            donor['pore.coords']))
-        network['throat.conns'] = np.vstack((network['throat.conns'],
-                                             donor['throat.conns']
-                                             + network.Np))
-        p_all = np.ones((np.shape(network['pore.coords'])[0],), dtype=bool)
-        t_all = np.ones((np.shape(network['throat.conns'])[0],), dtype=bool)
-        network.update({'pore.all': p_all})
-        network.update({'throat.all': t_all})
-        for key in set(network.keys()).union(set(donor.keys())):
-            if key.split('.')[1] not in ['conns', 'coords', '_id', 'all']:
-                if key in network.keys():
-                    pop_flag = False
-                    # If key not on donor add it first with dummy values to
-                    # simplify merging later
-                    if key not in donor.keys():
-                        logger.debug('Adding ' + key + ' to donor')
-                        if network[key].dtype == bool:  # Deal with labels
-                            donor[key] = False
-                        else:  # Deal with numerical data
-                            element = key.split('.')[0]
-                            shape = list(network[key].shape)
-                            N = donor._count(element)
-                            shape[0] = N
-                            donor[key] = np.empty(shape=shape)*np.nan
-                        pop_flag = True
-                    # Then merge it with existing array on network
-                    if len(network[key].shape) == 1:
-                        temp = np.hstack((network[key], donor[key]))
-                    else:
-                        temp = np.vstack((network[key], donor[key]))
-                    network[key] = temp
-                    if pop_flag:
-                        donor.pop(key, None)
-                else:
-                    # If key not on network add it first
-                    logger.debug('Adding ' + key + ' to network')
-                    if donor[key].dtype == bool:
-                        network[key] = False
-                    else:
-                        data_shape = list(donor[key].shape)
-                        pore_prop = True if key.split(".")[0] == "pore" else False
-                        data_shape[0] = network.Np if pore_prop else network.Nt
-                        network[key] = np.empty(data_shape) * np.nan
-                    # Then append donor values to network
-                    s = np.shape(donor[key])[0]
-                    network[key][-s:] = donor[key]
-
-    # Clear adjacency and incidence matrices which will be out of date now
-    network._am.clear()
-    network._im.clear()
+        builder.add_network(donor=donor)
+    builder.build()
 
 
 def stitch(network, donor, P_network, P_donor, method='nearest',
@@ -785,33 +1229,20 @@ def stitch(network, donor, P_network, P_donor, method='nearest',
     for s in label_stitches:
         if s not in network.keys():
             network['throat.' + s] = False
-    # Get the initial number of pores and throats
-    N_init = {}
-    N_init['pore'] = network.Np
-    N_init['throat'] = network.Nt
-    if method == 'nearest':
-        P1 = P_network
-        P2 = P_donor + N_init['pore']  # Increment pores on donor
-        C1 = network['pore.coords'][P_network]
-        C2 = donor['pore.coords'][P_donor]
-        D = sp.spatial.distance.cdist(C1, C2)
-        [P1_ind, P2_ind] = np.where(D == D.min(axis=0))
-        conns = np.vstack((P1[P1_ind], P2[P2_ind])).T
-    elif method == 'radius':
-        P1 = P_network
-        P2 = P_donor + N_init['pore']  # Increment pores on donor
-        C1 = network['pore.coords'][P_network]
-        C2 = donor['pore.coords'][P_donor]
-        D = sp.spatial.distance.cdist(C1, C2)
-        [P1_ind, P2_ind] = np.where(D <= len_max)
-        conns = np.vstack((P1[P1_ind], P2[P2_ind])).T
-    else:
-        raise Exception('<{}> method not supported'.format(method))
-
-    merge_networks(network, donor)
-
-    # Add the new stitch throats to the Network
-    extend(network=network, throat_conns=conns, labels=label_stitches)
+    # Find the new stitch throats, with the donor pores numbered as they
+    # will be once added to the network
+    P1 = np.array(P_network, ndmin=1, dtype=int)
+    P2 = np.array(P_donor, ndmin=1, dtype=int)
+    P1_ind, P2_ind = _find_stitch_conns(network1=network, pores1=P1,
+                                        coords2=donor['pore.coords'][P2],
+                                        method=method, len_max=len_max)
+    conns = np.vstack((P1[P1_ind], P2[P2_ind] + network.Np)).T
+
+    # Add the donor and the new stitch throats to the Network in one pass
+    builder = NetworkBuilder(network=network)
+    builder.add_network(donor=donor)
+    builder.add_throats(conns=conns, labels=label_stitches)
+    builder.build()
 
     if len(network.project.geometries()) > 0:
         logger.warning(str(conns.shape[0]) + ' newly created throats are not '
@@ -824,6 +1255,143 @@ def stitch(network, donor, P_network, P_donor, method='nearest',
             del ws[sim.name]
 
 
+def stitch_many(network, donors, stitches, method='nearest',
+                len_max=np.inf, label_stitches='stitched'):
+    r'''
+    Stitches several donor networks (i.e. tiles) to the current network and
+    to each other in a single pass
+
+    Parameters
+    ----------
+    network : OpenPNM Network Object
+        The Network to which the donor Networks will be attached
+
+    donors : list of OpenPNM Network Objects
+        The Networks to add to the current Network
+
+    stitches : list of tuples
+        Each tuple ``(i, pores_i, j, pores_j)`` connects the pores
+        ``pores_i`` on tile ``i`` to the pores ``pores_j`` on tile ``j``,
+        where tile 0 is ``network`` and tile ``k`` is ``donors[k-1]``.  The
+        pore indices refer to the numbering on each tile.
+
+    method : string (default = 'nearest')
+        The method to use when making pore to pore connections, applied as
+        in ``stitch`` with tile ``i`` acting as the recipient.
+
+    len_max : float
+        Set a length limit on length of new throats
+
+    label_stitches : str or list of strings
+        The label to apply to the newly created 'stitch' throats.  The
+        defaul is 'stitched'.
+
+    Notes
+    -----
+    The result is the same as calling ``stitch`` once per tile, except that
+    all the stitch throats are placed after the throats of the last tile,
+    but each array on the network is only written once rather than once
+    per tile.
+
+    See Also
+    --------
+    stitch
+    NetworkBuilder
+
+    Examples
+    --------
+    >>> import openpnm as op
+    >>> pn = op.network.Cubic(shape=[5, 5, 5])
+    >>> tiles = [op.network.Cubic(shape=[5, 5, 5]) for i in range(2)]
+    >>> tiles[0]['pore.coords'][:, 2] += 5.0
+    >>> tiles[1]['pore.coords'][:, 2] += 10.0
+    >>> op.topotools.stitch_many(
+    ...     network=pn, donors=tiles, method='radius', len_max=1.0,
+    ...     stitches=[(0, pn.pores('top'), 1, tiles[0].pores('bottom')),
+    ...               (1, tiles[0].pores('top'), 2, tiles[1].pores('bottom'))])
+    >>> [pn.Np, pn.Nt]
+    [375, 950]
+
+    '''
+    if isinstance(label_stitches, str):
+        label_stitches = [label_stitches]
+    for s in label_stitches:
+        if s not in network.keys():
+            network['throat.' + s] = False
+    tiles = [network] + list(donors)
+    builder = NetworkBuilder(network=network)
+    offsets = [0]
+    for donor in donors:
+        offsets.append(builder.Np)
+        builder.add_network(donor=donor)
+    conns = [np.zeros((0, 2), dtype=int)]
+    for i, P1, j, P2 in stitches:
+        P1 = np.array(P1, ndmin=1, dtype=int)
+        P2 = np.array(P2, ndmin=1, dtype=int)
+        P1_ind, P2_ind = _find_stitch_conns(network1=tiles[i], pores1=P1,
+                                            coords2=tiles[j]['pore.coords'][P2],
+                                            method=method, len_max=len_max)
+        conns.append(np.vstack((P1[P1_ind] + offsets[i],
+                                P2[P2_ind] + offsets[j])).T)
+    conns = np.sort(np.vstack(conns), axis=1)
+    builder.add_throats(conns=conns, labels=label_stitches)
+    builder.build()
+
+    if len(network.project.geometries()) > 0:
+        logger.warning(str(conns.shape[0]) + ' newly created throats are not '
+                       + 'assigned to a geometry')
+
+    for donor in donors:
+        for sim in list(ws.values()):
+            if donor in sim:
+                del ws[sim.name]
+
+
+def _find_stitch_conns(network1, pores1, coords2, method, len_max):
+    r"""
+    Finds the pairs of pores to connect for ``stitch``, returned as indices
+    into ``pores1`` (on ``network1``) and into ``coords2``, sorted by the
+    former
+
+    Notes
+    -----
+    The pores of ``network1`` are searched with its spatial index if all of
+    them are used, otherwise with a tree of the given pores only.  For the
+    'nearest' method the pores tied for the nearest distance are then all
+    kept, by comparing the distances of the candidates found within the
+    nearest distance.
+    """
+    pores1 = np.array(pores1, ndmin=1, dtype=int)
+    coords2 = np.array(coords2, ndmin=2, dtype=float)
+    coords1 = network1['pore.coords'][pores1]
+    if (pores1.size == network1.Np) and np.all(pores1 == network1.Ps):
+        kd = network1.get_kdtree()
+    else:
+        kd = sp.spatial.cKDTree(coords1)
+    if method == 'nearest':
+        r = kd.query(coords2, k=1)[0]
+    elif method == 'radius':
+        r = len_max
+    else:
+        raise Exception('<{}> method not supported'.format(method))
+    # Inflate the radius slightly so that no pore is missed due to round off
+    # then apply the exact criteria below
+    hits = kd.query_ball_point(coords2, r=r*(1 + 1e-9) + 1e-300)
+    P2_ind = np.repeat(np.arange(coords2.shape[0]), [len(i) for i in hits])
+    P1_ind = np.fromiter((i for item in hits for i in item), dtype=int,
+                         count=P2_ind.size)
+    D = np.sqrt(np.sum((coords1[P1_ind] - coords2[P2_ind])**2, axis=1))
+    if method == 'nearest':
+        Dmin = np.full(coords2.shape[0], np.inf)
+        np.minimum.at(Dmin, P2_ind, D)
+        keep = D == Dmin[P2_ind]
+    else:
+        keep = D <= len_max
+    P1_ind, P2_ind = P1_ind[keep], P2_ind[keep]
+    order = np.lexsort((P2_ind, P1_ind))
+    return P1_ind[order], P2_ind[order]
+
+
 def stitch_pores(network, pores1, pores2, mode='gabriel'):
     r"""
     Stitches together pores in a network with disconnected clusters
@@ -955,7 +1523,8 @@ def connect_pores(network, pores1, pores2, labels=[], add_conns=True):
         return conns
 
 
-def find_pore_to_pore_distance(network, pores1=None, pores2=None):
+def find_pore_to_pore_distance(network, pores1=None, pores2=None, r=None,
+                               k=None, n_workers=1):
     r'''
     Find the distance between all pores on set 1 to each pore in set 2
 
@@ -971,26 +1540,134 @@ def find_pore_to_pore_distance(network, pores1=None, pores2=None):
         The pore indices of the second set.  It's OK if these indices are
         partially or completely duplicating ``pores``.
 
+    r : scalar, optional
+        If given, only the distances up to ``r`` are found, using the
+        spatial index of the network, and returned as a sparse matrix.
+
+    k : int, optional
+        If given, only the distances from each pore in ``pores1`` to its
+        ``k`` nearest pores in ``pores2`` are found and returned as a sparse
+        matrix.  Can be combined with ``r`` to also drop neighbors further
+        than ``r``.  Among equally distant pores the ones kept are arbitrary.
+
+    n_workers : int
+        The number of threads used for the spatial queries when ``r`` or
+        ``k`` are given.  Use -1 for all available cores.  The default is 1.
+
     Returns
     -------
     dist : array_like
         A distance matrix with ``len(pores1)`` rows and ``len(pores2)`` columns.
         The distance between pore *i* in ``pores1`` and *j* in ``pores2`` is
-        located at *(i, j)* and *(j, i)* in the distance matrix.
+        located at *(i, j)* and *(j, i)* in the distance matrix.  If ``r``
+        or ``k`` are given this is a sparse COO matrix, in which the
+        distances not found are absent, and distances of zero are
+        explicitly stored.
 
     Notes
     -----
-    This function computes and returns a distance matrix, which is a dense
-    matrix of size Np_1 by Np_2, so can get large.  For distances between
-    larger sets a KD-tree approach would be better, which is available in
-    ``scipy.spatial``.
+    Without ``r`` or ``k`` this function computes and returns a dense matrix
+    of size Np_1 by Np_2, so can get large.  For distances between larger
+    sets use ``r`` or ``k``, which only search the nearby pores so need
+    memory in proportion to the number of distances found, or iterate over
+    blocks of the dense matrix using ``iter_pore_to_pore_distance``.
+
+    Examples
+    --------
+    >>> import openpnm as op
+    >>> pn = op.network.Cubic(shape=[3, 3, 3])
+    >>> dm = op.topotools.find_pore_to_pore_distance(network=pn,
+    ...                                              pores1=[0, 13],
+    ...                                              pores2=pn.Ps, k=2)
+    >>> print(dm.getnnz(axis=1))
+    [2 2]
+    >>> print(dm.max())
+    1.0
+
+    '''
+    from scipy.spatial.distance import cdist
+    p1 = np.array(pores1, ndmin=1)
+    p2 = np.array(pores2, ndmin=1)
+    coords = network['pore.coords']
+    if (r is None) and (k is None):
+        return cdist(coords[p1], coords[p2])
+    from scipy.sparse import coo_matrix
+    if k is None:
+        offsets, values = network.find_pores_within(points=coords[p1], r=r,
+                                                    n_workers=n_workers,
+                                                    ragged=True)
+        # Find where each pore found near a pore in p1 appears in p2
+        order = np.argsort(p2, kind='stable')
+        lo = np.searchsorted(p2[order], values, side='left')
+        hi = np.searchsorted(p2[order], values, side='right')
+        rows = np.repeat(np.repeat(np.arange(p1.size), np.diff(offsets)),
+                         hi - lo)
+        cols = order[_ragged_ranges(lo, hi)]
+    else:
+        if np.array_equal(p2, np.arange(network.Np)):
+            kd = network.get_kdtree()
+        else:
+            kd = sp.spatial.cKDTree(coords[p2])
+        r_max = np.inf if r is None else r*(1 + 1e-9) + 1e-300
+        cols = kd.query(coords[p1], k=[i + 1 for i in range(k)],
+                        distance_upper_bound=r_max, workers=n_workers)[1]
+        # Missing neighbors are indicated by an index of kd.n
+        rows = np.repeat(np.arange(p1.size), k)
+        cols = cols.ravel()
+        rows, cols = rows[cols < kd.n], cols[cols < kd.n]
+    d = np.sqrt(np.sum((coords[p1[rows]] - coords[p2[cols]])**2, axis=1))
+    if (k is not None) and (r is not None):
+        rows, cols, d = rows[d <= r], cols[d <= r], d[d <= r]
+    return coo_matrix((d, (rows, cols)), shape=(p1.size, p2.size))
+
+
+def iter_pore_to_pore_distance(network, pores1=None, pores2=None,
+                               chunk_size=1000):
+    r'''
+    Iterate over the distance matrix between two sets of pores in blocks of
+    rows, so the full matrix is never held in memory
+
+    Parameters
+    ----------
+    network : OpenPNM Network Object
+        The network object containing the pore coordinates
+
+    pores1 : array_like
+        The pore indices of the first set, which correspond to the rows
+
+    pores2 : array_Like
+        The pore indices of the second set, which correspond to the columns
+
+    chunk_size : int
+        The number of rows in each block.  The default is 1000.
+
+    Yields
+    ------
+    start, dist : tuple
+        The position in ``pores1`` of the first row of the block, and the
+        ``chunk_size`` by ``len(pores2)`` block of distances, which is the
+        same as ``find_pore_to_pore_distance(network, pores1, pores2)[start:
+        start + chunk_size]``.
+
+    Examples
+    --------
+    >>> import openpnm as op
+    >>> pn = op.network.Cubic(shape=[3, 3, 3])
+    >>> for start, dist in op.topotools.iter_pore_to_pore_distance(
+    ...         network=pn, pores1=pn.Ps, pores2=[0], chunk_size=10):
+    ...     print(start, dist.shape)
+    0 (10, 1)
+    10 (10, 1)
+    20 (7, 1)
 
     '''
     from scipy.spatial.distance import cdist
     p1 = np.array(pores1, ndmin=1)
     p2 = np.array(pores2, ndmin=1)
     coords = network['pore.coords']
-    return cdist(coords[p1], coords[p2])
+    c2 = coords[p2]
+    for start in range(0, p1.size, chunk_size):
+        yield start, cdist(coords[p1[start:start + chunk_size]], c2)
 
 
 def subdivide(network, pores, shape, labels=[]):
@@ -1012,6 +1689,10 @@ def subdivide(network, pores, shape, labels=[]):
     It works only for cubic networks, and a check is performed to ensure this
     is the case.
 
+    The new pores and throats for all of the given pores are found first and
+    then added to the network in a single pass, followed by a single call to
+    ``trim``, so the cost grows linearly with the number of pores.
+
     Examples
     --------
     >>> import openpnm as op
@@ -1074,7 +1755,6 @@ def subdivide(network, pores, shape, labels=[]):
         non_single_labels = label_groups[np.array([0, 1, 2]) != single_dim]
     for label in main_labels:
         new_net['pore.surface_' + label] = False
-        network['pore.surface_' + label] = False
         if single_dim is None:
             new_net['pore.surface_' + label][new_net.pores(labels=label)] = True
         else:
@@ -1082,61 +1762,73 @@ def subdivide(network, pores, shape, labels=[]):
                 loc = (non_single_labels[ind] == label)
                 temp_pores = new_net.pores(non_single_labels[ind][loc])
                 new_net['pore.surface_' + label][temp_pores] = True
+    surf = np.vstack([new_net['pore.surface_' + label]
+                      for label in main_labels]).T
+    surf_pores = np.where(np.any(surf, axis=1))[0]
 
-    old_coords = np.copy(new_net['pore.coords'])
     if labels == []:
         labels = ['pore.subdivided_' + new_net.name]
-    for P in pores:
-        # Shifting the new network to the right location and attaching it to
-        # the main network
-        shift = network['pore.coords'][P] - networkspacing/2
-        new_net['pore.coords'] += shift
-        Pn = network.find_neighbor_pores(pores=P)
-        try:
-            Pn_new_net = network.pores(labels)
-        except KeyError:
-            Pn_new_net = []
-        Pn_old_net = Pn[~np.in1d(Pn, Pn_new_net)]
-        Np1 = network.Np
-        extend(pore_coords=new_net['pore.coords'],
-               throat_conns=new_net['throat.conns'] + Np1,
-               labels=labels, network=network)
-
-        # Moving the temporary labels to the big network
-        for label in main_labels:
-            network['pore.surface_' + label][Np1:] = new_net['pore.surface_' + label]
-
-        # Stitching the old pores of the main network to the new extended pores
-        surf_pores = network.pores('surface_*')
-        surf_coord = network['pore.coords'][surf_pores]
-        for neighbor in Pn:
-            neighbor_coord = network['pore.coords'][neighbor]
-            dist = [round(np.inner(neighbor_coord-x, neighbor_coord-x),
-                          20) for x in surf_coord]
-            nearest_neighbor = surf_pores[dist == np.amin(dist)]
-            if neighbor in Pn_old_net:
-                coplanar_labels = network.labels(pores=nearest_neighbor)
-                new_neighbors = network.pores(coplanar_labels,
-                                              mode='and')
-                # This might happen to the edge of the small network
-                if np.size(new_neighbors) == 0:
-                    labels = network.labels(pores=nearest_neighbor,
-                                            mode='and')
-                    common_label = [label for label in labels if 'surface_' in label]
-                    new_neighbors = network.pores(common_label)
-            elif neighbor in Pn_new_net:
-                new_neighbors = nearest_neighbor
-            connect_pores(network=network, pores1=neighbor,
-                          pores2=new_neighbors, labels=labels)
-
-        # Removing temporary labels
-        for label in main_labels:
-            network['pore.surface_' + label] = False
-        new_net['pore.coords'] = np.copy(old_coords)
+    try:
+        is_new = network.tomask(pores=network.pores(labels))
+    except KeyError:
+        is_new = np.zeros(network.Np, dtype=bool)
+    is_target = network.tomask(pores=pores)
+    rank = np.zeros(network.Np, dtype=int)
+    rank[pores] = np.arange(len(pores))
+    coords = network['pore.coords']
+    shifts = coords[pores] - networkspacing/2
+    neighbors = network.find_neighbor_pores(pores=pores, flatten=False,
+                                            include_input=True)
+    faces = {}
+
+    def nearest(point, block_coords):
+        d = point - block_coords[surf_pores]
+        dist = np.round(np.einsum('ij,ij->i', d, d), 20)
+        return surf_pores[dist == np.amin(dist)]
+
+    def face(point, block_coords):
+        # All pores of the face of the block nearest to the given point
+        Ps = nearest(point, block_coords)
+        if Ps.tobytes() not in faces:
+            hits = np.all(surf[:, np.any(surf[Ps], axis=0)], axis=1)
+            # This might happen to the edge of the small network
+            if not np.any(hits):
+                hits = np.any(surf[:, np.all(surf[Ps], axis=0)], axis=1)
+            faces[Ps.tobytes()] = np.where(hits)[0]
+        return faces[Ps.tobytes()]
+
+    # Replace each pore by a shifted copy of the small network, all of which
+    # are written to the network in one pass
+    builder = NetworkBuilder(network=network)
+    facing = [[] for P in pores]
+    for k, P in enumerate(pores):
+        block_coords = new_net['pore.coords'] + shifts[k]
+        Pnew = builder.add_pores(coords=block_coords, labels=labels)
+        conns = [new_net['throat.conns'] + Pnew[0]]
+        for neighbor in neighbors[k]:
+            nc = coords[neighbor]
+            if is_target[neighbor]:
+                # Throats to the other subdivided pores are trimmed below,
+                # but the blocks of later ones connect to this face instead
+                if rank[neighbor] > k:
+                    Pf = face(nc, block_coords)
+                    facing[rank[neighbor]].append((Pnew[Pf], block_coords[Pf]))
+                continue
+            if is_new[neighbor]:
+                new_neighbors = Pnew[nearest(nc, block_coords)]
+            else:
+                new_neighbors = Pnew[face(nc, block_coords)]
+            conns.append(np.vstack((np.full_like(new_neighbors, neighbor),
+                                    new_neighbors)).T)
+        for Pf, crds in facing[k]:
+            for neighbor, nc in zip(Pf, crds):
+                new_neighbors = Pnew[nearest(nc, block_coords)]
+                conns.append(np.vstack((np.full_like(new_neighbors, neighbor),
+                                        new_neighbors)).T)
+        builder.add_throats(conns=np.vstack(conns), labels=labels)
+    builder.build()
 
     label_faces(network=network)
-    for label in main_labels:
-        del network['pore.surface_' + label]
     trim(network=network, pores=pores)
     ws = network.project.workspace
     ws.close_project(new_net.project)
@@ -1178,7 +1870,8 @@ def merge_pores(network, pores, labels=['merged']):
     Notes
     -----
     (1) The method also works if a list of lists is passed, in which case
-    it consecutively merges the given selections of pores.
+    all the given selections of pores are merged at once, with a single
+    update of the network.
 
     (2) The selection of pores should be chosen carefully, preferrable so that
     they all form a continuous cluster.  For instance, it is recommended
@@ -1207,37 +1900,61 @@ def merge_pores(network, pores, labels=['merged']):
         pores = [pores]
 
     N = len(pores)
-    NBs, XYZs = [], []
-
-    for Ps in pores:
-        temp = network.find_neighbor_pores(pores=Ps, mode='union', flatten=True,
-                                           include_input=False)
-        NBs.append(temp)
+    Np = network.Np
+    pores = [np.array(Ps, ndmin=1, dtype=int) for Ps in pores]
+    members = np.concatenate(pores)
+    groups = np.repeat(np.arange(N), [Ps.size for Ps in pores])
+
+    # Find the neighbors of all groups at once, as sorted (group, pore)
+    # pairs encoded as group*Np + pore, excluding each group's own pores
+    am = network.get_adjacency_matrix(fmt='csr')
+    starts, stops = am.indptr[members], am.indptr[members + 1]
+    nbrs = am.indices[_ragged_ranges(starts, stops)]
+    codes = np.unique(np.repeat(groups, stops - starts)*Np + nbrs)
+    codes = codes[~np.isin(codes, groups*Np + members)]
+    nb_groups, nb_pores = np.divmod(codes, Np)
+    splits = np.searchsorted(nb_groups, np.arange(1, N))
+    NBs = np.split(nb_pores, splits)
+
+    XYZs = []
+    for Ps, temp in zip(pores, NBs):
         points = np.concatenate((temp, Ps))
         XYZs.append(hull_centroid(network["pore.coords"][points]))
 
-    extend(network, pore_coords=XYZs, labels=labels)
-    Pnew = network.Ps[-N::]
-
     # Possible throats between new pores: This only happens when running in
     # batch mode, i.e. multiple groups of pores are to be merged. In case
     # some of these groups share elements, possible throats between the
     # intersecting elements is not captured and must be added manually.
-    pores_set = [set(items) for items in pores]
-    NBs_set = [set(items) for items in NBs]
-    ps1, ps2 = [], []
-    from itertools import combinations
-    for i, j in combinations(range(N), 2):
-        if not NBs_set[i].isdisjoint(pores_set[j]):
-            ps1.append([network.Ps[-N+i]])
-            ps2.append([network.Ps[-N+j]])
-
-    # Add (possible) connections between the new pores
-    connect_pores(network, pores1=ps1, pores2=ps2, labels=labels)
-    # Add connections between the new pores and the rest of the network
-    connect_pores(network, pores2=np.split(Pnew, N), pores1=NBs, labels=labels)
-    # Trim merged pores from the network
-    trim(network=network, pores=np.concatenate(pores))
+    # Group i is connected to group j > i if it neighbors a pore of j.
+    order = np.argsort(members, kind='stable')
+    lo = np.searchsorted(members[order], nb_pores, side='left')
+    hi = np.searchsorted(members[order], nb_pores, side='right')
+    i = np.repeat(nb_groups, hi - lo)
+    j = groups[order][_ragged_ranges(lo, hi)]
+    pairs = np.unique(i[i < j]*N + j[i < j])
+    ps1, ps2 = np.divmod(pairs, N)
+
+    # Add the new pores, their connections to each other and to the rest of
+    # the network, then trim the merged pores, each in a single pass
+    Pnew = Np + np.arange(N)
+    conns = np.vstack((np.vstack((Pnew[ps1], Pnew[ps2])).T,
+                       np.vstack((nb_pores, Pnew[nb_groups])).T))
+    builder = NetworkBuilder(network=network)
+    builder.add_pores(coords=XYZs, labels=labels)
+    if conns.size > 0:
+        builder.add_throats(conns=conns, labels=labels)
+    builder.build()
+    trim(network=network, pores=members)
+
+
+def _ragged_ranges(starts, stops):
+    r"""
+    Returns the concatenation of ``np.arange(start, stop)`` for all pairs
+    of ``starts`` and ``stops``
+    """
+    counts = stops - starts
+    first = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - np.repeat(first - starts, counts)
 
 
 def hull_centroid(points):
@@ -1255,7 +1972,7 @@ def hull_centroid(points):
         A 3 by 1 Numpy array containing coordinates of the centroid.
 
     """
-    dim = [np.unique(points[:, i]).size != 1 for i in range(3)]
+    dim = np.any(points != points[0], axis=0)
     hull = ConvexHull(points[:, dim])
     centroid = points.mean(axis=0)
     centroid[dim] = hull.points[hull.vertices].mean(axis=0)
@@ -25,6 +25,7 @@ from .misc import tic, toc
 from .misc import is_symmetric
 from .misc import nbr_to_str
 from .misc import prettify_logger_message
+from .misc import AndersonMixer
 from .Workspace import Workspace
 from .Project import Project
 
@@ -621,3 +621,76 @@ def prettify_logger_message(msg):
     indent = "\n" + " " * 13
     temp = wrap(msg, width=linewidth)
     return indent.join(temp)
+
+
+class AndersonMixer:
+    r"""
+    Accelerates a fixed-point iteration ``x = G(x)`` using Anderson mixing.
+
+    Parameters
+    ----------
+    depth : int
+        The number of previous iterates used to build the next one (i.e. the
+        memory depth). A depth of 0 reduces to plain (relaxed) fixed-point
+        iteration.
+    beta : float (default = 1.0)
+        The mixing (relaxation) factor applied to the fixed-point residual.
+
+    Notes
+    -----
+    Given the current iterate ``x`` and its image ``G(x)``, the next iterate
+    is the combination of the last ``depth`` iterates that minimizes the
+    (linearized) fixed-point residual ``G(x) - x`` in the least-squares
+    sense.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from openpnm.utils import AndersonMixer
+    >>> mixer = AndersonMixer(depth=2)
+    >>> x = np.zeros(2)
+    >>> for i in range(10):
+    ...     x = mixer(x, np.cos(x))
+    >>> np.allclose(x, np.cos(x))
+    True
+
+    """
+
+    def __init__(self, depth, beta=1.0):
+        self.depth = int(depth)
+        self.beta = beta
+        self.reset()
+
+    def reset(self):
+        r"""
+        Clears the history of previous iterates
+        """
+        self._x = None
+        self._f = None
+        self._dX = []
+        self._dF = []
+
+    def __call__(self, x, gx):
+        r"""
+        Returns the next iterate given the current iterate ``x`` and its
+        image ``gx`` under the fixed-point map.
+        """
+        x = _np.asarray(x, dtype=float)
+        f = _np.asarray(gx, dtype=float) - x
+        if self._x is not None and _np.linalg.norm(f) > _np.linalg.norm(self._f):
+            # Restart if the last mixed iterate made things worse
+            self._dX, self._dF = [], []
+        elif self._x is not None and self.depth > 0:
+            self._dX.append(x - self._x)
+            self._dF.append(f - self._f)
+            if len(self._dX) > self.depth:
+                self._dX.pop(0)
+                self._dF.pop(0)
+        self._x, self._f = x.copy(), f.copy()
+        x_new = x + self.beta * f
+        if self._dF:
+            dX = _np.vstack(self._dX).T
+            dF = _np.vstack(self._dF).T
+            gamma = _np.linalg.lstsq(dF, f, rcond=None)[0]
+            x_new = x_new - (dX + self.beta * dF) @ gamma
+        return x_new
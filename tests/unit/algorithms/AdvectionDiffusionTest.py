@@ -237,6 +237,16 @@ class AdvectionDiffusionTest:
             # Ensure mass is not conserved
             assert_allclose(mdot_inlet, -mdot_outlet)
 
+    def test_assemble_A_matches_laplacian(self):
+        import scipy.sparse.csgraph as spgr
+        g = np.random.rand(self.net.Nt, 2)
+        A = self.ad._assemble_A(g)
+        am = self.net.create_adjacency_matrix(weights=g, fmt='coo')
+        assert_allclose(A.toarray(), spgr.laplacian(am).toarray())
+        # The sparsity pattern is reused when only the values change
+        A2 = self.ad._assemble_A(g[:, ::-1])
+        assert A2 is A
+
     def teardown_class(self):
         ws = op.Workspace()
         ws.clear()
@@ -42,6 +42,53 @@ class IPTest:
         alg.run()
         assert alg["throat.invasion_sequence"].max() == (alg.Nt - 1)
 
+    def test_run_in_steps_matches_single_run(self):
+        op.algorithms.InvasionPercolation.warm_up()
+        alg1 = op.algorithms.InvasionPercolation(network=self.net)
+        alg1.setup(phase=self.water)
+        alg1.set_inlets(pores=self.net.pores("top"))
+        alg1.run()
+        alg2 = op.algorithms.InvasionPercolation(network=self.net)
+        alg2.setup(phase=self.water)
+        alg2.set_inlets(pores=self.net.pores("top"))
+        alg2.run(n_steps=100)
+        assert alg2["throat.invasion_sequence"].max() == 99
+        alg2.run()
+        assert np.all(alg1["throat.invasion_sequence"]
+                      == alg2["throat.invasion_sequence"])
+        assert np.all(alg1["pore.invasion_sequence"]
+                      == alg2["pore.invasion_sequence"])
+        assert np.all(alg1["pore.invasion_pressure"]
+                      == alg2["pore.invasion_pressure"])
+        for name in alg1.event_log.dtype.names:
+            assert np.all(alg1.event_log[name] == alg2.event_log[name])
+
+    def test_run_ensemble(self):
+        alg = op.algorithms.InvasionPercolation(network=self.net)
+        alg.setup(phase=self.water)
+        Pin = self.net.pores("top")
+        entry = self.water["throat.entry_pressure"]
+        np.random.seed(0)
+        fields = entry * np.random.rand(3, self.net.Nt)
+        data = alg.run_ensemble(entry_pressures=fields, inlets=Pin)
+        data2 = alg.run_ensemble(entry_pressures=fields, inlets=Pin,
+                                 n_workers=3)
+        assert data["pore.invasion_sequence"].shape == (3, self.net.Np)
+        assert data["throat.invasion_sequence"].shape == (3, self.net.Nt)
+        for key in data.keys():
+            assert np.all(data[key] == data2[key])
+        # Each realization matches a regular run with the same pressures
+        for i, field in enumerate(fields):
+            self.phys["throat.entry_pressure"] = field
+            alg.setup(phase=self.water)
+            alg.set_inlets(pores=Pin)
+            alg.run()
+            assert np.all(alg["pore.invasion_sequence"]
+                          == data["pore.invasion_sequence"][i])
+            assert np.all(alg["throat.invasion_sequence"]
+                          == data["throat.invasion_sequence"][i])
+        self.phys.regenerate_models()
+
     def test_results(self):
         alg = op.algorithms.InvasionPercolation(network=self.net)
         alg.setup(phase=self.water)
@@ -59,6 +106,27 @@ class IPTest:
         assert S < 0.6
         assert S > 0.4
 
+    def test_event_log(self):
+        alg = op.algorithms.InvasionPercolation(network=self.net)
+        alg.setup(phase=self.water)
+        alg.set_inlets(pores=self.net.pores("top"))
+        alg.run()
+        log = alg.event_log
+        assert log.size == self.net.Np + self.net.Nt
+        assert np.all(np.diff(log["step"]) >= 0)
+        Ts = log["element"][log["type"] == 1]
+        assert np.all(alg["throat.invasion_sequence"][Ts]
+                      == log["step"][log["type"] == 1])
+        Vtot = self.net["pore.volume"].sum() + self.net["throat.volume"].sum()
+        assert np.isclose(log["volume"][-1], Vtot)
+        alg.apply_trapping(outlets=self.net.pores("bottom"))
+        n_inv = np.sum(alg["pore.invasion_sequence"] > -1) \
+            + np.sum(alg["throat.invasion_sequence"] > -1)
+        assert alg.event_log.size == n_inv
+        data = alg.get_intrusion_data()
+        assert data.S_tot.size == self.net.Np + self.net.Nt
+        assert np.all(np.diff(data.S_tot) >= 0)
+
     def test_trapping(self):
         alg = op.algorithms.InvasionPercolation(network=self.net)
         alg.setup(phase=self.water)
@@ -67,6 +135,17 @@ class IPTest:
         alg.apply_trapping(outlets=self.net.pores("bottom"))
         assert "pore.trapped" in alg.labels()
 
+    def test_trapping_partial_invasion(self):
+        alg = op.algorithms.InvasionPercolation(network=self.net)
+        alg.setup(phase=self.water)
+        alg.set_inlets(pores=self.net.pores("top"))
+        alg.run(n_steps=500)
+        alg.apply_trapping(outlets=self.net.pores("bottom"))
+        trapped = alg["pore.trapped"]
+        assert np.all(alg["pore.clusters"][trapped] >= 0)
+        assert np.all(alg["pore.invasion_sequence"][trapped] == -1)
+        assert not np.any(trapped[self.net.pores("bottom")])
+
     def test_plot_intrusion_curve(self):
         alg = op.algorithms.InvasionPercolation(network=self.net)
         alg.setup(phase=self.water)
@@ -100,6 +100,18 @@ class MixedPercolationCoopTest:
         ip.run()
         assert np.any(~np.isnan(ip.tt_Pc.data[0]))
 
+    def test_get_throat_pairs(self):
+        ip = mpc(network=self.net)
+        Ps, Ts, T1, T2 = ip._get_throat_pairs()
+        assert np.all(Ps[T1] == Ps[T2])
+        assert np.all(Ts[T1] < Ts[T2])
+        # Every pair of throats sharing a pore is found exactly once
+        num_t = self.net.num_neighbors(pores=self.net.Ps, flatten=False)
+        assert len(T1) == np.sum(num_t*(num_t - 1)//2)
+        conns = self.net['throat.conns']
+        for P, t1, t2 in zip(Ps[T1], Ts[T1], Ts[T2]):
+            assert P in conns[t1] and P in conns[t2]
+
 
 if __name__ == '__main__':
     t = MixedPercolationCoopTest()
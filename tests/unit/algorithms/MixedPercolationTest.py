@@ -347,6 +347,23 @@ class MixedPercolationTest:
         IP_1.apply_trapping()
         assert np.sum(IP_1['pore.trapped'])==35
 
+    def test_individual_inlet_clusters_merge(self):
+        self.setup_class(Np=10)
+        net = self.net
+        phys = self.phys
+        np.random.seed(1)
+        phys['throat.entry_pressure'] = np.random.random(net.Nt)*net.Nt
+        phys['pore.entry_pressure'] = 0.0
+        IP_1 = mp(network=self.net)
+        IP_1.setup(phase=self.phase)
+        IP_1.set_inlets(clusters=[[P] for P in net.pores('left')])
+        IP_1.run()
+        assert np.all(IP_1['pore.invasion_sequence'] > -1)
+        assert not np.any(IP_1.invasion_running)
+        # Sequence numbers are unique apart from the inlets
+        seq = IP_1['pore.invasion_sequence']
+        assert len(np.unique(seq[seq > 0])) == np.sum(seq > 0)
+
     def test_invade_isolated_Ts(self):
         self.setup_class(Np=10)
         net = self.net
@@ -1,5 +1,9 @@
+import sys
+import time
+import types
 import numpy as np
 import openpnm as op
+import scipy.sparse.linalg as spla
 from openpnm.phases import mixtures
 from numpy.testing import assert_allclose
 
@@ -152,6 +156,89 @@ class MultiphysicsNernstPlanckSolverTest:
         y = np.around(self.sw['pore.potential'], decimals=5)
         assert_allclose(actual=y, desired=x)
 
+    def test_run_algs_monolithic(self):
+        x_gummel = [self.sw[alg.settings['quantity']].copy()
+                    for alg in [self.p, self.eA, self.eB]]
+        x_newton, _ = self._run_from_zero(coupling='monolithic')
+        for x, y in zip(x_gummel, x_newton):
+            assert_allclose(actual=y, desired=x, rtol=1e-4)
+
+    def test_run_algs_parallel_ions(self):
+        serial, _ = self._run_from_zero()
+        threaded, _ = self._run_from_zero(n_workers=2)
+        for x, y in zip(serial, threaded):
+            assert_allclose(actual=y, desired=x, rtol=1e-6)
+        # Only the linear solves run in threads, so repeated runs match
+        again, _ = self._run_from_zero(n_workers=2)
+        for x, y in zip(threaded, again):
+            assert_allclose(actual=y, desired=x, rtol=1e-10)
+
+    def test_run_algs_parallel_ions_serializes_pardiso(self):
+        # PyPardiso keeps one global solver, so a stand-in records how many
+        # solves are running whenever one starts
+        running, seen = [], []
+
+        def spsolve(A, b):
+            running.append(1)
+            seen.append(len(running))
+            time.sleep(0.01)
+            x = spla.spsolve(A.tocsr(), b)
+            running.pop()
+            return x
+
+        old = sys.modules.get('pypardiso', None)
+        sys.modules['pypardiso'] = types.SimpleNamespace(spsolve=spsolve)
+        families = [e.settings['solver_family'] for e in [self.eA, self.eB]]
+        for e in [self.eA, self.eB]:
+            e.settings['solver_family'] = 'pypardiso'
+        try:
+            self._run_from_zero(n_workers=2)
+        finally:
+            for e, family in zip([self.eA, self.eB], families):
+                e.settings['solver_family'] = family
+            del sys.modules['pypardiso']
+            if old is not None:
+                sys.modules['pypardiso'] = old
+        assert len(seen) > 0
+        assert max(seen) == 1
+
+    def test_run_algs_anderson_mixing(self):
+        plain, n_plain = self._run_from_zero()
+        mixed, n_mixed = self._run_from_zero(anderson_depth=3)
+        for x, y in zip(plain, mixed):
+            assert_allclose(actual=y, desired=x, rtol=1e-4)
+        # The ions only depend weakly on each other here, so plain Gummel
+        # iterations already converge quickly, but mixing must not slow
+        # them down
+        assert n_mixed <= n_plain
+
+    def _run_from_zero(self, **settings):
+        r"""
+        Reruns the solver from zero fields with the given settings, which
+        are restored afterwards, and returns the potential and ion fields
+        along with the number of Gummel sweeps performed
+        """
+        algs = [self.p, self.eA, self.eB]
+        for alg in algs:
+            alg[alg.settings['quantity']] = 0.0
+        old = {k: self.mnp.settings[k] for k in settings}
+        self.mnp.settings.update(settings)
+        count = []
+        sweep = self.mnp._gummel_sweep
+
+        def counted_sweep(**kwargs):
+            count.append(1)
+            return sweep(**kwargs)
+
+        self.mnp._gummel_sweep = counted_sweep
+        try:
+            self.mnp.run()
+        finally:
+            self.mnp.settings.update(old)
+            del self.mnp._gummel_sweep
+        x = [self.sw[alg.settings['quantity']].copy() for alg in algs]
+        return x, len(count)
+
     def teardown_class(self):
         ws = op.Workspace()
         ws.clear()
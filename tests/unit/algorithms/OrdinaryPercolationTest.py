@@ -154,6 +154,37 @@ class OrdinaryPercolationTest:
         Tent = self.water['throat.entry_pressure']
         assert np.all(Tent <= Tinv)
 
+    def test_run_matches_cluster_labeling_at_each_point(self):
+        self.alg = op.algorithms.OrdinaryPercolation(network=self.net)
+        self.alg.setup(phase=self.water, mode='bond', access_limited=True)
+        Pin = self.net.pores('top')
+        self.alg.set_inlets(pores=Pin)
+        points = np.linspace(0, 2e4, 15)
+        self.alg.run(points=points)
+        conns = self.net['throat.conns']
+        for Pc in points:
+            invaded = self.water['throat.entry_pressure'] <= Pc
+            labels = op.topotools.bond_percolation(conns, invaded)
+            labels = op.topotools.remove_isolated_clusters(labels, Pin)
+            data = self.alg.results(Pc=Pc)
+            assert np.all((labels.sites >= 0) == data['pore.occupancy'])
+            assert np.all((labels.bonds >= 0) == data['throat.occupancy'])
+
+    def test_get_intrusion_data_matches_results(self):
+        self.alg = op.algorithms.OrdinaryPercolation(network=self.net)
+        self.alg.setup(phase=self.water, pore_volume='pore.volume',
+                       throat_volume='throat.volume')
+        self.alg.set_inlets(pores=self.net.pores('top'))
+        self.alg.run(points=20)
+        data = self.alg.get_intrusion_data()
+        Vp = self.net['pore.volume']
+        Vt = self.net['throat.volume']
+        for Pc, S in zip(*data):
+            res = self.alg.results(Pc=Pc)
+            V = np.sum(Vp*res['pore.occupancy']) \
+                + np.sum(Vt*res['throat.occupancy'])
+            assert np.isclose(S, V/(Vp.sum() + Vt.sum()))
+
 
 if __name__ == '__main__':
 
@@ -160,6 +160,40 @@ class ReactiveTransportTest:
         c_mean_relaxed = self.alg['pore.concentration'].mean()
         assert_allclose(c_mean_base, c_mean_relaxed, rtol=1e-6)
 
+    def test_anderson_mixing_consistency_w_base_solution(self):
+        self.alg.reset(bcs=True, source_terms=True)
+        self.alg.set_source(pores=self.net.pores('bottom'), propname='pore.reaction')
+        self.alg.set_value_BC(pores=self.net.pores('top'), values=1.0)
+        self.alg.settings['relaxation_quantity'] = 0.5
+        self.alg.settings['relaxation_source'] = 1.0
+        c_base, n_base = self._run_counting_solves()
+        self.alg.settings['anderson_depth'] = 3
+        c_mixed, n_mixed = self._run_counting_solves()
+        self.alg.settings['anderson_depth'] = 0
+        self.alg.settings['relaxation_quantity'] = 1.0
+        assert_allclose(c_base, c_mixed, rtol=1e-6)
+        # Mixing must cut the number of Picard iterations
+        assert n_mixed < n_base / 2
+
+    def _run_counting_solves(self):
+        r"""
+        Runs the algorithm and returns the solution and the number of linear
+        solves, i.e. Picard iterations, that were needed
+        """
+        count = []
+        solve = self.alg._solve
+
+        def counted_solve(*args, **kwargs):
+            count.append(1)
+            return solve(*args, **kwargs)
+
+        self.alg._solve = counted_solve
+        try:
+            self.alg.run()
+        finally:
+            del self.alg._solve
+        return self.alg['pore.concentration'].copy(), len(count)
+
     def test_solution_should_diverge_w_large_relaxation(self):
         self.alg.reset(bcs=True, source_terms=True)
         self.alg.setup(nlin_max_iter=25)
@@ -1,5 +1,9 @@
+import sys
+import time
+import types
 import numpy as np
 import openpnm as op
+import scipy.sparse.linalg as spla
 mgr = op.Workspace()
 
 
@@ -17,6 +21,46 @@ class FormationFactorTest:
         FF.run()
         assert len(FF.results) == 3
 
+    def test_run_in_threads(self):
+        FF = op.algorithms.metrics.FormationFactor(network=self.net)
+        n_objs = len(self.net.project)
+        FF.run()
+        assert len(self.net.project) == n_objs
+        vals = dict(FF.results)
+        FF.run(n_workers=3)
+        assert len(self.net.project) == n_objs
+        for key in vals.keys():
+            np.testing.assert_allclose(FF.results[key], vals[key])
+
+    def test_run_in_threads_serializes_pardiso(self):
+        FF = op.algorithms.metrics.FormationFactor(network=self.net)
+        FF.run()
+        vals = dict(FF.results)
+        # PyPardiso keeps one global solver, so a stand-in records how many
+        # solves are running whenever one starts
+        running, seen = [], []
+
+        def spsolve(A, b):
+            running.append(1)
+            seen.append(len(running))
+            time.sleep(0.05)
+            x = spla.spsolve(A.tocsr(), b)
+            running.pop()
+            return x
+
+        old = sys.modules.get('pypardiso', None)
+        sys.modules['pypardiso'] = types.SimpleNamespace(spsolve=spsolve)
+        try:
+            FF.run(n_workers=3)
+        finally:
+            del sys.modules['pypardiso']
+            if old is not None:
+                sys.modules['pypardiso'] = old
+        assert len(seen) == 3
+        assert max(seen) == 1
+        for key in vals.keys():
+            np.testing.assert_allclose(FF.results[key], vals[key])
+
     def test_given_area(self):
         FF = op.algorithms.metrics.FormationFactor(network=self.net)
         FF.run()
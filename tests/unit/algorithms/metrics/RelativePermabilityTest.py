@@ -1,4 +1,9 @@
+import sys
+import time
+import types
+import numpy as np
 import openpnm as op
+import scipy.sparse.linalg as spla
 import numpy.testing as nt
 mgr = op.Workspace()
 
@@ -107,6 +112,82 @@ class RelativePermeabilityTest:
         nt.assert_allclose(kx, kz, rtol=1e-6)
         nt.assert_allclose(kx, kr, rtol=1e-6)
 
+    def test_fast_sweep_matches_regular_run(self):
+        inlets = {'x': 'top'}
+        outlets = {'x': 'bottom'}
+        rp = op.algorithms.metrics.RelativePermeability(network=self.net)
+        rp.setup(invading_phase=self.non_wet_phase.name,
+                 defending_phase=self.wet_phase.name,
+                 invasion_sequence='invasion_sequence',
+                 flow_inlets=inlets,
+                 flow_outlets=outlets)
+        rp.run(Snwp_num=10, fast=True)
+        results = rp.get_Kr_data()
+        kr = [5.982845e-01, 4.060000e-01, 4.060000e-01, 2.046288e-01,
+              1.065283e-06, 1.000000e-06, 1.000000e-06, 1.000000e-06,
+              1.000000e-06, 1.000000e-06]
+        nt.assert_allclose(results['kr_wp']['x'], kr, rtol=1e-6)
+        kr_nwp = list(results['kr_nwp']['x'])
+        rp.run(Snwp_num=10, fast=True, n_workers=2)
+        results = rp.get_Kr_data()
+        nt.assert_allclose(results['kr_wp']['x'], kr, rtol=1e-6)
+        nt.assert_allclose(results['kr_nwp']['x'], kr_nwp, rtol=1e-6)
+
+    def test_fast_sweep_in_threads_serializes_pardiso(self):
+        rp = op.algorithms.metrics.RelativePermeability(network=self.net)
+        rp.setup(invading_phase=self.non_wet_phase.name,
+                 defending_phase=self.wet_phase.name,
+                 invasion_sequence='invasion_sequence',
+                 flow_inlets={'x': 'top'},
+                 flow_outlets={'x': 'bottom'})
+        rp.run(Snwp_num=10, fast=True)
+        kr = rp.get_Kr_data()
+        kr_wp, kr_nwp = list(kr['kr_wp']['x']), list(kr['kr_nwp']['x'])
+        # PyPardiso keeps one global solver, so a stand-in records how many
+        # solves are running whenever one starts
+        running, seen = [], []
+
+        def spsolve(A, b):
+            running.append(1)
+            seen.append(len(running))
+            time.sleep(0.01)
+            x = spla.spsolve(A.tocsr(), b)
+            running.pop()
+            return x
+
+        old = sys.modules.get('pypardiso', None)
+        sys.modules['pypardiso'] = types.SimpleNamespace(spsolve=spsolve)
+        try:
+            rp.run(Snwp_num=10, fast=True, n_workers=4)
+        finally:
+            del sys.modules['pypardiso']
+            if old is not None:
+                sys.modules['pypardiso'] = old
+        assert len(seen) > 0
+        assert max(seen) == 1
+        kr = rp.get_Kr_data()
+        nt.assert_allclose(kr['kr_wp']['x'], kr_wp, rtol=1e-6)
+        nt.assert_allclose(kr['kr_nwp']['x'], kr_nwp, rtol=1e-6)
+
+    def test_sat_occ_update_in_any_order(self):
+        rp = op.algorithms.metrics.RelativePermeability(network=self.net)
+        rp.setup(invading_phase=self.non_wet_phase.name,
+                 defending_phase=self.wet_phase.name,
+                 invasion_sequence='invasion_sequence')
+        pseq = rp['pore.invasion_sequence']
+        tseq = rp['throat.invasion_sequence']
+        for i in [10, 60, 20, 20, 0, 200, 5]:
+            rp._sat_occ_update(i)
+            Ps, Ts = pseq < i, tseq < i
+            assert np.all(self.non_wet_phase['pore.occupancy'] == Ps)
+            assert np.all(self.non_wet_phase['throat.occupancy'] == Ts)
+            assert np.all(self.wet_phase['pore.occupancy'] == ~Ps)
+            assert np.all(self.wet_phase['throat.occupancy'] == ~Ts)
+        # Occupancies replaced by someone else are rebuilt from scratch
+        self.non_wet_phase['pore.occupancy'] = True
+        rp._sat_occ_update(30)
+        assert np.all(self.non_wet_phase['pore.occupancy'] == (pseq < 30))
+
     def setup_2D_model(self, shape):
         self.net = op.network.Cubic(shape=shape, spacing=0.0005)
         self.geo = op.geometry.StickAndBall(network=self.net,
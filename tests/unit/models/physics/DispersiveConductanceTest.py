@@ -99,6 +99,31 @@ class DispersiveConductanceTest:
                                 model=mod, s_scheme="powerlaw",
                                 throat_diffusive_conductance="throat.Nt_by_3")
 
+    def test_ad_dif_kernel_follows_topology(self):
+        kernel = op.models.physics.ad_dif_conductance.AdvectionDiffusionKernel
+        net = op.network.Cubic(shape=[3, 2, 1])
+        Ts = net.Ts[:4]
+        geo = op.geometry.GenericGeometry(network=net, pores=net.Ps,
+                                          throats=Ts)
+        phase = op.phases.GenericPhase(network=net)
+        phys = op.physics.GenericPhysics(network=net, phase=phase,
+                                         geometry=geo)
+        k1 = kernel.from_target(phys)
+        assert kernel.from_target(phys) is k1
+        assert not hasattr(phys, '_ad_dif_kernel')
+        assert_allclose(k1.conns, net.conns[Ts])
+        # Editing the connections in place invalidates the kernel
+        net['throat.conns'][0] = [1, 2]
+        k2 = kernel.from_target(phys)
+        assert k2 is not k1
+        assert_allclose(k2.conns, net.conns[Ts])
+        # So does moving the physics to other throats of the same number
+        geo.drop_locations(throats=Ts)
+        geo.add_locations(throats=net.Ts[-4:])
+        k3 = kernel.from_target(phys)
+        assert k3 is not k2
+        assert_allclose(k3.throats, net.Ts[-4:])
+        assert_allclose(k3.conns, net.conns[-4:])
 
 if __name__ == '__main__':
 
@@ -171,6 +171,38 @@ class GenericNetworkTest:
         assert np.size(a) == 17
         assert np.all(np.in1d([0, 1], a))
 
+    def test_find_pores_within_and_in_box(self):
+        pts = np.array([[0.5, 0.5, 0.5], [4.2, 3.1, 7.9], [-3, -3, -3]])
+        coords = self.net.coords
+        a = self.net.find_pores_within(points=pts, r=1.5)
+        for i in range(3):
+            d = np.sqrt(np.sum((coords - pts[i])**2, axis=1))
+            assert np.all(a[i] == np.where(d <= 1.5)[0])
+        offsets, values = self.net.find_pores_within(points=pts, r=1.5,
+                                                     ragged=True)
+        assert np.all(np.concatenate(a) == values)
+        assert np.all(np.diff(offsets) == [len(i) for i in a])
+        lo, hi = [[0.5, 0.5, 0.5], [2, 3, 4]], [[2.5, 1.5, 9.5], [2, 5, 9]]
+        b = self.net.find_pores_in_box(lo=lo, hi=hi)
+        for i in range(2):
+            inside = np.all((coords >= lo[i]) * (coords <= hi[i]), axis=1)
+            assert np.all(b[i] == np.where(inside)[0])
+        d, Ps = self.net.find_nearest_pores(points=pts, k=2, r=1.1)
+        assert np.all(Ps[0] < self.net.Np) and np.all(d[0] <= 1.1)
+        assert np.all(Ps[2] == self.net.Np) and np.all(np.isinf(d[2]))
+
+    def test_kdtree_follows_coords(self):
+        net = op.network.Cubic(shape=[4, 4, 4])
+        kd = net.get_kdtree()
+        assert net.get_kdtree() is kd
+        assert np.all(net.find_nearest_pores(points=[0.5, 0.5, 0.5])[1] == 0)
+        # Changing the coordinates in place is caught as well
+        net['pore.coords'][0] += 10
+        assert net.get_kdtree() is not kd
+        assert np.all(net.find_nearest_pores(points=[0.5, 0.5, 1.4])[1] == 1)
+        net['pore.coords'] = net['pore.coords'] + 1
+        assert net._kd is None
+
     def test_is_fully_connected(self):
         assert self.net._is_fully_connected()
         # Disconnect pore 0 from the network
@@ -308,6 +308,32 @@ class GraphToolsTest:
         Ps = topotools.find_neighbor_sites(sites=[], am=am)
         assert Ps == []
 
+    def test_find_neighbor_sites_repeated_sites(self):
+        am = self.net.create_adjacency_matrix(fmt='csr')
+        im = self.net.create_incidence_matrix(fmt='csr')
+        Ps = topotools.find_neighbor_sites(sites=[0, 0, 1], am=am,
+                                           logic='xnor')
+        assert np.all(Ps == [3])
+        Ps = topotools.find_neighbor_sites(sites=[0, 0, 1], am=am,
+                                           logic='xor')
+        assert np.all(Ps == [2, 4])
+        for logic in ['or', 'xor', 'xnor', 'and']:
+            Ps1 = topotools.find_neighbor_sites(sites=[0, 0, 1], am=am,
+                                                logic=logic)
+            Ps2 = topotools.find_neighbor_sites(sites=[0, 1], am=am,
+                                                logic=logic)
+            assert np.all(Ps1 == Ps2)
+            Ts1 = topotools.find_neighbor_bonds(sites=[1, 0, 1], im=im,
+                                                logic=logic)
+            Ts2 = topotools.find_neighbor_bonds(sites=[0, 1], im=im,
+                                                logic=logic)
+            assert np.all(Ts1 == Ts2)
+        # Unflattened results still hold one row per input site
+        Ps = topotools.find_neighbor_sites(sites=[0, 0, 1], am=am,
+                                           flatten=False, logic='xnor')
+        assert len(Ps) == 3
+        assert np.all(Ps[0] == [3]) and np.all(Ps[1] == [3])
+
     def test_find_neighbor_sites_unsupported_logic(self):
         am = self.net.create_adjacency_matrix(fmt='lil')
         with pytest.raises(Exception):
@@ -328,6 +354,20 @@ class GraphToolsTest:
         assert np.all(Ps[1] == [0, 2, 3, 4])
         assert np.all(Ps[2] == [1])
 
+    def test_find_neighbor_sites_ragged(self):
+        am = self.net.create_adjacency_matrix(fmt='csr')
+        offsets, vals = topotools.find_neighbor_sites(sites=[0, 1, 2], am=am,
+                                                      flatten=False,
+                                                      ragged=True)
+        assert np.all(offsets == [0, 1, 3, 3])
+        assert np.all(vals == [3, 3, 4])
+        im = self.net.create_incidence_matrix(fmt='csr')
+        offsets, vals = topotools.find_neighbor_bonds(sites=[0, 2], im=im,
+                                                      flatten=False,
+                                                      ragged=True)
+        assert np.all(offsets == [0, 2, 3])
+        assert np.all(vals == [0, 1, 3])
+
     def test_find_neighbor_sites_unflattened_xor(self):
         am = self.net.create_adjacency_matrix(fmt='lil')
         Ps = topotools.find_neighbor_sites(sites=[0, 1, 2], am=am,
@@ -521,6 +561,28 @@ class GraphToolsTest:
         assert len(clusters[0]) == net.Np
         assert len(clusters[1]) == net.Nt
 
+    def test_analyze_clusters(self):
+        net = op.network.Cubic(shape=[6, 4, 1])
+        # Two full columns at x=0 and x=2 and one isolated pore at x=5
+        x = net['pore.coords'][:, 0]
+        mask = (x == 0.5) + (x == 2.5) + (net.Ps == 20)
+        stats = topotools.analyze_clusters(network=net, mask=mask,
+                                           pore_volume=np.ones(net.Np),
+                                           throat_volume=np.ones(net.Nt)*0.5)
+        assert np.all(stats.num_pores == [4, 4, 1])
+        assert np.all(stats.num_throats == [3, 3, 0])
+        assert np.allclose(stats.volume, [5.5, 5.5, 1])
+        assert np.all(stats.pores[mask] >= 0)
+        assert np.all(stats.pores[~mask] == -1)
+        assert np.allclose(stats.bbox[1], [[2.5, 0.5, 0.5], [2.5, 3.5, 0.5]])
+        assert np.all(stats.spanning == [[False, True, False],
+                                         [False, True, False],
+                                         [False, False, False]])
+        stats = topotools.analyze_clusters(network=net,
+                                           mask=np.zeros(net.Nt, dtype=bool))
+        assert stats.num_pores.size == 0
+        assert stats.volume is None
+
     def test_find_complement(self):
         am = self.net.create_adjacency_matrix(weights=self.net.Ts, fmt='coo')
         a = [0, 1, 2]
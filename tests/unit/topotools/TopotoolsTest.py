@@ -25,6 +25,31 @@ class TopotoolsTest:
         h = net.check_network_health()
         assert h.health
 
+    def test_reduce_coordination_per_pore(self):
+        net = op.network.Cubic(shape=[10, 10, 10], connectivity=26)
+        n0 = net.num_neighbors(pores=net.Ps)
+        np.random.seed(0)
+        z = np.random.choice([3, 6, 30], size=net.Np)
+        topotools.reduce_coordination(network=net, z=z, seed=0)
+        n = net.num_neighbors(pores=net.Ps)
+        assert np.all(n[z == 30] == n0[z == 30])
+        assert np.mean(n[z == 3]) < np.mean(n[z == 6]) < np.mean(n0)
+        # Throats are only kept if on the spanning tree or if one of their
+        # pores is at or below its target
+        at_target = np.any(n[net.conns] <= z[net.conns], axis=1)
+        assert np.all(net['throat.mst'] | at_target)
+        assert net.check_network_health().health
+        net2 = op.network.Cubic(shape=[10, 10, 10], connectivity=26)
+        topotools.reduce_coordination(network=net2, z=z, seed=0)
+        assert np.all(net2.conns == net.conns)
+        # Parallel throats between the same pores must not upset the tree
+        net3 = op.network.Cubic(shape=[4, 4, 1])
+        topotools.extend(network=net3, conns=net3.conns[:8])
+        topotools.reduce_coordination(network=net3, z=np.zeros(net3.Np),
+                                      seed=0)
+        assert net3.Nt == net3.Np - 1
+        assert net3.check_network_health().health
+
     def test_label_faces(self):
         net = op.network.Cubic(shape=[3, 3, 3], connectivity=6)
         net.clear(mode='labels')
@@ -51,6 +76,22 @@ class TopotoolsTest:
         assert net.num_pores('top') == 9
         assert net.num_pores('bottom') == 9
 
+    def test_label_faces_bins(self):
+        net = op.network.Cubic(shape=[6, 5, 4], spacing=1, connectivity=6)
+        faces = ['surface', 'left', 'right', 'front', 'back', 'top', 'bottom']
+        expected = {face: net['pore.' + face].copy() for face in faces}
+        net.clear(mode='labels')
+        np.random.seed(0)
+        net['pore.coords'] += (np.random.rand(net.Np, 3) - 0.5)*0.3
+        topotools.label_faces(network=net, method='bins')
+        for face in faces:
+            assert np.all(net['pore.' + face] == expected[face])
+        topotools.find_surface_pores(network=net, label='binned',
+                                     method='bins')
+        assert np.all(net['pore.binned'] == expected['surface'])
+        with pytest.raises(Exception):
+            topotools.label_faces(network=net, method='blah')
+
     def test_find_surface_pores_default_markers(self):
         from skimage.morphology import ball
         net = op.network.CubicTemplate(template=ball(3), spacing=1)
@@ -95,6 +136,28 @@ class TopotoolsTest:
         a = np.unique(dm)
         b = np.array([2., 2.23606798, 2.44948974, 2.82842712, 3., 3.46410162])
         assert np.allclose(a, b)
+        dr = topotools.find_pore_to_pore_distance(network=net,
+                                                  pores1=net.pores('left'),
+                                                  pores2=net.pores('right'),
+                                                  r=2.5)
+        assert np.allclose(dr.toarray(), np.where(dm <= 2.5, dm, 0))
+
+    def test_find_pore_to_pore_distance_nearest_and_chunked(self):
+        net = op.network.Cubic(shape=[4, 4, 4])
+        P1, P2 = net.pores('left'), net.pores(['right', 'front'])
+        dm = topotools.find_pore_to_pore_distance(network=net, pores1=P1,
+                                                  pores2=P2)
+        dk = topotools.find_pore_to_pore_distance(network=net, pores1=P1,
+                                                  pores2=P2, k=3).tocsr()
+        assert np.all(dk.getnnz(axis=1) == 3)
+        assert np.allclose(np.sort(dk.toarray(), axis=1)[:, -3:],
+                           np.sort(dm, axis=1)[:, :3])
+        dk = topotools.find_pore_to_pore_distance(network=net, pores1=P1,
+                                                  pores2=P2, k=3, r=0.5)
+        assert dk.nnz == np.sum(dm <= 0.5)
+        blocks = topotools.iter_pore_to_pore_distance(network=net, pores1=P1,
+                                                      pores2=P2, chunk_size=5)
+        assert np.all(np.vstack([d for i, d in blocks]) == dm)
 
     def test_template_sphere_shell(self):
         im = topotools.template_sphere_shell(outer_radius=4, inner_radius=2)
@@ -204,12 +267,35 @@ class TopotoolsTest:
         assert net.Np == 9 - 1 + 25
         assert net.Nt == 12 - 4 + 40 + 5 * 4
 
+    def test_subdivide_adjacent_pores(self):
+        net = op.network.Cubic(shape=[4, 4, 4])
+        op.topotools.subdivide(net, pores=[22, 21], shape=[3, 3, 3],
+                               labels="blah")
+        assert net.Np == 64 - 2 + 2 * 27
+        # Each block is stitched to 5 old neighbors and to the other block
+        assert net.num_throats("blah") == 2 * 54 + 2 * 5 * 9 + 9
+        h = net.check_network_health()
+        assert len(h['disconnected_clusters']) == 0
+        assert len(h['duplicate_throats']) == 0
+
     def test_merge_pores(self):
         testnet = op.network.Cubic(shape=[10, 10, 10])
         to_merge = [[0, 1], [998, 999]]
         topotools.merge_pores(testnet, to_merge)
         assert testnet.Np == 998
 
+    def test_merge_pores_overlapping_groups(self):
+        testnet = op.network.Cubic(shape=[10, 10, 1])
+        to_merge = [[0, 1, 10], [10, 11, 20], [1, 2]]
+        topotools.merge_pores(testnet, to_merge, labels='merged')
+        assert testnet.Np == 100 - 6 + 3
+        Pnew = testnet.pores('merged')
+        conns = testnet.conns[testnet.throats('merged')]
+        # Groups sharing pores are connected to each other
+        assert [Pnew[0], Pnew[1]] in conns.tolist()
+        assert [Pnew[0], Pnew[2]] in conns.tolist()
+        assert testnet.num_neighbors(Pnew[1])[0] == 5
+
     def test_merge_pores_coords(self):
         r"""
         Coordinates of merged pores should be centroid of the enclosing convex
@@ -302,6 +388,44 @@ class TopotoolsTest:
         topotools.trim(pn, throats=pn.throats()[trimmers])
         assert ~np.any(pn['throat.random'] < 0.25)
 
+    def test_trim_in_chunks_updates_cached_matrices(self):
+        pn = op.network.Cubic(shape=[6, 5, 4])
+        Ps = pn.pores('left')
+        Ts = pn.find_neighbor_throats(pores=Ps, mode='xnor')
+        geo = op.geometry.GenericGeometry(network=pn, pores=Ps, throats=Ts)
+        geo['pore.test'] = pn.Ps[Ps]
+        geo['throat.test'] = pn.Ts[Ts]
+        pn['throat.id'] = pn.Ts
+        am = pn.get_adjacency_matrix(fmt='csr')
+        im = pn.get_incidence_matrix(fmt='csr')
+        topotools.trim(network=pn, pores=[0, 7, 33], throats=[5, 60],
+                       chunk_size=10)
+        assert pn.Np == 117
+        assert np.all(pn['pore.test'][pn.pores(geo.name)] == geo['pore.test'])
+        assert np.all(pn['throat.test'][pn.throats(geo.name)]
+                      == geo['throat.test'])
+        assert pn._am['csr'] is not am
+        am = pn.create_adjacency_matrix(fmt='csr', weights=pn.Ts)
+        im = pn.create_incidence_matrix(fmt='csr', weights=pn.Ts)
+        assert (pn._am['csr'] != am).nnz == 0
+        assert (pn._im['csr'] != im).nnz == 0
+        assert np.all(pn.find_neighbor_throats(pores=0)
+                      == np.where(np.any(pn.conns == 0, axis=1))[0])
+        assert not np.any(np.isin(pn['throat.id'], [5, 60]))
+
+    def test_trim_in_chunks_keeps_views(self):
+        pn = op.network.Cubic(shape=[5, 5, 5])
+        pn['pore.x'] = pn['pore.coords'][:, 0]
+        pn['pore.a'] = pn.Ps
+        pn['pore.b'] = pn['pore.a']
+        coords = pn['pore.coords'].copy()
+        keep = np.setdiff1d(pn.Ps, [0, 1, 5])
+        topotools.trim(network=pn, pores=[0, 1, 5], chunk_size=10)
+        assert np.all(pn['pore.coords'] == coords[keep])
+        assert np.all(pn['pore.x'] == coords[keep, 0])
+        assert np.all(pn['pore.a'] == keep)
+        assert np.all(pn['pore.b'] == keep)
+
     def test_iscoplanar(self):
         # Generate planar points with several parallel vectors at start
         coords = [[0, 0, 0], [0, 0, 0], [0, 0, 1], [0, 0, 2], [0, 1, 2]]
@@ -399,6 +523,42 @@ class TopotoolsTest:
                             method='nearest')
         assert pn.Nt == (pn2.Nt * 3 + 20)
 
+    def test_stitch_many(self):
+        tiles = []
+        for i in range(3):
+            net = op.network.Cubic(shape=[4, 4, 4])
+            net['pore.coords'][:, 2] += 4 * i
+            net['pore.tile'] = i
+            tiles.append(net)
+        stitches = [(0, tiles[0].pores('top'), 1, tiles[1].pores('bottom')),
+                    (1, tiles[1].pores('top'), 2, tiles[2].pores('bottom'))]
+        pn = tiles[0]
+        topotools.stitch_many(network=pn, donors=tiles[1:], stitches=stitches,
+                              method='nearest')
+        assert pn.Np == 192
+        assert pn.Nt == 3 * 144 + 32
+        assert pn.num_throats('stitched') == 32
+        assert np.all(pn['pore.tile'] == np.repeat([0, 1, 2], 64))
+        L = np.diff(pn['pore.coords'][pn.conns], axis=1).squeeze()
+        assert_allclose(np.linalg.norm(L, axis=1), 1.0)
+
+    def test_network_builder(self):
+        pn = op.network.Cubic(shape=[3, 3, 3])
+        pn['pore.foo'] = 1
+        builder = topotools.NetworkBuilder(network=pn)
+        Ps = builder.add_pores(coords=[[5, 5, 5], [6, 5, 5]], labels='new')
+        Ts = builder.add_throats(conns=[[0, Ps[0]], Ps], labels='new')
+        assert builder.Np == 29
+        assert pn.Np == 27
+        with pytest.raises(Exception):
+            builder.add_throats(conns=[[0, 29]])
+        builder.build()
+        assert pn.Np == 29
+        assert np.all(pn.pores('new') == Ps)
+        assert np.all(pn.throats('new') == Ts)
+        assert np.all(pn.conns[Ts] == [[0, 27], [27, 28]])
+        assert np.all(np.isnan(pn['pore.foo'][Ps]))
+
     def test_dimensionality(self):
         # 3D network
         pn = op.network.Cubic(shape=[3, 4, 5])
@@ -436,6 +596,29 @@ class TopotoolsTest:
                                   pores2=pores2, mode='delaunay')
         assert pn.Nt == 436
 
+    def test_find_path(self):
+        pn = op.network.Cubic(shape=[5, 5, 5])
+        pairs = [[0, 124], [0, 5], [62, 62], [10, 0]]
+        paths = op.topotools.find_path(network=pn, pore_pairs=pairs)
+        conns = pn['throat.conns']
+        for (P1, P2), Ps, Ts in zip(pairs, paths['pores'], paths['throats']):
+            assert Ps[0] == P1 and Ps[-1] == P2
+            assert Ts.size == Ps.size - 1
+            # Throats are in order along the path
+            steps = np.sort(np.vstack((Ps[:-1], Ps[1:])).T, axis=1)
+            assert np.all(conns[Ts] == steps)
+        assert paths['pores'][0].size == 13
+        ragged = op.topotools.find_path(network=pn, pore_pairs=pairs,
+                                        ragged=True)
+        offsets, vals = ragged['pores']
+        assert np.all(np.diff(offsets) == [13, 2, 1, 3])
+        assert np.all(vals[offsets[1]:offsets[2]] == [0, 5])
+        # Disconnected pores give empty paths
+        op.topotools.trim(network=pn, throats=pn.find_neighbor_throats(124))
+        paths = op.topotools.find_path(network=pn, pore_pairs=[[0, 124]])
+        assert paths['pores'][0].size == 0
+        assert paths['throats'][0].size == 0
+
 
 if __name__ == '__main__':
 
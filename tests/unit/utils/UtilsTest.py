@@ -101,6 +101,22 @@ class UtilsTest:
         assert not op.utils.misc.is_valid_propname("throat.")
         assert not op.utils.misc.is_valid_propname("pore.foo..bar")
 
+    def test_anderson_mixer_needs_fewer_iterations(self):
+        # A slowly converging linear fixed-point map x = M x + c
+        M = np.diag([0.95, 0.9, 0.5])
+        c = np.ones(3)
+        x_star = np.linalg.solve(np.eye(3) - M, c)
+        counts = []
+        for depth in [0, 3]:
+            mixer = op.utils.AndersonMixer(depth=depth)
+            x = np.zeros(3)
+            for i in range(1000):
+                if np.allclose(x, x_star, rtol=1e-10, atol=0):
+                    break
+                x = mixer(x, M @ x + c)
+            counts.append(i)
+        assert counts[1] < counts[0] / 10
+
 
 if __name__ == '__main__':
 